@@ -1,67 +1,84 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin import register
+from django.db import transaction
+from django.urls import reverse
 from .constances import TEXT_SHOW_MAX_SIZE
-from django.http import HttpResponseRedirect
-from django.conf import settings
-import zipfile
-import os
+from .admin_helpers import RelatedIdListFilter, EstimatedCountPaginator
+from .api_cache import invalidate_api_cache
+from .post_search import find_document_post_ids, index_posts
 
 from .models import (
     Author, Category, Post, PostAuthor, PostCategory,
     Keyword, SearchByKeyword, PostSearchByKeywordItem, PostSearchDailyItem,
     AutoScrap, AutoScrapPostItem, AutoScrapCategoryItem, AutoScrapAuthorItem,
+    ExportJob,
 )
+from .tasks import techcrunch_export_as_zip
 from import_export.admin import ImportExportModelAdmin
-from import_export import resources
 from django.utils.html import format_html
 
 
 def make_activate(modeladmin, request, queryset):
     queryset.update(is_active=True)
+    invalidate_api_cache()
 
 
 def make_deactivate(modeladmin, request, queryset):
     queryset.update(is_active=False)
-
-
-class PostResource(resources.ModelResource):
-    class Meta:
-        model = Post
-
-
-class CategoryResource(resources.ModelResource):
-    class Meta:
-        model = Category
-
-
-class AuthorResource(resources.ModelResource):
-    class Meta:
-        model = Author
+    invalidate_api_cache()
 
 
 @admin.action(description='Export selected items to ZIP')
 def export_as_zip(modeladmin, request, queryset):
-    resource = PostResource()
-    dataset = resource.export(queryset)
-    html_content = dataset.html
-
-    html_file_path = os.path.join(settings.MEDIA_ROOT, 'exported_data.html')
-    with open(html_file_path, 'w') as file:
-        file.write(html_content)
-
-    zip_path = os.path.join(settings.MEDIA_ROOT, 'exported_data.zip')
-    with zipfile.ZipFile(zip_path, 'w') as zipf:
-        zipf.write(html_file_path, os.path.basename(html_file_path))
-        for obj in queryset:
-            if obj.image:
-                image_path = os.path.join(settings.MEDIA_ROOT, str(obj.image))
-                zipf.write(image_path, os.path.basename(image_path))
-
-    return HttpResponseRedirect(settings.MEDIA_URL + 'exported_data.zip')
+    object_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    export_job = ExportJob.objects.create(
+        user=request.user,
+        model_label=queryset.model._meta.label_lower,
+        object_ids=object_ids,
+        total_count=len(object_ids),
+    )
+    # The worker must see the job row
+    transaction.on_commit(
+        lambda: techcrunch_export_as_zip.delay(export_job_id=export_job.id)
+    )
+    export_job_url = reverse('admin:techcrunch_exportjob_change',
+                             args=[export_job.id])
+    modeladmin.message_user(
+        request,
+        format_html('Exporting {} items in the background, download the '
+                    'ZIP from <a href="{}">export job {}</a> when it is '
+                    'finished.', len(object_ids), export_job_url,
+                    export_job.id),
+        messages.SUCCESS,
+    )
 
 
 class BaseAdmin(ImportExportModelAdmin, admin.ModelAdmin):
     actions = (make_activate, make_deactivate, export_as_zip)
+    paginator = EstimatedCountPaginator
+    # Skips the second COUNT(*) over the whole table on filtered pages
+    show_full_result_count = False
+
+    # Admin edits reach the post search documents and the cached API
+    # responses like scraped ones do
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        index_posts(post_ids=find_document_post_ids(instance=obj))
+        transaction.on_commit(invalidate_api_cache)
+
+    def delete_model(self, request, obj):
+        post_ids = find_document_post_ids(instance=obj)
+        super().delete_model(request, obj)
+        index_posts(post_ids=post_ids)
+        transaction.on_commit(invalidate_api_cache)
+
+    def delete_queryset(self, request, queryset):
+        post_ids = list()
+        for obj in queryset:
+            post_ids += find_document_post_ids(instance=obj)
+        super().delete_queryset(request, queryset)
+        index_posts(post_ids=list(dict.fromkeys(post_ids)))
+        transaction.on_commit(invalidate_api_cache)
 
 
 @register(Author)
@@ -79,6 +96,7 @@ class AuthorAdmin(BaseAdmin):
     list_display_links = ('id', 'name',)
     list_filter = ('is_active', 'created_at', 'updated_at')
     list_editable = ('is_active',)
+    search_fields = ('name', 'slug')
 
     def image_tag(self, obj):
         return format_html(
@@ -107,6 +125,7 @@ class CategoryAdmin(BaseAdmin):
     list_display_links = ('id', 'name',)
     list_filter = ('is_active', 'created_at', 'updated_at')
     list_editable = ('is_active',)
+    search_fields = ('name', 'slug')
 
     def short_description(self, obj):
         return obj.description[:TEXT_SHOW_MAX_SIZE] + '...' \
@@ -131,6 +150,7 @@ class PostAdmin(BaseAdmin):
         'is_active', 'created_at', 'updated_at',
     )
     list_editable = ('is_active',)
+    search_fields = ('title', 'slug')
 
     def image_tag(self, obj):
         return format_html(
@@ -151,8 +171,12 @@ class PostAuthorAdmin(BaseAdmin):
     list_display = ('id', 'post', 'author',
                     'is_active', 'created_at', 'updated_at')
     list_display_links = ('id', 'post')
-    list_filter = ('is_active', 'created_at', 'updated_at', 'post', 'author')
+    list_filter = ('is_active', 'created_at', 'updated_at',
+                   ('post', RelatedIdListFilter),
+                   ('author', RelatedIdListFilter))
     list_editable = ('is_active',)
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
 
 
 @register(PostCategory)
@@ -160,8 +184,12 @@ class PostCategoryAdmin(BaseAdmin):
     list_display = ('id', 'post', 'category',
                     'is_active', 'created_at', 'updated_at')
     list_display_links = ('id', 'post')
-    list_filter = ('is_active', 'created_at', 'updated_at', 'post', 'category')
+    list_filter = ('is_active', 'created_at', 'updated_at',
+                   ('post', RelatedIdListFilter),
+                   ('category', RelatedIdListFilter))
     list_editable = ('is_active',)
+    list_select_related = ('post', 'category')
+    autocomplete_fields = ('post', 'category')
 
 
 @register(Keyword)
@@ -170,14 +198,19 @@ class KeywordAdmin(BaseAdmin):
     list_display_links = ('id', 'title')
     list_filter = ('is_active', 'created_at', 'updated_at')
     list_editable = ('is_active',)
+    search_fields = ('title',)
 
 
 @register(SearchByKeyword)
 class SearchByKeywordAdmin(BaseAdmin):
     list_display = ('id', 'keyword', 'is_active', 'created_at', 'updated_at')
     list_display_links = ('id', 'keyword')
-    list_filter = ('is_active', 'created_at', 'updated_at', 'keyword')
+    list_filter = ('is_active', 'created_at', 'updated_at',
+                   ('keyword', RelatedIdListFilter))
     list_editable = ('is_active',)
+    list_select_related = ('keyword',)
+    autocomplete_fields = ('keyword',)
+    search_fields = ('keyword__title',)
 
 
 @register(PostSearchByKeywordItem)
@@ -196,9 +229,11 @@ class PostSearchByKeywordItemAdmin(BaseAdmin):
     list_display_links = ('id', 'search_by_keyword')
     list_filter = (
         'is_active', 'is_scraped', 'created_at', 'updated_at',
-        'search_by_keyword',
-        'post')
+        ('search_by_keyword', RelatedIdListFilter),
+        ('post', RelatedIdListFilter))
     list_editable = ('is_active',)
+    list_select_related = ('search_by_keyword__keyword', 'post')
+    autocomplete_fields = ('search_by_keyword', 'post')
 
 
 @register(PostSearchDailyItem)
@@ -215,8 +250,11 @@ class PostSearchDailyItemAdmin(BaseAdmin):
     )
     list_display_links = ('id',)
     list_filter = (
-        'is_active', 'is_scraped', 'created_at', 'updated_at', 'post')
+        'is_active', 'is_scraped', 'created_at', 'updated_at',
+        ('post', RelatedIdListFilter))
     list_editable = ('is_active',)
+    list_select_related = ('post',)
+    autocomplete_fields = ('post',)
 
 
 @register(AutoScrap)
@@ -224,7 +262,10 @@ class AutoScrapAdmin(BaseAdmin):
     list_display = (
         'id',
         'field',
+        'category_id',
+        'page_start',
         'page_count',
+        'next_page',
         'is_active',
         'created_at',
         'updated_at'
@@ -233,6 +274,7 @@ class AutoScrapAdmin(BaseAdmin):
     list_filter = (
         'field', 'is_active', 'created_at', 'updated_at',)
     list_editable = ('is_active',)
+    search_fields = ('field', 'category_id')
 
 
 @register(AutoScrapPostItem)
@@ -241,6 +283,7 @@ class AutoScrapPostItemAdmin(BaseAdmin):
         'id',
         'fail_count',
         'auto_scrap',
+        'page',
         'is_scraped',
         'is_active',
         'created_at',
@@ -248,8 +291,11 @@ class AutoScrapPostItemAdmin(BaseAdmin):
     )
     list_display_links = ('id', 'auto_scrap')
     list_filter = (
-        'is_active', 'is_scraped', 'created_at', 'updated_at',)
+        'is_active', 'is_scraped', 'created_at', 'updated_at',
+        ('auto_scrap', RelatedIdListFilter))
     list_editable = ('is_active',)
+    list_select_related = ('auto_scrap',)
+    autocomplete_fields = ('auto_scrap', 'posts')
 
 
 @register(AutoScrapCategoryItem)
@@ -258,6 +304,7 @@ class AutoScrapCategoryItemAdmin(BaseAdmin):
         'id',
         'fail_count',
         'auto_scrap',
+        'page',
         'is_scraped',
         'is_active',
         'created_at',
@@ -265,8 +312,11 @@ class AutoScrapCategoryItemAdmin(BaseAdmin):
     )
     list_display_links = ('id', 'auto_scrap')
     list_filter = (
-        'is_active', 'is_scraped', 'created_at', 'updated_at',)
+        'is_active', 'is_scraped', 'created_at', 'updated_at',
+        ('auto_scrap', RelatedIdListFilter))
     list_editable = ('is_active',)
+    list_select_related = ('auto_scrap',)
+    autocomplete_fields = ('auto_scrap', 'categories')
 
 
 @register(AutoScrapAuthorItem)
@@ -275,6 +325,7 @@ class AutoScrapAuthorItemAdmin(BaseAdmin):
         'id',
         'fail_count',
         'auto_scrap',
+        'page',
         'is_scraped',
         'is_active',
         'created_at',
@@ -282,5 +333,52 @@ class AutoScrapAuthorItemAdmin(BaseAdmin):
     )
     list_display_links = ('id', 'auto_scrap')
     list_filter = (
-        'is_active', 'is_scraped', 'created_at', 'updated_at',)
+        'is_active', 'is_scraped', 'created_at', 'updated_at',
+        ('auto_scrap', RelatedIdListFilter))
     list_editable = ('is_active',)
+    list_select_related = ('auto_scrap',)
+    autocomplete_fields = ('auto_scrap', 'authors')
+
+
+@register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'model_label',
+        'status',
+        'progress',
+        'download_link',
+        'user',
+        'created_at',
+        'updated_at'
+    )
+    list_display_links = ('id', 'model_label')
+    list_filter = ('status', 'model_label', 'created_at')
+    list_select_related = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ('user', 'model_label', 'status', 'total_count',
+                       'exported_count', 'file', 'error')
+    exclude = ('object_ids',)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # Exports can hold any rows, only their owner may see them
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(user=request.user)
+
+    def progress(self, obj):
+        if not obj.total_count:
+            return '-'
+        return (f'{obj.exported_count}/{obj.total_count} '
+                f'({obj.exported_count * 100 // obj.total_count}%)')
+
+    progress.short_description = 'Progress'
+
+    def download_link(self, obj):
+        if not obj.file:
+            return '-'
+        return format_html('<a href="{}">Download</a>', obj.file.url)
+
+    download_link.short_description = 'Download'
@@ -0,0 +1,24 @@
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import constances
+from .cache_versions import get_cache_version, bump_cache_version
+
+API_CACHE_VERSION_KEY = f'{constances.API_CACHE_PREFIX}:version'
+
+
+def invalidate_api_cache() -> None:
+    bump_cache_version(version_key=API_CACHE_VERSION_KEY)
+
+
+def build_api_cache_key(*, url: str) -> str:
+    url_hash = hashlib.md5(url.encode()).hexdigest()
+    version = get_cache_version(version_key=API_CACHE_VERSION_KEY)
+    return f'{constances.API_CACHE_PREFIX}:{version}:{url_hash}'
+
+
+def build_etag(*, data) -> str:
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return f'"{hashlib.md5(body.encode()).hexdigest()}"'
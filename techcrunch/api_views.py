@@ -0,0 +1,121 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils.http import parse_etags
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from . import constances
+from .api_cache import build_api_cache_key, build_etag
+from .forms import PostSearchForm
+from .models import Post, Category, Author, PostAuthor, PostCategory
+from .post_search import search_posts
+from .serializers import (
+    PostSerializer, PostDetailSerializer, PostSearchResultSerializer,
+    CategorySerializer, AuthorSerializer
+)
+
+# One query per relation for a whole page of posts
+POST_PREFETCHES = [
+    Prefetch('post_authors',
+             queryset=PostAuthor.objects.select_related('author')),
+    Prefetch('post_categories',
+             queryset=PostCategory.objects.select_related('category')),
+]
+
+
+class IdCursorPagination(CursorPagination):
+    # Keyset on the primary key, deep pages cost the same as the first one
+    ordering = '-id'
+    page_size = constances.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = constances.API_MAX_PAGE_SIZE
+
+
+class CachedReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+    pagination_class = IdCursorPagination
+
+    def build_cached_response(self, *, request,
+                              build_response: callable) -> Response:
+        # Runs after authentication, so cached data never skips permissions
+        cache_key = build_api_cache_key(url=request.build_absolute_uri())
+        cached_entry = cache.get(cache_key)
+        if cached_entry is None:
+            response = build_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached_entry = {
+                'data': response.data,
+                'etag': build_etag(data=response.data),
+            }
+            cache.set(cache_key, cached_entry, constances.API_CACHE_TIMEOUT)
+
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if cached_entry['etag'] in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(cached_entry['data'])
+        response['ETag'] = cached_entry['etag']
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.build_cached_response(
+            request=request,
+            build_response=partial(super().list, request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.build_cached_response(
+            request=request,
+            build_response=partial(super().retrieve, request, *args,
+                                   **kwargs),
+        )
+
+
+class PostViewSet(CachedReadOnlyViewSet):
+    def get_queryset(self):
+        queryset = Post.objects.filter(is_active=True).prefetch_related(
+            *POST_PREFETCHES
+        )
+        if self.action == 'list':
+            # The list leaves the body out, it is most of the row
+            queryset = queryset.defer('content')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return PostDetailSerializer
+        if self.action == 'search':
+            return PostSearchResultSerializer
+        return PostSerializer
+
+    def search_results(self, *, request) -> Response:
+        form = PostSearchForm(request.query_params)
+        if not form.is_valid():
+            raise ValidationError(form.errors)
+        posts = search_posts(query=form.cleaned_data['q'])
+        prefetch_related_objects(posts, *POST_PREFETCHES)
+        return Response({
+            'results': self.get_serializer(posts, many=True).data,
+        })
+
+    @action(detail=False, url_path='search')
+    def search(self, request):
+        return self.build_cached_response(
+            request=request,
+            build_response=partial(self.search_results, request=request),
+        )
+
+
+class CategoryViewSet(CachedReadOnlyViewSet):
+    queryset = Category.objects.filter(is_active=True)
+    serializer_class = CategorySerializer
+
+
+class AuthorViewSet(CachedReadOnlyViewSet):
+    queryset = Author.objects.filter(is_active=True)
+    serializer_class = AuthorSerializer
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+from django.db import connection
+
+from . import constances
+from .http_cache import HttpResponseCache
+from .http_session import ScraperSession
+from .rate_limiter import HostRateLimiter
+from .scraper_handler import TCScraperHandler
+
+
+# Request rate is left to the shared HostRateLimiter that every request
+# goes through, this only bounds how many run at once per host
+class AsyncHostThrottle:
+    def __init__(self, *, max_concurrency: int):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+
+
+class AsyncTCScraperHandler(TCScraperHandler):
+    def __init__(
+            self,
+            url_for_scrap,
+            search_url,
+            session: ScraperSession = None,
+            http_cache: HttpResponseCache = None,
+            rate_limiter: HostRateLimiter = None,
+            max_concurrency_per_host: int =
+            constances.ASYNC_MAX_CONCURRENCY_PER_HOST,
+    ):
+        super().__init__(url_for_scrap, search_url,
+                         session=session, http_cache=http_cache,
+                         rate_limiter=rate_limiter)
+        self.max_concurrency_per_host = max_concurrency_per_host
+
+    def get_throttle(self, *, url: str, throttles: dict) -> AsyncHostThrottle:
+        host = urlsplit(url).netloc
+        if host not in throttles:
+            throttles[host] = AsyncHostThrottle(
+                max_concurrency=self.max_concurrency_per_host,
+            )
+        return throttles[host]
+
+    @staticmethod
+    def run_in_thread(function: callable, **kwargs):
+        try:
+            return function(**kwargs)
+        finally:
+            # The request reaches the rate limiter, worker threads must not
+            # keep a connection open after it
+            connection.close()
+
+    async def fetch_json(self, *, url: str, throttles: dict,
+                         item_type: str = '') -> json:
+        async with self.get_throttle(url=url, throttles=throttles):
+            # The pooled session is blocking, so it runs on worker threads
+            return await asyncio.to_thread(self.run_in_thread,
+                                           self.url_request_for_json,
+                                           url=url, item_type=item_type)
+
+    async def fetch_many_json(self, *, urls: list, item_type: str = '',
+                              return_exceptions: bool = False) -> list:
+        # Throttles are bound to the running event loop
+        throttles = dict()
+        return await asyncio.gather(
+            *(self.fetch_json(url=url, throttles=throttles,
+                              item_type=item_type) for url in urls),
+            return_exceptions=return_exceptions,
+        )
+
+    def fetch_pages_json(self, *, urls: list, item_type: str = '') -> list:
+        return asyncio.run(self.fetch_many_json(urls=urls,
+                                                item_type=item_type,
+                                                return_exceptions=True))
+
+    def scrape_page_range(
+            self,
+            *,
+            item_type: str,
+            pages: range or list,
+            attribute: str = '?',
+            attribute_value: int or str = '',
+    ) -> list:
+        pages_urls = [
+            self.build_item_url(
+                item_type=item_type,
+                attribute=attribute,
+                attribute_value=attribute_value,
+                page=page,
+            )
+            for page in pages
+        ]
+        pages_json = asyncio.run(self.fetch_many_json(urls=pages_urls,
+                                                      item_type=item_type))
+
+        # Parsing touches the ORM, so it stays sequential and in page order
+        items_list = list()
+        for data_json in pages_json:
+            items_list += self.parse_page_json(data_json=data_json,
+                                               item_type=item_type,
+                                               attribute=attribute,
+                                               attribute_value=attribute_value,
+                                               )
+        return items_list
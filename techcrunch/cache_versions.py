@@ -0,0 +1,18 @@
+import time
+
+from django.core.cache import cache
+
+
+def get_cache_version(*, version_key: str) -> str:
+    version = cache.get(version_key)
+    if version is None:
+        version = str(time.time_ns())
+        # add() keeps a version another process just set
+        if not cache.add(version_key, version, timeout=None):
+            version = cache.get(version_key, version)
+    return version
+
+
+def bump_cache_version(*, version_key: str) -> None:
+    # Old entries stay unreachable under the previous version and expire
+    cache.set(version_key, str(time.time_ns()), timeout=None)
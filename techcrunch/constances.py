@@ -1,24 +1,154 @@
 from enum import Enum
 
 TEXT_SHOW_MAX_SIZE = 100
+# Unfiltered admin changelists above this many rows show the planner's
+# estimate instead of running COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
 TIME_OUT = 30
-DATA_PER_PAGE = '&per_page=100'
+ITEMS_PER_PAGE = 100
+DATA_PER_PAGE = f'&per_page={ITEMS_PER_PAGE}'
 DEFAULT_SEARCH_PAGE_COUNT = 5
 MAXIMUM_SEARCH_PAGE_COUNT = 100
 IMAGE_FORMAT = '.png'
+IMAGE_DIRECTORY = 'images'
+IMAGE_URL_INDEX = '.url-index'
+IMAGE_CHUNK_SIZE = 64 * 1024
+IMAGE_DOWNLOAD_WORKERS = 8
 MAX_FAIL_COUNT = 2
 
+# HTML-to-text extraction
+# 'strip' matches BeautifulSoup's get_text() for well-formed HTML, entities
+# missing their ';' and bare '&' are decoded like html.unescape() instead.
+# 'lxml' is faster when installed but normalizes \r\n and drops CDATA text
+TEXT_EXTRACTION_BACKEND = 'strip'
+
+# HTTP session / connection pool
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+POOL_BLOCK = True
+MAX_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.5
+# 429 is left to the rate limiter so its Retry-After reaches every worker
+RETRY_STATUS_FORCELIST = (500, 502, 503, 504)
+
+# Per-host token bucket shared by every worker ('database' or 'local')
+RATE_LIMIT_BACKEND = 'database'
+RATE_LIMIT_REQUESTS_PER_SECOND = 5
+RATE_LIMIT_BURST = 10
+# host -> (requests per second, burst)
+RATE_LIMIT_HOST_OVERRIDES = {
+    'search.techcrunch.com': (2, 4),
+}
+RATE_LIMIT_STATUS_CODES = (429,)
+RATE_LIMIT_MAX_RETRIES = 3
+RATE_LIMIT_DEFAULT_RETRY_AFTER = 30
+# SQLite reports a busy row as locked instead of waiting on it
+RATE_LIMIT_LOCK_RETRIES = 5
+RATE_LIMIT_LOCK_RETRY_SECONDS = 0.05
+
+# Conditional (ETag / Last-Modified) API response cache
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_DIRECTORY = 'http_cache'
+HTTP_CACHE_TTL = 10 * 60
+HTTP_CACHE_MAX_SIZE_BYTES = 512 * 1024 * 1024
+
+# Async fetch engine
+ASYNC_MAX_CONCURRENCY_PER_HOST = 8
+
+# WordPress page totals (X-WP-Total / X-WP-TotalPages)
+PAGE_TOTALS_CACHE_PREFIX = 'techcrunch:page-totals'
+PAGE_TOTALS_CACHE_TIMEOUT = 60 * 60
+
+# In-run category / author lookup cache
+LOOKUP_CACHE_MAX_SIZE = 1024
+
+# Bulk persistence
+BULK_BATCH_SIZE = 500
+
+# Keyword search result pages, fetched concurrently up to the first
+# empty page
+SEARCH_PAGE_MAX_WORKERS = 8
+
+# Pending search item queue
+MAX_ITEMS_PER_REQUEST = 100
+SEARCH_ITEM_BATCH_SIZE = 100
+SEARCH_ITEM_MAX_BATCHES_PER_TICK = 50
+SEARCH_ITEM_LEASE_SECONDS = 10 * 60
+DAILY_ITEM_BATCH_SIZE = 100
+
+# Auto scrape page jobs
+AUTO_SCRAP_PAGES_PER_JOB = 1
+AUTO_SCRAP_MAX_JOBS_PER_TICK = 50
+AUTO_SCRAP_MAX_PLANNED_PAGES_PER_TICK = 100
+AUTO_SCRAP_LEASE_SECONDS = 10 * 60
+
+# Incremental crawl
+MODIFIED_FORMAT = '%Y-%m-%dT%H:%M:%S'
+MODIFIED_ORDER = '&orderby=modified&order=asc'
+MODIFIED_AFTER_FILTER = '&modified_after={modified_after}'
+# Re-read a little before the watermark, the content hash skips repeats
+CRAWL_WATERMARK_OVERLAP_SECONDS = 60
+CRAWL_MAX_PAGES_PER_RUN = 100
+
+# Stage timings, one JSON log line per (stage, item type) per task run
+STAGE_TIMING_LOGGER = 'techcrunch.stage_timing'
+SEARCH_PAGE_ITEM_TYPE = 'search_pages'
+DAILY_PAGE_ITEM_TYPE = 'daily_page'
+IMAGE_ITEM_TYPE = 'images'
+
+# Post full-text search
+POST_SEARCH_CONFIG = 'english'
+# bm25() column weights: title, content, authors, categories
+POST_SEARCH_FTS5_WEIGHTS = '10.0, 1.0, 5.0, 5.0'
+POST_SEARCH_RESULT_LIMIT = 50
+
+# Home page keyword listing
+HOME_KEYWORDS_PER_PAGE = 25
+KEYWORD_STATS_CACHE_PREFIX = 'techcrunch:keyword-stats'
+KEYWORD_STATS_CACHE_TIMEOUT = 10 * 60
+
+# Read-only REST API
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+API_CACHE_PREFIX = 'techcrunch:api'
+# Bounds staleness when a write path doesn't bump the version
+API_CACHE_TIMEOUT = 5 * 60
+
+# Background admin export
+EXPORT_DIRECTORY = 'exports'
+EXPORT_TABLE_NAME = 'exported_data.html'
+EXPORT_CHUNK_SIZE = 500
+
 BASE_URL = 'https://www.techcrunch.com/'
 JSON_PATH = 'wp-json/wp/v2/'
 URL_FOR_SCRAPE = (BASE_URL + JSON_PATH + '{field}{filter_field}{filter_value}'
                                          '{data_per_page}'
                                          '{page}'
+                                         '{modified_after}'
                                          '{envelope}'
                                          '{embed}'
                   )
 
 SEARCH_BASE_URL = 'https://search.techcrunch.com/'
 SEARCH_URL = (SEARCH_BASE_URL + 'search?p={keyword}&b={page}1')
+SEARCH_ITEM_LINK_CLASS = 'thmb'
+DAILY_ITEM_LINK_CLASS = 'post-block__title__link'
+
+
+class ScrapeStages(Enum):
+    RATE_LIMIT_WAIT = 'rate_limit_wait'
+    HTTP_FETCH = 'http_fetch'
+    JSON_DECODE = 'json_decode'
+    HTML_CLEAN = 'html_clean'
+    DB_WRITE = 'db_write'
+    IMAGE_DOWNLOAD = 'image_download'
+
+
+class ExportJobStatuses(Enum):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
 
 
 class ItemTypes(Enum):
@@ -31,6 +161,7 @@ class ItemAttributeTypes(Enum):
     ID = '/'
     SLUG = '?slug='
     CATEGORY = '?categories='
+    INCLUDE = '?include='
     NONE = ''
 
 
@@ -44,8 +175,3 @@ class EmbedStatuses(Enum):
     FALSE = '&_embed=false'
     NONE = ''
 
-
-class AutoScrapLastPage(Enum):
-    POST = 499
-    CATEGORY = 3
-    AUTHOR = 7
@@ -0,0 +1,113 @@
+import html
+import os
+import zipfile
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Model
+from import_export import resources
+
+from . import constances
+from .models import Post, Category, Author, ExportJob
+
+
+class PostResource(resources.ModelResource):
+    class Meta:
+        model = Post
+
+
+class CategoryResource(resources.ModelResource):
+    class Meta:
+        model = Category
+
+
+class AuthorResource(resources.ModelResource):
+    class Meta:
+        model = Author
+
+
+EXPORT_RESOURCES = {
+    Post: PostResource,
+    Category: CategoryResource,
+    Author: AuthorResource,
+}
+
+
+def get_export_resource(*, model: type[Model]) -> resources.ModelResource:
+    resource_class = EXPORT_RESOURCES.get(model) \
+        or resources.modelresource_factory(model)
+    return resource_class()
+
+
+def iter_export_chunks(*, model: type[Model], object_ids: list,
+                       chunk_size: int = constances.EXPORT_CHUNK_SIZE):
+    # Only one chunk of rows is loaded at a time, and each IN list stays
+    # under the database's parameter limit
+    for index in range(0, len(object_ids), chunk_size):
+        yield list(
+            model.objects.filter(
+                pk__in=object_ids[index:index + chunk_size]
+            ).select_related().order_by('pk')
+        )
+
+
+def build_table_row(*, cells: list, cell_tag: str) -> str:
+    cells_html = '\n'.join(
+        f'<{cell_tag}>{html.escape(str(cell) if cell is not None else "")}'
+        f'</{cell_tag}>'
+        for cell in cells
+    )
+    return f'<tr>{cells_html}</tr>\n'
+
+
+def build_export_file_name(*, export_job: ExportJob) -> str:
+    model_name = export_job.model_label.split('.')[-1]
+    created_at = export_job.created_at.strftime('%Y%m%d-%H%M%S')
+    return f'{model_name}-{created_at}-{export_job.id}.zip'
+
+
+def write_export_zip(*, export_job: ExportJob, zip_path: str) -> None:
+    model = apps.get_model(export_job.model_label)
+    resource = get_export_resource(model=model)
+    # Stored path -> archive name, content addressed images repeat across rows
+    image_names = dict()
+    exported_count = 0
+    with zipfile.ZipFile(zip_path, 'w',
+                         compression=zipfile.ZIP_DEFLATED) as zip_file:
+        # Rows are streamed into the archive member, not built as one string
+        with zip_file.open(constances.EXPORT_TABLE_NAME, 'w') as table:
+            table.write('<table>\n<thead>\n'.encode())
+            table.write(build_table_row(
+                cells=resource.get_export_headers(),
+                cell_tag='th',
+            ).encode())
+            table.write('</thead>\n<tbody>\n'.encode())
+            for instances in iter_export_chunks(
+                    model=model,
+                    object_ids=export_job.object_ids,
+            ):
+                for instance in instances:
+                    table.write(build_table_row(
+                        cells=resource.export_resource(instance),
+                        cell_tag='td',
+                    ).encode())
+                    image = getattr(instance, 'image', None)
+                    if image:
+                        image_names[str(image)] = os.path.basename(
+                            str(image)
+                        )
+                exported_count += len(instances)
+                ExportJob.objects.filter(pk=export_job.pk).update(
+                    exported_count=exported_count,
+                )
+            table.write('</tbody>\n</table>'.encode())
+
+        written_names = set()
+        for image_path, image_name in image_names.items():
+            absolute_path = os.path.join(settings.MEDIA_ROOT, image_path)
+            if image_name in written_names \
+                    or not os.path.exists(absolute_path):
+                continue
+            written_names.add(image_name)
+            # ZipFile.write copies the file in chunks
+            zip_file.write(absolute_path, image_name)
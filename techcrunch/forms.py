@@ -19,6 +19,10 @@ class SearchByKeywordForm(forms.Form):
     )
 
 
+class PostSearchForm(forms.Form):
+    q = forms.CharField(label='Search posts', max_length=250)
+
+
 class SignUpForm(UserCreationForm):
     email = forms.EmailField(
         widget=forms.EmailInput(attrs={'class': 'form-control'}))
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from . import constances
+
+_shared_http_cache = None
+_shared_http_cache_lock = threading.Lock()
+
+CACHED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified',
+                  'X-WP-Total', 'X-WP-TotalPages']
+
+
+class HttpResponseCache:
+    def __init__(
+            self,
+            *,
+            directory: str,
+            ttl: int = constances.HTTP_CACHE_TTL,
+            max_size_bytes: int = constances.HTTP_CACHE_MAX_SIZE_BYTES,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size_bytes = max_size_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.size_bytes = sum(size for _, size, _ in self.list_entries())
+        self.counters = {
+            'hits': 0,
+            'revalidated': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def count(self, *, counter: str) -> None:
+        with self.lock:
+            self.counters[counter] += 1
+
+    def build_entry_path(self, *, url: str) -> str:
+        return os.path.join(self.directory,
+                            hashlib.sha256(url.encode()).hexdigest())
+
+    def list_entries(self) -> list[tuple]:
+        entries = list()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                entry_path = entry.path[:-len('.json')]
+                try:
+                    body_size = os.path.getsize(f'{entry_path}.body')
+                    meta_stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry_path,
+                                body_size + meta_stat.st_size,
+                                meta_stat.st_mtime))
+        return entries
+
+    def get(self, *, url: str) -> dict or None:
+        entry_path = self.build_entry_path(url=url)
+        try:
+            with open(f'{entry_path}.json') as f:
+                entry = json.load(f)
+            # The meta file's mtime is the LRU clock
+            os.utime(f'{entry_path}.json')
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get('url') != url:
+            return None
+        entry['path'] = entry_path
+        return entry
+
+    def is_fresh(self, *, entry: dict) -> bool:
+        return time.time() - entry['stored_at'] < self.ttl
+
+    @staticmethod
+    def build_conditional_headers(*, entry: dict or None) -> dict:
+        headers = dict()
+        if entry is None:
+            return headers
+        if entry['headers'].get('ETag'):
+            headers['If-None-Match'] = entry['headers']['ETag']
+        if entry['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+
+    def build_response(self, *, entry: dict) -> Response or None:
+        try:
+            with open(f"{entry['path']}.body", 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        response = Response()
+        response.status_code = 200
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        return response
+
+    def write_atomically(self, *, path: str, content: bytes) -> None:
+        temporary_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporary_path, 'wb') as f:
+            f.write(content)
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def get_entry_size(*, entry_path: str) -> int:
+        try:
+            return (os.path.getsize(f'{entry_path}.body')
+                    + os.path.getsize(f'{entry_path}.json'))
+        except FileNotFoundError:
+            return 0
+
+    def store(self, *, url: str, response: Response) -> None:
+        entry_path = self.build_entry_path(url=url)
+        # A re-stored URL overwrites its files, its old size must not count
+        replaced_size = self.get_entry_size(entry_path=entry_path)
+        meta = json.dumps({
+            'url': url,
+            'stored_at': time.time(),
+            'headers': {header: response.headers[header]
+                        for header in CACHED_HEADERS
+                        if header in response.headers},
+        }).encode()
+        self.write_atomically(path=f'{entry_path}.body',
+                              content=response.content)
+        self.write_atomically(path=f'{entry_path}.json', content=meta)
+        with self.lock:
+            self.size_bytes += len(response.content) + len(meta) \
+                - replaced_size
+            over_limit = self.size_bytes > self.max_size_bytes
+        if over_limit:
+            self.evict()
+
+    def refresh(self, *, entry: dict) -> None:
+        entry_path = entry.pop('path')
+        entry['stored_at'] = time.time()
+        self.write_atomically(path=f'{entry_path}.json',
+                              content=json.dumps(entry).encode())
+        entry['path'] = entry_path
+
+    def evict(self) -> None:
+        with self.lock:
+            entries = sorted(self.list_entries(), key=lambda e: e[2])
+            size_bytes = sum(size for _, size, _ in entries)
+            target_size = self.max_size_bytes * 0.9
+            for entry_path, size, _ in entries:
+                if size_bytes <= target_size:
+                    break
+                for suffix in ['.json', '.body']:
+                    try:
+                        os.remove(f'{entry_path}{suffix}')
+                    except FileNotFoundError:
+                        pass
+                size_bytes -= size
+                self.counters['evictions'] += 1
+            self.size_bytes = size_bytes
+
+    def statistics(self) -> dict:
+        with self.lock:
+            return {**self.counters, 'size_bytes': self.size_bytes}
+
+
+def get_shared_http_cache() -> HttpResponseCache or None:
+    global _shared_http_cache
+    if not constances.HTTP_CACHE_ENABLED:
+        return None
+    if _shared_http_cache is None:
+        with _shared_http_cache_lock:
+            if _shared_http_cache is None:
+                _shared_http_cache = HttpResponseCache(
+                    directory=os.path.join(settings.BASE_DIR,
+                                           constances.HTTP_CACHE_DIRECTORY),
+                )
+    return _shared_http_cache
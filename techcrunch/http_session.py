@@ -0,0 +1,92 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import constances
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+class ScraperRetry(Retry):
+    # 429 goes back to the caller so the shared rate limiter can block the
+    # host for every worker instead of one connection sleeping on it
+    RETRY_AFTER_STATUS_CODES = frozenset([413, 503])
+
+
+def build_retry(
+        *,
+        max_retries: int = constances.MAX_RETRIES,
+        backoff_factor: float = constances.RETRY_BACKOFF_FACTOR,
+        status_forcelist: tuple = constances.RETRY_STATUS_FORCELIST,
+) -> Retry:
+    return ScraperRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=status_forcelist,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        # Hand the last response back so raise_for_status() reports it
+        raise_on_status=False,
+    )
+
+
+class ScraperSession(requests.Session):
+    def __init__(
+            self,
+            *,
+            pool_connections: int = constances.POOL_CONNECTIONS,
+            pool_maxsize: int = constances.POOL_MAXSIZE,
+            pool_block: bool = constances.POOL_BLOCK,
+            max_retries: int = constances.MAX_RETRIES,
+            backoff_factor: float = constances.RETRY_BACKOFF_FACTOR,
+            status_forcelist: tuple = constances.RETRY_STATUS_FORCELIST,
+    ):
+        super().__init__()
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=build_retry(
+                max_retries=max_retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=status_forcelist,
+            ),
+        )
+        self.mount('https://', self.adapter)
+        self.mount('http://', self.adapter)
+        self.headers.update({'Connection': 'keep-alive'})
+
+    def pool_statistics(self) -> dict:
+        pools = self.adapter.poolmanager.pools
+        statistics = dict()
+        for pool_key in pools.keys():
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            requests_count = pool.num_requests
+            connections_count = pool.num_connections
+            reused_count = max(requests_count - connections_count, 0)
+            statistics[f'{pool.scheme}://{pool.host}:{pool.port}'] = {
+                'requests': requests_count,
+                'connections_opened': connections_count,
+                'connections_reused': reused_count,
+                'reuse_rate': (round(reused_count / requests_count, 4)
+                               if requests_count else 0.0),
+                'max_size': pool.pool.maxsize if pool.pool else 0,
+            }
+        return statistics
+
+
+def get_shared_session() -> ScraperSession:
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = ScraperSession()
+    return _shared_session
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Model
+from requests import Response
+
+from . import constances
+from .logger import build_logger
+from .stage_timer import StageTimer
+
+
+class ImageStore:
+    def __init__(
+            self,
+            *,
+            fetch: callable,
+            media_root: str = settings.MEDIA_ROOT,
+            directory: str = constances.IMAGE_DIRECTORY,
+            max_workers: int = constances.IMAGE_DOWNLOAD_WORKERS,
+            stage_timer: StageTimer = None,
+    ):
+        self.fetch = fetch
+        self.stage_timer = stage_timer if stage_timer is not None \
+            else StageTimer()
+        self.media_root = media_root
+        self.directory = directory
+        self.url_index_directory = os.path.join(media_root, directory,
+                                                constances.IMAGE_URL_INDEX)
+        os.makedirs(self.url_index_directory, exist_ok=True)
+        self.max_workers = max_workers
+        self.executor = None
+        self.futures_by_url = dict()
+        self.lock = threading.Lock()
+        self.records_done = threading.Condition(self.lock)
+        self.pending_records = 0
+        # (model, pk) -> stored path, written by the thread that calls wait()
+        self.stored_paths = dict()
+        self.counters = {
+            'downloaded': 0,
+            'url_hits': 0,
+            'content_duplicates': 0,
+            'failed': 0,
+        }
+        self.logger = build_logger()
+
+    def count(self, *, counter: str) -> None:
+        with self.lock:
+            self.counters[counter] += 1
+
+    def build_url_index_path(self, *, image_url: str) -> str:
+        url_hash = hashlib.sha256(image_url.encode()).hexdigest()
+        return os.path.join(self.url_index_directory, url_hash)
+
+    def lookup(self, *, image_url: str) -> str or None:
+        try:
+            with open(self.build_url_index_path(image_url=image_url)) as f:
+                stored_path = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if os.path.exists(os.path.join(self.media_root, stored_path)):
+            return stored_path
+        return None
+
+    def store(self, *, image_url: str) -> str:
+        stored_path = self.lookup(image_url=image_url)
+        if stored_path is not None:
+            self.count(counter='url_hits')
+            return stored_path
+
+        extension = os.path.splitext(urlsplit(image_url).path)[1] \
+            or constances.IMAGE_FORMAT
+        images_directory = os.path.join(self.media_root, self.directory)
+        with self.stage_timer.measure(
+                stage=constances.ScrapeStages.IMAGE_DOWNLOAD.value,
+                item_type=constances.IMAGE_ITEM_TYPE,
+        ):
+            content_hash = hashlib.sha256()
+            response: Response = self.fetch(url=image_url)
+            temporary_file = tempfile.NamedTemporaryFile(dir=images_directory,
+                                                         delete=False)
+            try:
+                with response, temporary_file:
+                    for chunk in response.iter_content(
+                            chunk_size=constances.IMAGE_CHUNK_SIZE
+                    ):
+                        content_hash.update(chunk)
+                        temporary_file.write(chunk)
+                stored_path = (f'{self.directory}/'
+                               f'{content_hash.hexdigest()}{extension}')
+                absolute_path = os.path.join(self.media_root, stored_path)
+                if os.path.exists(absolute_path):
+                    self.count(counter='content_duplicates')
+                    os.remove(temporary_file.name)
+                else:
+                    os.replace(temporary_file.name, absolute_path)
+                    self.count(counter='downloaded')
+            except BaseException:
+                if os.path.exists(temporary_file.name):
+                    os.remove(temporary_file.name)
+                raise
+
+        index_path = self.build_url_index_path(image_url=image_url)
+        with open(f'{index_path}.tmp', 'w') as f:
+            f.write(stored_path)
+        os.replace(f'{index_path}.tmp', index_path)
+        return stored_path
+
+    def run_store(self, *, image_url: str) -> str:
+        try:
+            return self.store(image_url=image_url)
+        finally:
+            # The fetch reaches the rate limiter, pool threads must not keep
+            # a connection open after the job
+            connection.close()
+
+    def submit(self, *, image_url: str, instance: Model) -> Future or None:
+        if not image_url:
+            return None
+        with self.lock:
+            future = self.futures_by_url.get(image_url)
+            if future is None:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers
+                    )
+                future = self.executor.submit(self.run_store,
+                                              image_url=image_url)
+                self.futures_by_url[image_url] = future
+            self.pending_records += 1
+        future.add_done_callback(partial(self.record,
+                                         model=type(instance),
+                                         pk=instance.pk))
+        return future
+
+    def record(self, future: Future, *, model: type[Model], pk: int) -> None:
+        try:
+            if future.exception() is not None:
+                self.count(counter='failed')
+                self.logger.error(f"Image download failed for "
+                                  f"{model.__name__} {pk}: "
+                                  f"{future.exception()}"
+                                  )
+                return
+            with self.lock:
+                self.stored_paths[(model, pk)] = future.result()
+        finally:
+            with self.records_done:
+                self.pending_records -= 1
+                self.records_done.notify_all()
+
+    def save_stored_paths(self) -> None:
+        with self.lock:
+            stored_paths = self.stored_paths
+            self.stored_paths = dict()
+        pks_by_path = dict()
+        for (model, pk), stored_path in stored_paths.items():
+            pks_by_path.setdefault((model, stored_path), list()).append(pk)
+        for (model, stored_path), pks in pks_by_path.items():
+            model.objects.filter(pk__in=pks).update(image=stored_path)
+
+    def wait(self) -> None:
+        # Callbacks run after a future resolves, so wait on them directly
+        with self.records_done:
+            self.records_done.wait_for(lambda: self.pending_records == 0)
+        self.save_stored_paths()
+        with self.lock:
+            executor = self.executor
+            self.executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def statistics(self) -> dict:
+        with self.lock:
+            return dict(self.counters)
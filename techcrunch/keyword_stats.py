@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.db.models import Count, Q, QuerySet
+
+from . import constances
+from .cache_versions import get_cache_version, bump_cache_version
+from .models import Keyword
+
+KEYWORD_STATS_VERSION_KEY = f'{constances.KEYWORD_STATS_CACHE_PREFIX}:version'
+SEARCH_ITEMS = 'searches__post_search_by_keyword_items'
+
+
+def invalidate_keyword_stats() -> None:
+    bump_cache_version(version_key=KEYWORD_STATS_VERSION_KEY)
+
+
+def build_keyword_stats_queryset() -> QuerySet:
+    # One join through searches to their items, so the item counts are not
+    # multiplied by anything else
+    return Keyword.objects.annotate(
+        search_count=Count('searches', distinct=True),
+        hit_count=Count(SEARCH_ITEMS),
+        scraped_count=Count(SEARCH_ITEMS, filter=Q(**{
+            f'{SEARCH_ITEMS}__is_scraped': True,
+        })),
+        pending_count=Count(SEARCH_ITEMS, filter=Q(**{
+            f'{SEARCH_ITEMS}__is_scraped': False,
+            f'{SEARCH_ITEMS}__is_active': True,
+        })),
+        # Items are deactivated once they run out of retries
+        failed_count=Count(SEARCH_ITEMS, filter=Q(**{
+            f'{SEARCH_ITEMS}__is_scraped': False,
+            f'{SEARCH_ITEMS}__is_active': False,
+        })),
+    ).values('id', 'title', 'created_at', 'search_count', 'hit_count',
+             'scraped_count', 'pending_count', 'failed_count')
+
+
+def fetch_keyword_stats_page(
+        *,
+        after_id: int = None,
+        before_id: int = None,
+        page_size: int = constances.HOME_KEYWORDS_PER_PAGE,
+) -> dict:
+    # Keyset on id, one row past the page tells whether there is more
+    queryset = build_keyword_stats_queryset()
+    if before_id is not None:
+        keywords = list(
+            queryset.filter(id__lt=before_id).order_by('-id')[:page_size + 1]
+        )
+        has_previous = len(keywords) > page_size
+        keywords = keywords[:page_size][::-1]
+        has_next = True
+    else:
+        if after_id is not None:
+            queryset = queryset.filter(id__gt=after_id)
+        keywords = list(queryset.order_by('id')[:page_size + 1])
+        has_next = len(keywords) > page_size
+        keywords = keywords[:page_size]
+        has_previous = after_id is not None
+    return {
+        'keywords': keywords,
+        'next_after': keywords[-1]['id'] if keywords and has_next else None,
+        'previous_before': (keywords[0]['id']
+                            if keywords and has_previous else None),
+    }
+
+
+def get_keyword_stats_page(
+        *,
+        after_id: int = None,
+        before_id: int = None,
+        page_size: int = constances.HOME_KEYWORDS_PER_PAGE,
+) -> dict:
+    version = get_cache_version(version_key=KEYWORD_STATS_VERSION_KEY)
+    cache_key = (f'{constances.KEYWORD_STATS_CACHE_PREFIX}:{version}:'
+                 f'{after_id}:{before_id}:{page_size}')
+    keyword_page = cache.get(cache_key)
+    if keyword_page is None:
+        keyword_page = fetch_keyword_stats_page(after_id=after_id,
+                                                before_id=before_id,
+                                                page_size=page_size)
+        cache.set(cache_key, keyword_page,
+                  constances.KEYWORD_STATS_CACHE_TIMEOUT)
+    return keyword_page
@@ -0,0 +1,26 @@
+from html.parser import HTMLParser
+
+
+class LinkSlugParser(HTMLParser):
+    def __init__(self, *, link_class: str):
+        super().__init__(convert_charrefs=True)
+        self.link_class = link_class
+        self.slugs = dict()
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag != 'a':
+            return
+        attributes = dict(attrs)
+        if self.link_class not in (attributes.get('class') or '').split():
+            return
+        link_parts_list = (attributes.get('href') or '').split('/')
+        if len(link_parts_list) > 1 and link_parts_list[-2]:
+            # A dict keeps the first position of slugs repeated on the page
+            self.slugs.setdefault(link_parts_list[-2])
+
+
+def extract_link_slugs(*, html_text: str, link_class: str) -> list[str]:
+    parser = LinkSlugParser(link_class=link_class)
+    parser.feed(html_text)
+    parser.close()
+    return list(parser.slugs)
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+
+from django.db.models import Model
+
+from . import constances
+
+
+class LookupCache:
+    def __init__(
+            self,
+            *,
+            model: type[Model],
+            max_size: int = constances.LOOKUP_CACHE_MAX_SIZE,
+    ):
+        self.model = model
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.memory_hits = 0
+        self.database_hits = 0
+        self.misses = 0
+
+    def get(self, *, id_on_techcrunch: int or str, fetch: callable) -> Model:
+        key = str(id_on_techcrunch)
+        instance = self.items.get(key)
+        if instance is not None:
+            self.items.move_to_end(key)
+            self.memory_hits += 1
+            return instance
+
+        instance = self.model.objects.filter(id_on_techcrunch=key).first()
+        if instance is not None:
+            self.database_hits += 1
+        else:
+            self.misses += 1
+            instance = fetch()
+        self.put(instance=instance)
+        return instance
+
+    def get_many(
+            self,
+            *,
+            ids_on_techcrunch: list,
+            fetch_many: callable,
+    ) -> list:
+        keys = list(dict.fromkeys(str(id_on_techcrunch)
+                                  for id_on_techcrunch in ids_on_techcrunch))
+        found_instances = dict()
+        for key in keys:
+            instance = self.items.get(key)
+            if instance is not None:
+                self.items.move_to_end(key)
+                self.memory_hits += 1
+                found_instances[key] = instance
+
+        missing_keys = [key for key in keys if key not in found_instances]
+        if missing_keys:
+            database_instances = self.model.objects.in_bulk(
+                missing_keys, field_name='id_on_techcrunch'
+            )
+            self.database_hits += len(database_instances)
+            found_instances.update(database_instances)
+            missing_keys = [key for key in missing_keys
+                            if key not in database_instances]
+        if missing_keys:
+            self.misses += len(missing_keys)
+            found_instances.update(fetch_many(missing_keys))
+
+        instances = list()
+        for key in keys:
+            instance = found_instances.get(key)
+            if instance is not None:
+                self.put(instance=instance)
+                instances.append(instance)
+        return instances
+
+    def put(self, *, instance: Model) -> None:
+        key = str(instance.id_on_techcrunch)
+        self.items[key] = instance
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def statistics(self) -> dict:
+        lookups = self.memory_hits + self.database_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'database_hits': self.database_hits,
+            'misses': self.misses,
+            'size': len(self.items),
+            'hit_rate': (round((lookups - self.misses) / lookups, 4)
+                         if lookups else 0.0),
+        }
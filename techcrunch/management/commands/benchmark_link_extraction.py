@@ -0,0 +1,118 @@
+import os
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup, SoupStrainer
+from django.core.management.base import BaseCommand
+
+from ... import constances
+from ...link_extraction import extract_link_slugs
+
+
+def build_synthetic_page(*, link_class: str, links: int) -> str:
+    blocks = ['<html><head><title>Results</title>',
+              '<script>window.config = {"a": "<div>"};</script>',
+              '<style>.thmb > img { width: 100% }</style></head><body>']
+    for index in range(links):
+        # Every post is linked twice, as the real pages do
+        slug = f'post-slug-{index % (links // 2 or 1)}'
+        blocks.append(
+            f'<div class="result"><ul class="meta"><li>Tag {index}</li>'
+            f'<li><span class="time">{index} hours ago</span></li></ul>'
+            f'<a class="{link_class}" href="https://techcrunch.com/2023/01/'
+            f'01/{slug}/"><img src="https://x/{index}.jpg" alt="Image"></a>'
+            f'<h4><a href="https://techcrunch.com/2023/01/01/{slug}/">Post '
+            f'&amp; title {index}</a></h4><p>{"Summary text. " * 30}</p>'
+            f'</div>'
+        )
+    blocks.append('</body></html>')
+    return ''.join(blocks)
+
+
+def extract_with_soup(*, html_text: str, link_class: str) -> list[str]:
+    soup = BeautifulSoup(html_text, features='html.parser')
+    return list(dict.fromkeys(
+        post_link['href'].split('/')[-2]
+        for post_link in soup.findAll(name='a', attrs={'class': link_class})
+    ))
+
+
+def extract_with_strainer(*, html_text: str, link_class: str) -> list[str]:
+    soup = BeautifulSoup(html_text, features='html.parser',
+                         parse_only=SoupStrainer(name='a',
+                                                 attrs={'class': link_class}))
+    return list(dict.fromkeys(post_link['href'].split('/')[-2]
+                              for post_link in soup.findAll(name='a')))
+
+
+EXTRACTORS = {
+    'full_soup': extract_with_soup,
+    'soup_strainer': extract_with_strainer,
+    'link_parser': extract_link_slugs,
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare parse time and peak memory of the full BeautifulSoup '
+            'tree, a SoupStrainer parse and the link slug parser on search '
+            'and homepage HTML.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixtures', default=None,
+                            help='Directory of saved pages; files named '
+                                 'search*.html use the search link class, '
+                                 'the rest the homepage link class')
+        parser.add_argument('--links', type=int, default=100)
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def load_fixtures(self, *, fixtures, links) -> list[tuple]:
+        if fixtures is None:
+            return [
+                (link_class, build_synthetic_page(link_class=link_class,
+                                                  links=links))
+                for link_class in [constances.SEARCH_ITEM_LINK_CLASS,
+                                   constances.DAILY_ITEM_LINK_CLASS]
+            ]
+        pages = list()
+        for file_name in sorted(os.listdir(fixtures)):
+            link_class = (constances.SEARCH_ITEM_LINK_CLASS
+                          if file_name.startswith('search')
+                          else constances.DAILY_ITEM_LINK_CLASS)
+            with open(os.path.join(fixtures, file_name),
+                      encoding='utf-8') as f:
+                pages.append((link_class, f.read()))
+        return pages
+
+    def handle(self, *args, fixtures, links, rounds, **options):
+        pages = self.load_fixtures(fixtures=fixtures, links=links)
+        expected_slugs = [extract_with_soup(html_text=html_text,
+                                            link_class=link_class)
+                          for link_class, html_text in pages]
+        self.stdout.write(
+            f'{len(pages)} pages, '
+            f'{sum(len(html_text) for _, html_text in pages):,} chars, '
+            f'{sum(len(slugs) for slugs in expected_slugs)} unique slugs'
+        )
+
+        for name, extract in EXTRACTORS.items():
+            mismatches = sum(
+                extract(html_text=html_text, link_class=link_class) != slugs
+                for (link_class, html_text), slugs in zip(pages,
+                                                          expected_slugs)
+            )
+            started_at = time.perf_counter()
+            for _ in range(rounds):
+                for link_class, html_text in pages:
+                    extract(html_text=html_text, link_class=link_class)
+            elapsed = (time.perf_counter() - started_at) / rounds
+
+            tracemalloc.start()
+            for link_class, html_text in pages:
+                extract(html_text=html_text, link_class=link_class)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f'{name:<14} {elapsed * 1000:>8.2f} ms/round '
+                f'{peak_memory / 1024:>10,.0f} KiB peak '
+                f'({mismatches} mismatches against full_soup)'
+            )
@@ -0,0 +1,114 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, \
+    teardown_test_environment
+
+from ...models import Post, Category, Author, PostCategory, PostAuthor
+from ...persistence import (
+    PostPersistencePipeline, bulk_upsert_categories, bulk_upsert_authors
+)
+
+
+class Command(BaseCommand):
+    help = ('Compare rows/sec of the per-row get_or_create path and the '
+            'bulk upsert pipeline on a throwaway test database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--categories-per-post', type=int, default=3)
+        parser.add_argument('--authors-per-post', type=int, default=1)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_database_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            self.run_benchmark(**options)
+        finally:
+            connection.creation.destroy_test_db(old_database_name,
+                                                verbosity=0)
+            teardown_test_environment()
+
+    def run_benchmark(self, *, posts, page_size, categories_per_post,
+                      authors_per_post, **options):
+        categories = list(bulk_upsert_categories(categories=[
+            Category(id_on_techcrunch=index, slug=f'category-{index}',
+                     name=f'Category {index}', post_count='0',
+                     description='', link='')
+            for index in range(categories_per_post * 5)
+        ]).values())
+        authors = list(bulk_upsert_authors(authors=[
+            Author(id_on_techcrunch=index, slug=f'author-{index}',
+                   name=f'Author {index}', description='', position='',
+                   link='', image_link='')
+            for index in range(authors_per_post * 5)
+        ]).values())
+
+        def build_rows(revision: int) -> list:
+            return [
+                (
+                    Post(id_on_techcrunch=index, slug=f'post-{index}',
+                         title=f'Post {index}',
+                         content=f'Content {index} revision {revision}',
+                         link='', image_link=''),
+                    [authors[(index + offset) % len(authors)]
+                     for offset in range(authors_per_post)],
+                    [categories[(index + offset) % len(categories)]
+                     for offset in range(categories_per_post)],
+                )
+                for index in range(posts)
+            ]
+
+        def legacy_persist(rows: list) -> None:
+            for post, post_authors, post_categories in rows:
+                post, _ = Post.objects.get_or_create(
+                    id_on_techcrunch=post.id_on_techcrunch,
+                    slug=post.slug,
+                    title=post.title,
+                    content=post.content,
+                    link=post.link,
+                    image_link=post.image_link,
+                    image=post.image,
+                )
+                for category in post_categories:
+                    PostCategory.objects.get_or_create(post=post,
+                                                       category=category)
+                for author in post_authors:
+                    PostAuthor.objects.get_or_create(post=post,
+                                                     author=author)
+
+        def bulk_persist(rows: list) -> None:
+            for index in range(0, len(rows), page_size):
+                pipeline = PostPersistencePipeline()
+                for post, post_authors, post_categories in \
+                        rows[index:index + page_size]:
+                    pipeline.add(post=post,
+                                 authors=post_authors,
+                                 categories=post_categories)
+                pipeline.flush()
+
+        def clear() -> None:
+            PostCategory.objects.all().delete()
+            PostAuthor.objects.all().delete()
+            Post.objects.all().delete()
+
+        # get_or_create matches on every column, so changed content would
+        # insert a duplicate row that the unique constraint now rejects
+        passes = {
+            'get_or_create': [(0, 'insert'), (0, 'rescrape')],
+            'bulk_upsert': [(0, 'insert'), (0, 'rescrape'), (1, 'update')],
+        }
+        for name, persist in [('get_or_create', legacy_persist),
+                              ('bulk_upsert', bulk_persist)]:
+            clear()
+            for revision, label in passes[name]:
+                started_at = time.perf_counter()
+                persist(build_rows(revision))
+                elapsed = time.perf_counter() - started_at
+                self.stdout.write(
+                    f'{name:<14} {label:<8} {posts} posts in '
+                    f'{elapsed:.3f}s => {posts / elapsed:,.0f} posts/sec '
+                    f'({Post.objects.count()} post rows stored)'
+                )
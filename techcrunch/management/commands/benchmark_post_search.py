@@ -0,0 +1,129 @@
+import itertools
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment, \
+    teardown_test_environment
+
+from ...models import Post
+from ...post_search import index_posts, search_posts
+
+
+def build_vocabulary(*, size: int, rng: random.Random) -> list[str]:
+    words = dict()
+    while len(words) < size:
+        word = ''.join(rng.choices(string.ascii_lowercase,
+                                   k=rng.randint(4, 9)))
+        words[word] = None
+    return list(words)
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database with synthetic posts, index '
+            'them through the incremental path and compare ranked '
+            'full-text search latency with an icontains scan.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--words-per-post', type=int, default=60)
+        parser.add_argument('--vocabulary', type=int, default=20000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--scan-rounds', type=int, default=3)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_database_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            self.run_benchmark(**options)
+        finally:
+            connection.creation.destroy_test_db(old_database_name,
+                                                verbosity=0)
+            teardown_test_environment()
+
+    def seed_posts(self, *, posts, words_per_post, vocabulary, batch_size,
+                   rng) -> None:
+        # Zipf-like word frequencies, like real text
+        cum_weights = list(itertools.accumulate(
+            1 / (rank + 1) for rank in range(len(vocabulary))
+        ))
+        seed_seconds = 0.0
+        index_seconds = 0.0
+        for start in range(0, posts, batch_size):
+            started_at = time.perf_counter()
+            Post.objects.bulk_create([
+                Post(id_on_techcrunch=str(index),
+                     slug=f'post-{index}',
+                     title=' '.join(rng.choices(vocabulary,
+                                                cum_weights=cum_weights,
+                                                k=6)),
+                     content=' '.join(rng.choices(vocabulary,
+                                                  cum_weights=cum_weights,
+                                                  k=words_per_post)))
+                for index in range(start, min(start + batch_size, posts))
+            ])
+            seed_seconds += time.perf_counter() - started_at
+            post_ids = list(Post.objects.filter(
+                id_on_techcrunch__in=[str(index) for index in range(
+                    start, min(start + batch_size, posts)
+                )],
+            ).values_list('id', flat=True))
+            started_at = time.perf_counter()
+            index_posts(post_ids=post_ids)
+            index_seconds += time.perf_counter() - started_at
+        self.stdout.write(
+            f'seeded {posts:,} posts in {seed_seconds:.1f}s, indexed in '
+            f'{index_seconds:.1f}s => {posts / index_seconds:,.0f} posts/sec'
+        )
+
+    def measure(self, *, search: callable, rounds: int) -> tuple:
+        durations = list()
+        result_count = 0
+        for _ in range(rounds):
+            started_at = time.perf_counter()
+            result_count = len(search())
+            durations.append((time.perf_counter() - started_at) * 1000)
+        durations.sort()
+        p95 = durations[min(len(durations) - 1,
+                            int(len(durations) * 0.95))]
+        return statistics.median(durations), p95, result_count
+
+    def run_benchmark(self, *, posts, words_per_post, vocabulary,
+                      batch_size, rounds, scan_rounds, **options):
+        rng = random.Random(0)
+        words = build_vocabulary(size=vocabulary, rng=rng)
+        self.seed_posts(posts=posts, words_per_post=words_per_post,
+                        vocabulary=words, batch_size=batch_size, rng=rng)
+
+        queries = {
+            'common term': words[0],
+            'mid term': words[len(words) // 50],
+            'rare term': words[-1],
+            'two terms': f'{words[3]} {words[len(words) // 20]}',
+        }
+        self.stdout.write(f'{connection.vendor} full-text search, '
+                          f'{rounds} rounds, icontains {scan_rounds} rounds')
+        for name, query in queries.items():
+            search_median, search_p95, search_count = self.measure(
+                search=lambda: search_posts(query=query),
+                rounds=rounds,
+            )
+            # The admin style scan on the first term, for comparison
+            scan_median, _, _ = self.measure(
+                search=lambda: list(Post.objects.filter(
+                    Q(title__icontains=query.split()[0])
+                    | Q(content__icontains=query.split()[0])
+                ).order_by('-id')[:50]),
+                rounds=scan_rounds,
+            )
+            self.stdout.write(
+                f'{name:<12} {query!r:<22} full-text p50 '
+                f'{search_median:>8.2f} ms p95 {search_p95:>8.2f} ms '
+                f'({search_count} results) icontains p50 '
+                f'{scan_median:>9.2f} ms'
+            )
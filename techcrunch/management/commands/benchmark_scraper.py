@@ -0,0 +1,196 @@
+import os
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, \
+    teardown_test_environment, CaptureQueriesContext
+
+from ... import constances
+from ...http_session import ScraperSession, build_retry
+from ...image_store import ImageStore
+from ...models import (
+    Post, Category, Author, Keyword, SearchByKeyword,
+    PostSearchByKeywordItem, PostSearchDailyItem
+)
+from ...rate_limiter import HostRateLimiter, LocalTokenBucketBackend
+from ...replay_transport import RecordingAdapter, ReplayAdapter
+from ...scraper_handler import TCScraperHandler
+from ...work_queue import apply_scrape_results
+
+BENCHMARK_PATHS = ['posts', 'categories', 'authors', 'keyword', 'daily']
+
+
+def scrape_pages(*, scraper_handler: TCScraperHandler, item_type: str,
+                 pages: int, **options) -> None:
+    scraper_handler.scrape_page_range(item_type=item_type,
+                                      pages=range(1, pages + 1))
+
+
+def scrape_pending_items(*, scraper_handler: TCScraperHandler,
+                         model) -> None:
+    items = list(model.objects.filter(is_scraped=False))
+    posts_by_slug = scraper_handler.scrape_posts_with_slugs(
+        post_slugs=[item.slug for item in items]
+    )
+    apply_scrape_results(model=model, items=items,
+                         posts_by_slug=posts_by_slug)
+
+
+def scrape_keyword(*, scraper_handler: TCScraperHandler, keyword: str,
+                   pages: int, **options) -> None:
+    # The search task followed by the batch task that scrapes its hits
+    keyword, _ = Keyword.objects.get_or_create(title=keyword)
+    search_by_keyword = SearchByKeyword.objects.create(keyword=keyword,
+                                                       page_count=pages)
+    scraper_handler.search_by_keyword(
+        search_by_keyword_instance=search_by_keyword
+    )
+    scrape_pending_items(scraper_handler=scraper_handler,
+                         model=PostSearchByKeywordItem)
+
+
+def scrape_daily(*, scraper_handler: TCScraperHandler, **options) -> None:
+    scraper_handler.daily_search()
+    scrape_pending_items(scraper_handler=scraper_handler,
+                         model=PostSearchDailyItem)
+
+
+BENCHMARKS = {
+    'posts': partial(scrape_pages,
+                     item_type=constances.ItemTypes.POST.value),
+    'categories': partial(scrape_pages,
+                          item_type=constances.ItemTypes.CATEGORY.value),
+    'authors': partial(scrape_pages,
+                       item_type=constances.ItemTypes.AUTHOR.value),
+    'keyword': scrape_keyword,
+    'daily': scrape_daily,
+}
+
+
+class Command(BaseCommand):
+    help = ('Replay recorded API, search and homepage responses through '
+            'TCScraperHandler on a throwaway test database and report '
+            'items/sec, requests, SQL queries and peak memory per path. '
+            'Run once with --record to save the fixtures; replay must use '
+            'the same --pages and --keyword.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixtures',
+                            default=os.path.join(settings.BASE_DIR,
+                                                 'benchmark_fixtures'))
+        parser.add_argument('--record', action='store_true',
+                            help='Fetch from techcrunch.com and save every '
+                                 'response into --fixtures')
+        parser.add_argument('--paths', nargs='+', choices=BENCHMARK_PATHS,
+                            default=BENCHMARK_PATHS)
+        parser.add_argument('--pages', type=int, default=2)
+        parser.add_argument('--keyword', default='ai')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_database_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            for path in options['paths']:
+                self.run_path(path=path, **options)
+        finally:
+            connection.creation.destroy_test_db(old_database_name,
+                                                verbosity=0)
+            teardown_test_environment()
+
+    def build_handler(self, *, fixtures, record,
+                      media_root) -> tuple[TCScraperHandler, object]:
+        session = ScraperSession()
+        if record:
+            adapter = RecordingAdapter(directory=fixtures,
+                                       max_retries=build_retry())
+            rate_limiter = HostRateLimiter(backend=LocalTokenBucketBackend())
+        else:
+            adapter = ReplayAdapter(directory=fixtures)
+            # Replay has no server to be polite to
+            rate_limiter = HostRateLimiter(backend=LocalTokenBucketBackend(),
+                                           requests_per_second=10 ** 9,
+                                           burst=10 ** 9,
+                                           host_overrides=dict())
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        scraper_handler = TCScraperHandler(
+            url_for_scrap=constances.URL_FOR_SCRAPE,
+            search_url=constances.SEARCH_URL,
+            session=session,
+            rate_limiter=rate_limiter,
+        )
+        # Every request has to reach the transport to be replayed
+        scraper_handler.http_cache = None
+        scraper_handler.image_store = ImageStore(
+            fetch=partial(scraper_handler.url_request, stream=True,
+                          item_type=constances.IMAGE_ITEM_TYPE),
+            media_root=media_root,
+            stage_timer=scraper_handler.stage_timer,
+        )
+        return scraper_handler, adapter
+
+    def run_once(self, *, path, **options) -> dict:
+        call_command('flush', interactive=False, verbosity=0)
+        # A fresh image directory, so no run reuses an earlier download
+        with tempfile.TemporaryDirectory() as media_root:
+            scraper_handler, adapter = self.build_handler(
+                fixtures=options['fixtures'],
+                record=options['record'],
+                media_root=media_root,
+            )
+            started_at = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                BENCHMARKS[path](scraper_handler=scraper_handler, **options)
+                scraper_handler.wait_for_images()
+            seconds = time.perf_counter() - started_at
+        return {
+            'seconds': seconds,
+            # Image rows are mostly updated on download threads, uncaptured
+            'query_count': len(queries),
+            'request_count': adapter.request_count,
+            'missing_urls': getattr(adapter, 'missing_urls', list()),
+            'post_count': Post.objects.count(),
+            'category_count': Category.objects.count(),
+            'author_count': Author.objects.count(),
+        }
+
+    def run_path(self, *, path, **options) -> None:
+        try:
+            result = self.run_once(path=path, **options)
+        except Exception as e:
+            # Usually a replay with other --pages / --keyword than recorded
+            self.stderr.write(f'{path:<10} failed: {e}')
+            return
+        if options['record']:
+            # Peak memory comes from a replay of what was just recorded
+            options = {**options, 'record': False}
+        tracemalloc.start()
+        self.run_once(path=path, **options)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        item_count = {
+            'categories': result['category_count'],
+            'authors': result['author_count'],
+        }.get(path, result['post_count'])
+        item_name = path if path in ['categories', 'authors'] else 'posts'
+        per_item = max(item_count, 1)
+        self.stdout.write(
+            f'{path:<10} {item_count:>5} {item_name:<10} in '
+            f'{result["seconds"]:>7.3f}s => '
+            f'{item_count / result["seconds"]:>8,.0f} items/sec '
+            f'{result["request_count"] / per_item:>6.2f} requests/item '
+            f'{result["query_count"] / per_item:>7.2f} queries/item '
+            f'{peak_memory / 1024:>8,.0f} KiB peak'
+        )
+        if result['missing_urls']:
+            self.stderr.write(
+                f'{path:<10} {len(result["missing_urls"])} requests had no '
+                f'fixture, e.g. {result["missing_urls"][0]}'
+            )
@@ -0,0 +1,86 @@
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...text_extraction import TEXT_EXTRACTION_BACKENDS
+
+REFERENCE_BACKEND = 'beautifulsoup'
+
+WORDS = ['startup', 'raised', 'funding', 'investors', 'model', '&amp;',
+         '&nbsp;', '&#8217;', '&#8220;quoted&#8221;', '&hellip;',
+         'caf&eacute;', '5 < 6', 'a&b', 'AT&T', '&unknown;', 'the']
+
+
+def build_synthetic_document(*, generator: random.Random) -> str:
+    blocks = list()
+    for _ in range(generator.randint(1, 30)):
+        text = ' '.join(generator.choice(WORDS)
+                        for _ in range(generator.randint(5, 40)))
+        blocks.append(generator.choice([
+            f'<p>{text}</p>\n',
+            f'<h2 id="section">{text}</h2>\n',
+            '<figure class="wp-block-image"><img src="https://x/y.jpg?w=1'
+            f'&amp;h=2" alt="a > b"/><figcaption>{text}</figcaption>'
+            '</figure>\n',
+            f'<ul>\n<li>{text}</li>\n<li><a href="https://x/?a=1&b=2">'
+            f'{text}</a></li>\n</ul>\n',
+            f'<!-- wp:paragraph -->\n<p>{text}</p>\n<!-- /wp:paragraph -->\n',
+            '<script type="text/javascript">var a = "<p>x</p>"; '
+            'if (a < b && c > d) {}</script>\n',
+            '<style>.a > .b { color: red }</style>\n',
+            f'<blockquote class="twitter-tweet"><p lang="en">{text}</p>'
+            '&mdash; X (@x) <a href="#">May 1</a></blockquote>\n',
+            f'<p><strong>{text}</strong> <em>{text}</em><br>\n{text}</p>\n',
+        ]))
+    return ''.join(blocks)
+
+
+class Command(BaseCommand):
+    help = ('Check every HTML-to-text backend against BeautifulSoup and '
+            'report chars/sec per backend.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', default=None,
+                            help='Directory of HTML files to extract from')
+        parser.add_argument('--documents', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=3)
+
+    def load_corpus(self, *, corpus, documents) -> list[str]:
+        if corpus is None:
+            generator = random.Random(0)
+            return [build_synthetic_document(generator=generator)
+                    for _ in range(documents)]
+        html_texts = list()
+        for file_name in sorted(os.listdir(corpus)):
+            with open(os.path.join(corpus, file_name),
+                      encoding='utf-8') as f:
+                html_texts.append(f.read())
+        return html_texts
+
+    def handle(self, *args, corpus, documents, rounds, **options):
+        html_texts = self.load_corpus(corpus=corpus, documents=documents)
+        total_chars = sum(len(html_text) for html_text in html_texts)
+        reference = TEXT_EXTRACTION_BACKENDS[REFERENCE_BACKEND]
+        expected_texts = [reference(html_text=html_text)
+                          for html_text in html_texts]
+        self.stdout.write(f'{len(html_texts)} documents, '
+                          f'{total_chars:,} chars')
+
+        for name, extract in TEXT_EXTRACTION_BACKENDS.items():
+            mismatches = sum(
+                extract(html_text=html_text) != expected_text
+                for html_text, expected_text in zip(html_texts,
+                                                    expected_texts)
+            )
+            started_at = time.perf_counter()
+            for _ in range(rounds):
+                for html_text in html_texts:
+                    extract(html_text=html_text)
+            elapsed = time.perf_counter() - started_at
+            self.stdout.write(
+                f'{name:<14} {total_chars * rounds / elapsed:>14,.0f} '
+                f'chars/sec ({mismatches} mismatches against '
+                f'{REFERENCE_BACKEND})'
+            )
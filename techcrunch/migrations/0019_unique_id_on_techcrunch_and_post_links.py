@@ -0,0 +1,109 @@
+# Generated by Django 4.2 on 2026-10-18 09:02
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+# model name -> (FK references, M2M references) that must follow the kept row
+DUPLICATE_REFERENCES = {
+    'post': (
+        [('postcategory', 'post'), ('postauthor', 'post'),
+         ('postsearchbykeyworditem', 'post'),
+         ('postsearchdailyitem', 'post')],
+        [('autoscrappostitem', 'posts')],
+    ),
+    'category': (
+        [('postcategory', 'category')],
+        [('autoscrapcategoryitem', 'categories')],
+    ),
+    'author': (
+        [('postauthor', 'author')],
+        [('autoscrapauthoritem', 'authors')],
+    ),
+}
+
+
+def merge_duplicated_items(apps, schema_editor):
+    for model_name, (references, m2m_references) in \
+            DUPLICATE_REFERENCES.items():
+        model = apps.get_model('techcrunch', model_name)
+        duplicated_rows = model.objects.values('id_on_techcrunch').annotate(
+            row_count=Count('id'),
+            kept_id=Max('id'),
+        ).filter(row_count__gt=1)
+        for duplicated_row in duplicated_rows:
+            kept_id = duplicated_row['kept_id']
+            duplicate_ids = list(
+                model.objects.filter(
+                    id_on_techcrunch=duplicated_row['id_on_techcrunch'],
+                ).exclude(id=kept_id).values_list('id', flat=True)
+            )
+            for reference_model_name, field_name in references:
+                apps.get_model('techcrunch', reference_model_name).objects \
+                    .filter(**{f'{field_name}_id__in': duplicate_ids}) \
+                    .update(**{f'{field_name}_id': kept_id})
+            for owner_model_name, field_name in m2m_references:
+                through = getattr(
+                    apps.get_model('techcrunch', owner_model_name),
+                    field_name,
+                ).through
+                for owner_id in through.objects.filter(
+                        **{f'{model_name}_id__in': duplicate_ids}
+                ).values_list(f'{owner_model_name}_id', flat=True):
+                    through.objects.get_or_create(**{
+                        f'{owner_model_name}_id': owner_id,
+                        f'{model_name}_id': kept_id,
+                    })
+            model.objects.filter(id__in=duplicate_ids).delete()
+
+    for link_model_name, field_name in [('postcategory', 'category'),
+                                        ('postauthor', 'author')]:
+        link_model = apps.get_model('techcrunch', link_model_name)
+        duplicated_links = link_model.objects.values(
+            'post_id', f'{field_name}_id',
+        ).annotate(
+            row_count=Count('id'),
+            kept_id=Min('id'),
+        ).filter(row_count__gt=1)
+        for duplicated_link in duplicated_links:
+            link_model.objects.filter(
+                post_id=duplicated_link['post_id'],
+                **{f'{field_name}_id': duplicated_link[f'{field_name}_id']},
+            ).exclude(id=duplicated_link['kept_id']).delete()
+
+
+class Migration(migrations.Migration):
+    # The merge rewrites FK columns, which leaves deferred FK trigger events
+    # on PostgreSQL, and ALTER TABLE refuses to run in that transaction. So
+    # the merge commits in its own transaction before the constraints.
+    atomic = False
+
+    dependencies = [
+        ('techcrunch', '0018_alter_post_image_postsearchdailyitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicated_items,
+                             migrations.RunPython.noop,
+                             atomic=True),
+        migrations.AddConstraint(
+            model_name='author',
+            constraint=models.UniqueConstraint(fields=('id_on_techcrunch',), name='unique_author_id_on_techcrunch'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('id_on_techcrunch',), name='unique_category_id_on_techcrunch'),
+        ),
+        migrations.AddConstraint(
+            model_name='post',
+            constraint=models.UniqueConstraint(fields=('id_on_techcrunch',), name='unique_post_id_on_techcrunch'),
+        ),
+        migrations.AddConstraint(
+            model_name='postauthor',
+            constraint=models.UniqueConstraint(fields=('post', 'author'), name='unique_post_author'),
+        ),
+        migrations.AddConstraint(
+            model_name='postcategory',
+            constraint=models.UniqueConstraint(fields=('post', 'category'), name='unique_post_category'),
+        ),
+    ]
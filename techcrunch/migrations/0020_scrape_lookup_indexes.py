@@ -0,0 +1,53 @@
+# Generated by Django 4.2 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('techcrunch', '0019_unique_id_on_techcrunch_and_post_links'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['slug'], name='author_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='autoscrapauthoritem',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_scraped', False)), fields=['id'], name='auto_author_item_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='autoscrapcategoryitem',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_scraped', False)), fields=['id'], name='auto_category_item_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='autoscrappostitem',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_scraped', False)), fields=['id'], name='auto_post_item_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['slug'], name='category_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['slug'], name='post_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postsearchbykeyworditem',
+            index=models.Index(fields=['slug'], name='search_item_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postsearchbykeyworditem',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_scraped', False)), fields=['id'], name='search_item_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postsearchdailyitem',
+            index=models.Index(fields=['slug'], name='daily_item_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postsearchdailyitem',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_scraped', False)), fields=['id'], name='daily_item_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('techcrunch', '0020_scrape_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postsearchbykeyworditem',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Leased until'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 09:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def delete_duplicated_search_items(apps, schema_editor):
+    search_item_model = apps.get_model('techcrunch',
+                                       'postsearchbykeyworditem')
+    duplicated_rows = search_item_model.objects.values(
+        'search_by_keyword_id', 'slug',
+    ).annotate(row_count=Count('id')).filter(row_count__gt=1)
+    for duplicated_row in duplicated_rows:
+        search_items = search_item_model.objects.filter(
+            search_by_keyword_id=duplicated_row['search_by_keyword_id'],
+            slug=duplicated_row['slug'],
+        )
+        # Keep a row that already points at its post
+        kept_item = search_items.order_by('-is_scraped', 'id').first()
+        search_items.exclude(id=kept_item.id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('techcrunch', '0021_postsearchbykeyworditem_leased_until'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicated_search_items,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='postsearchbykeyworditem',
+            constraint=models.UniqueConstraint(fields=('search_by_keyword', 'slug'), name='unique_search_item_slug'),
+        ),
+    ]
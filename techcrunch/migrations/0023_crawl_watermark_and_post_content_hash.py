@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('techcrunch', '0022_unique_search_item_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Is Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('item_type', models.CharField(max_length=50, verbose_name='Item type')),
+                ('category_id', models.CharField(blank=True, default='', max_length=20, verbose_name='Category ID on Techcrunch')),
+                ('modified_after', models.CharField(blank=True, default='', max_length=32, verbose_name='Modified after')),
+            ],
+            options={
+                'verbose_name': 'Crawl Watermark',
+                'verbose_name_plural': 'Crawl Watermarks',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Content hash'),
+        ),
+        migrations.AddConstraint(
+            model_name='crawlwatermark',
+            constraint=models.UniqueConstraint(fields=('item_type', 'category_id'), name='unique_crawl_watermark'),
+        ),
+    ]
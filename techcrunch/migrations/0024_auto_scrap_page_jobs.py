@@ -0,0 +1,87 @@
+# Generated by Django 4.2 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+def number_existing_page_items(apps, schema_editor):
+    # Items created before page jobs have no page, so they take consecutive
+    # pages of their auto scrap in creation order
+    for model_name in ['autoscrappostitem', 'autoscrapcategoryitem',
+                       'autoscrapauthoritem']:
+        item_model = apps.get_model('techcrunch', model_name)
+        next_pages = dict()
+        for item in item_model.objects.select_related('auto_scrap') \
+                .order_by('id'):
+            page = next_pages.get(item.auto_scrap_id,
+                                  item.auto_scrap.page_start)
+            item_model.objects.filter(id=item.id).update(page=page)
+            next_pages[item.auto_scrap_id] = page + 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('techcrunch', '0023_crawl_watermark_and_post_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='autoscrap',
+            name='category_id',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='Category ID on Techcrunch'),
+        ),
+        migrations.AddField(
+            model_name='autoscrap',
+            name='next_page',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Next page'),
+        ),
+        migrations.AddField(
+            model_name='autoscrapauthoritem',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Leased until'),
+        ),
+        migrations.AddField(
+            model_name='autoscrapauthoritem',
+            name='page',
+            field=models.IntegerField(default=1, verbose_name='Page'),
+        ),
+        migrations.AddField(
+            model_name='autoscrapcategoryitem',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Leased until'),
+        ),
+        migrations.AddField(
+            model_name='autoscrapcategoryitem',
+            name='page',
+            field=models.IntegerField(default=1, verbose_name='Page'),
+        ),
+        migrations.AddField(
+            model_name='autoscrappostitem',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Leased until'),
+        ),
+        migrations.AddField(
+            model_name='autoscrappostitem',
+            name='page',
+            field=models.IntegerField(default=1, verbose_name='Page'),
+        ),
+        migrations.AlterField(
+            model_name='autoscrap',
+            name='field',
+            field=models.CharField(choices=[('posts', 'Post'), ('categories', 'Category'), ('users', 'Author')], max_length=250, verbose_name='field'),
+        ),
+        migrations.RunPython(number_existing_page_items,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='autoscrapauthoritem',
+            constraint=models.UniqueConstraint(fields=('auto_scrap', 'page'), name='unique_auto_scrap_author_item_page'),
+        ),
+        migrations.AddConstraint(
+            model_name='autoscrapcategoryitem',
+            constraint=models.UniqueConstraint(fields=('auto_scrap', 'page'), name='unique_auto_scrap_category_item_page'),
+        ),
+        migrations.AddConstraint(
+            model_name='autoscrappostitem',
+            constraint=models.UniqueConstraint(fields=('auto_scrap', 'page'), name='unique_auto_scrap_post_item_page'),
+        ),
+    ]
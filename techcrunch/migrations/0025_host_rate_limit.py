@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('techcrunch', '0024_auto_scrap_page_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostRateLimit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Is Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('host', models.CharField(max_length=250, verbose_name='Host')),
+                ('tokens', models.FloatField(default=0, verbose_name='Tokens')),
+                ('refilled_at', models.FloatField(default=0, verbose_name='Refilled at')),
+                ('blocked_until', models.FloatField(default=0, verbose_name='Blocked until')),
+            ],
+            options={
+                'verbose_name': 'Host Rate Limit',
+                'verbose_name_plural': 'Host Rate Limits',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hostratelimit',
+            constraint=models.UniqueConstraint(fields=('host',), name='unique_host_rate_limit_host'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 09:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('techcrunch', '0025_host_rate_limit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Is Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('model_label', models.CharField(max_length=100, verbose_name='Model')),
+                ('object_ids', models.JSONField(blank=True, default=list, verbose_name='Object IDs')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('finished', 'Finished'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status')),
+                ('total_count', models.IntegerField(default=0, verbose_name='Total count')),
+                ('exported_count', models.IntegerField(default=0, verbose_name='Exported count')),
+                ('file', models.FileField(blank=True, upload_to='exports/', verbose_name='File')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Export Job',
+                'verbose_name_plural': 'Export Jobs',
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+from django.db import migrations
+
+SQLITE_CREATE_STATEMENTS = [
+    "CREATE VIRTUAL TABLE techcrunch_post_search USING fts5("
+    "title, content, authors, categories, "
+    "tokenize = 'porter unicode61 remove_diacritics 2')",
+    # FTS5 tables can't hold a foreign key, so deletes are mirrored
+    "CREATE TRIGGER techcrunch_post_search_delete "
+    "AFTER DELETE ON techcrunch_post BEGIN "
+    "DELETE FROM techcrunch_post_search WHERE rowid = old.id; END",
+    "INSERT INTO techcrunch_post_search "
+    "(rowid, title, content, authors, categories) "
+    "SELECT post.id, post.title, post.content, "
+    "COALESCE((SELECT group_concat(author.name, ' ') "
+    "FROM techcrunch_postauthor post_author "
+    "JOIN techcrunch_author author ON author.id = post_author.author_id "
+    "WHERE post_author.post_id = post.id), ''), "
+    "COALESCE((SELECT group_concat(category.name, ' ') "
+    "FROM techcrunch_postcategory post_category "
+    "JOIN techcrunch_category category "
+    "ON category.id = post_category.category_id "
+    "WHERE post_category.post_id = post.id), '') "
+    "FROM techcrunch_post post",
+]
+SQLITE_DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS techcrunch_post_search_delete",
+    "DROP TABLE IF EXISTS techcrunch_post_search",
+]
+
+POSTGRESQL_CREATE_STATEMENTS = [
+    "CREATE TABLE techcrunch_post_search ("
+    "post_id bigint PRIMARY KEY "
+    "REFERENCES techcrunch_post (id) ON DELETE CASCADE, "
+    "document tsvector NOT NULL)",
+    "INSERT INTO techcrunch_post_search (post_id, document) "
+    "SELECT post.id, "
+    "setweight(to_tsvector('english', post.title), 'A') || "
+    "setweight(to_tsvector('english', post.content), 'B') || "
+    "setweight(to_tsvector('english', "
+    "COALESCE((SELECT string_agg(author.name, ' ') "
+    "FROM techcrunch_postauthor post_author "
+    "JOIN techcrunch_author author ON author.id = post_author.author_id "
+    "WHERE post_author.post_id = post.id), '') || ' ' || "
+    "COALESCE((SELECT string_agg(category.name, ' ') "
+    "FROM techcrunch_postcategory post_category "
+    "JOIN techcrunch_category category "
+    "ON category.id = post_category.category_id "
+    "WHERE post_category.post_id = post.id), '')), 'C') "
+    "FROM techcrunch_post post",
+    # Built after the backfill, which is faster than updating it row by row
+    "CREATE INDEX techcrunch_post_search_document_idx "
+    "ON techcrunch_post_search USING GIN (document)",
+]
+POSTGRESQL_DROP_STATEMENTS = [
+    "DROP TABLE IF EXISTS techcrunch_post_search",
+]
+
+
+def run_statements(schema_editor, statements_by_vendor: dict) -> None:
+    statements = statements_by_vendor.get(schema_editor.connection.vendor,
+                                          list())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_post_search_table(apps, schema_editor):
+    run_statements(schema_editor, {
+        'sqlite': SQLITE_CREATE_STATEMENTS,
+        'postgresql': POSTGRESQL_CREATE_STATEMENTS,
+    })
+
+
+def drop_post_search_table(apps, schema_editor):
+    run_statements(schema_editor, {
+        'sqlite': SQLITE_DROP_STATEMENTS,
+        'postgresql': POSTGRESQL_DROP_STATEMENTS,
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('techcrunch', '0026_export_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_post_search_table,
+                             drop_post_search_table),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('techcrunch', '0027_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='autoscrap',
+            name='total_pages',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Total pages'),
+        ),
+    ]
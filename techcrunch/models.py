@@ -9,6 +9,8 @@ from urllib.request import urlopen
 from django.core.files import File
 import os
 
+from .constances import ItemTypes, ExportJobStatuses
+
 # Create your models here.
 User = get_user_model()
 
@@ -69,6 +71,15 @@ class Author(BaseModel):
     class Meta:
         verbose_name = 'Author'
         verbose_name_plural = 'Authors'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['id_on_techcrunch'],
+                name='unique_author_id_on_techcrunch',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['slug'], name='author_slug_idx'),
+        ]
 
     def __str__(self):
         return f'Author: {self.name}, {self.position}'
@@ -133,6 +144,15 @@ class Category(BaseModel):
     class Meta:
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['id_on_techcrunch'],
+                name='unique_category_id_on_techcrunch',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['slug'], name='category_slug_idx'),
+        ]
 
     def __str__(self):
         return f'Category: {self.name}'
@@ -171,10 +191,25 @@ class Post(BaseModel):
     image = models.ImageField(upload_to='images/',
                               default=f'image.png',
                               blank=True)
+    content_hash = models.CharField(max_length=64,
+                                    blank=True,
+                                    null=False,
+                                    default='',
+                                    verbose_name="Content hash",
+                                    )
 
     class Meta:
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['id_on_techcrunch'],
+                name='unique_post_id_on_techcrunch',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['slug'], name='post_slug_idx'),
+        ]
 
     def __str__(self):
         return f'Post: {self.title}'
@@ -195,6 +230,12 @@ class PostCategory(BaseModel):
     class Meta:
         verbose_name = 'Post Category'
         verbose_name_plural = 'Post Categories'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'category'],
+                name='unique_post_category',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.post.title}({self.category.name})'
@@ -215,6 +256,12 @@ class PostAuthor(BaseModel):
     class Meta:
         verbose_name = 'Post Author'
         verbose_name_plural = 'Post Authors'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'author'],
+                name='unique_post_author',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.post.title}({self.author.name})'
@@ -286,10 +333,28 @@ class PostSearchByKeywordItem(BaseModel):
                                      null=False,
                                      verbose_name="Fail count",
                                      )
+    leased_until = models.DateTimeField(blank=True,
+                                        null=True,
+                                        verbose_name="Leased until",
+                                        )
 
     class Meta:
         verbose_name = 'Post Search By Keyword Item'
         verbose_name_plural = 'Post Search By Keyword Items'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['search_by_keyword', 'slug'],
+                name='unique_search_item_slug',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['slug'], name='search_item_slug_idx'),
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_scraped=False, is_active=True),
+                name='search_item_pending_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'Post Search By Keyword : slug = {self.slug}'
@@ -323,17 +388,99 @@ class PostSearchDailyItem(BaseModel):
     class Meta:
         verbose_name = 'Post Search Daily Item'
         verbose_name_plural = 'Post Search Daily Items'
+        indexes = [
+            models.Index(fields=['slug'], name='daily_item_slug_idx'),
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_scraped=False, is_active=True),
+                name='daily_item_pending_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'Post Search Daily : slug = {self.slug}'
 
 
+class CrawlWatermark(BaseModel):
+    item_type = models.CharField(max_length=50,
+                                 blank=False,
+                                 null=False,
+                                 verbose_name="Item type",
+                                 )
+    category_id = models.CharField(max_length=20,
+                                   blank=True,
+                                   null=False,
+                                   default='',
+                                   verbose_name="Category ID on Techcrunch",
+                                   )
+    # The site-local "modified" value of the newest item crawled so far
+    modified_after = models.CharField(max_length=32,
+                                      blank=True,
+                                      null=False,
+                                      default='',
+                                      verbose_name="Modified after",
+                                      )
+
+    class Meta:
+        verbose_name = 'Crawl Watermark'
+        verbose_name_plural = 'Crawl Watermarks'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['item_type', 'category_id'],
+                name='unique_crawl_watermark',
+            ),
+        ]
+
+    def __str__(self):
+        return (f'Crawl watermark {self.item_type} '
+                f'{self.category_id}: {self.modified_after}')
+
+
+class HostRateLimit(BaseModel):
+    host = models.CharField(max_length=250,
+                            blank=False,
+                            null=False,
+                            verbose_name="Host",
+                            )
+    # Epoch seconds, so every worker reads them the same way
+    tokens = models.FloatField(default=0,
+                               verbose_name="Tokens",
+                               )
+    refilled_at = models.FloatField(default=0,
+                                    verbose_name="Refilled at",
+                                    )
+    blocked_until = models.FloatField(default=0,
+                                      verbose_name="Blocked until",
+                                      )
+
+    class Meta:
+        verbose_name = 'Host Rate Limit'
+        verbose_name_plural = 'Host Rate Limits'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['host'],
+                name='unique_host_rate_limit_host',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Host rate limit {self.host}: {self.tokens:.2f} tokens'
+
+
 class AutoScrap(BaseModel):
     field = models.CharField(max_length=250,
                              blank=False,
                              null=False,
+                             choices=[(item_type.value, item_type.name.title())
+                                      for item_type in ItemTypes],
                              verbose_name="field",
                              )
+    category_id = models.CharField(max_length=20,
+                                   blank=True,
+                                   null=False,
+                                   default='',
+                                   verbose_name="Category ID on Techcrunch",
+                                   )
     page_start = models.IntegerField(
         default=1,
         blank=False,
@@ -346,6 +493,17 @@ class AutoScrap(BaseModel):
         null=False,
         verbose_name="Page count",
     )
+    # The first page that has no page item yet
+    next_page = models.IntegerField(blank=True,
+                                    null=True,
+                                    verbose_name="Next page",
+                                    )
+    # X-WP-TotalPages as last seen by a page worker, on the row so the
+    # planner sees it whichever process scraped the page
+    total_pages = models.IntegerField(blank=True,
+                                      null=True,
+                                      verbose_name="Total pages",
+                                      )
 
     class Meta:
         verbose_name = 'Auto scrap'
@@ -379,9 +537,32 @@ class AutoScrapPostItem(BaseModel):
                                      verbose_name="Fail count",
                                      )
 
+    page = models.IntegerField(default=1,
+                               blank=False,
+                               null=False,
+                               verbose_name="Page",
+                               )
+    leased_until = models.DateTimeField(blank=True,
+                                        null=True,
+                                        verbose_name="Leased until",
+                                        )
+
     class Meta:
         verbose_name = 'Auto Scrap Post Item'
         verbose_name_plural = 'Auto Scrap Post Items'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['auto_scrap', 'page'],
+                name='unique_auto_scrap_post_item_page',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_scraped=False, is_active=True),
+                name='auto_post_item_pending_idx',
+            ),
+        ]
 
     def __str__(self):
         return (f'Auto Scrap Post : field = {self.auto_scrap.field} ,'
@@ -412,9 +593,32 @@ class AutoScrapCategoryItem(BaseModel):
                                      verbose_name="Fail count",
                                      )
 
+    page = models.IntegerField(default=1,
+                               blank=False,
+                               null=False,
+                               verbose_name="Page",
+                               )
+    leased_until = models.DateTimeField(blank=True,
+                                        null=True,
+                                        verbose_name="Leased until",
+                                        )
+
     class Meta:
         verbose_name = 'Auto Scrap Category Item'
         verbose_name_plural = 'Auto Scrap Category Items'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['auto_scrap', 'page'],
+                name='unique_auto_scrap_category_item_page',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_scraped=False, is_active=True),
+                name='auto_category_item_pending_idx',
+            ),
+        ]
 
     def __str__(self):
         return (f'Auto Scrap Category : field = {self.auto_scrap.field} ,'
@@ -445,10 +649,84 @@ class AutoScrapAuthorItem(BaseModel):
                                      verbose_name="Fail count",
                                      )
 
+    page = models.IntegerField(default=1,
+                               blank=False,
+                               null=False,
+                               verbose_name="Page",
+                               )
+    leased_until = models.DateTimeField(blank=True,
+                                        null=True,
+                                        verbose_name="Leased until",
+                                        )
+
     class Meta:
         verbose_name = 'Auto Scrap Author Item'
         verbose_name_plural = 'Auto Scrap Author Items'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['auto_scrap', 'page'],
+                name='unique_auto_scrap_author_item_page',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_scraped=False, is_active=True),
+                name='auto_author_item_pending_idx',
+            ),
+        ]
 
     def __str__(self):
         return (f'Auto Scrap Author : field = {self.auto_scrap.field} ,'
                 f' {self.auto_scrap.page_count}pages')
+
+
+class ExportJob(BaseModel):
+    user = models.ForeignKey(User,
+                             related_name='export_jobs',
+                             on_delete=models.SET_NULL,
+                             blank=True,
+                             null=True,
+                             verbose_name="User",
+                             )
+    # app_label.model_name of the exported rows
+    model_label = models.CharField(max_length=100,
+                                   blank=False,
+                                   null=False,
+                                   verbose_name="Model",
+                                   )
+    object_ids = models.JSONField(default=list,
+                                  blank=True,
+                                  verbose_name="Object IDs",
+                                  )
+    status = models.CharField(max_length=20,
+                              blank=False,
+                              null=False,
+                              default=ExportJobStatuses.PENDING.value,
+                              choices=[(status.value, status.name.title())
+                                       for status in ExportJobStatuses],
+                              verbose_name="Status",
+                              )
+    total_count = models.IntegerField(default=0,
+                                      verbose_name="Total count",
+                                      )
+    exported_count = models.IntegerField(default=0,
+                                         verbose_name="Exported count",
+                                         )
+    file = models.FileField(upload_to='exports/',
+                            blank=True,
+                            verbose_name="File",
+                            )
+    error = models.TextField(blank=True,
+                             null=False,
+                             default='',
+                             verbose_name="Error",
+                             )
+
+    class Meta:
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+
+    def __str__(self):
+        return (f'Export {self.model_label} {self.status}: '
+                f'{self.exported_count}/{self.total_count}')
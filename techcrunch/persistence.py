@@ -0,0 +1,209 @@
+from django.db import transaction
+from django.db.models import Model
+
+from . import constances
+from .api_cache import invalidate_api_cache
+from .models import (
+    Post, Category, Author, PostCategory, PostAuthor,
+    SearchByKeyword, PostSearchByKeywordItem
+)
+from .post_search import index_posts, index_renamed_posts
+
+# image is filled in by the ImageStore once the download finishes
+POST_UPDATE_FIELDS = ['slug', 'title', 'content', 'link', 'image_link',
+                      'content_hash', 'updated_at']
+CATEGORY_UPDATE_FIELDS = ['slug', 'name', 'post_count', 'description',
+                          'link', 'updated_at']
+AUTHOR_UPDATE_FIELDS = ['slug', 'name', 'description', 'position', 'link',
+                        'image_link', 'updated_at']
+
+
+def bulk_upsert(
+        *,
+        model: type[Model],
+        instances: list,
+        update_fields: list,
+) -> dict:
+    # Last one wins when the same entity shows up twice in a batch
+    instances_by_id = {str(instance.id_on_techcrunch): instance
+                       for instance in instances}
+    if not instances_by_id:
+        return dict()
+    model.objects.bulk_create(
+        list(instances_by_id.values()),
+        batch_size=constances.BULK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['id_on_techcrunch'],
+        update_fields=update_fields,
+    )
+    # After commit, so a reader can't cache the old rows under the new version
+    transaction.on_commit(invalidate_api_cache)
+    # Upserts don't hand primary keys back, so read them in one query
+    saved_instances = model.objects.in_bulk(list(instances_by_id.keys()),
+                                            field_name='id_on_techcrunch')
+    return {id_on_techcrunch: saved_instances[id_on_techcrunch]
+            for id_on_techcrunch in instances_by_id}
+
+
+def replace_post_links(
+        *,
+        model: type[Model],
+        related_field: str,
+        post_ids: list,
+        links: list,
+) -> None:
+    # A re-scraped post can drop a category or author, its old link goes
+    kept_pairs = {(link.post_id, getattr(link, f'{related_field}_id'))
+                  for link in links}
+    stale_link_ids = [
+        link_id
+        for link_id, post_id, related_id in model.objects.filter(
+            post_id__in=post_ids,
+        ).values_list('id', 'post_id', f'{related_field}_id')
+        if (post_id, related_id) not in kept_pairs
+    ]
+    for index in range(0, len(stale_link_ids), constances.BULK_BATCH_SIZE):
+        model.objects.filter(
+            id__in=stale_link_ids[index:index + constances.BULK_BATCH_SIZE]
+        ).delete()
+    model.objects.bulk_create(
+        links,
+        batch_size=constances.BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def bulk_upsert_named(
+        *,
+        model: type[Model],
+        instances: list,
+        update_fields: list,
+        link_model: type[Model],
+        related_field: str,
+) -> dict:
+    stored_names = dict(model.objects.filter(
+        id_on_techcrunch__in=[str(instance.id_on_techcrunch)
+                              for instance in instances],
+    ).values_list('id_on_techcrunch', 'name'))
+    saved_instances = bulk_upsert(model=model,
+                                  instances=instances,
+                                  update_fields=update_fields)
+    renamed_ids = [saved_instances[id_on_techcrunch].id
+                   for id_on_techcrunch, name in stored_names.items()
+                   if saved_instances[id_on_techcrunch].name != name]
+    if renamed_ids:
+        index_renamed_posts(link_model=link_model,
+                            related_field=related_field,
+                            related_ids=renamed_ids)
+    return saved_instances
+
+
+def bulk_upsert_categories(*, categories: list) -> dict:
+    return bulk_upsert_named(model=Category,
+                             instances=categories,
+                             update_fields=CATEGORY_UPDATE_FIELDS,
+                             link_model=PostCategory,
+                             related_field='category')
+
+
+def bulk_upsert_authors(*, authors: list) -> dict:
+    return bulk_upsert_named(model=Author,
+                             instances=authors,
+                             update_fields=AUTHOR_UPDATE_FIELDS,
+                             link_model=PostAuthor,
+                             related_field='author')
+
+
+def bulk_create_search_items(
+        *,
+        search_by_keyword: SearchByKeyword,
+        slugs: list,
+) -> dict:
+    slugs = list(dict.fromkeys(slugs))
+    existing_slugs = set()
+    post_ids_by_slug = dict()
+    for index in range(0, len(slugs), constances.BULK_BATCH_SIZE):
+        slugs_chunk = slugs[index:index + constances.BULK_BATCH_SIZE]
+        existing_slugs.update(
+            PostSearchByKeywordItem.objects.filter(
+                search_by_keyword=search_by_keyword,
+                slug__in=slugs_chunk,
+            ).values_list('slug', flat=True)
+        )
+        post_ids_by_slug.update(
+            Post.objects.filter(slug__in=slugs_chunk).values_list('slug',
+                                                                  'id')
+        )
+
+    # Posts that are already stored are linked now instead of re-scraped
+    search_items = [
+        PostSearchByKeywordItem(search_by_keyword=search_by_keyword,
+                                slug=slug,
+                                post_id=post_ids_by_slug.get(slug),
+                                is_scraped=slug in post_ids_by_slug)
+        for slug in slugs
+        if slug not in existing_slugs
+    ]
+    PostSearchByKeywordItem.objects.bulk_create(
+        search_items,
+        batch_size=constances.BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    linked_count = sum(search_item.is_scraped for search_item in search_items)
+    return {
+        'found': len(slugs),
+        'existing': len(existing_slugs),
+        'linked': linked_count,
+        'queued': len(search_items) - linked_count,
+    }
+
+
+class PostPersistencePipeline:
+    def __init__(self):
+        self.staged_posts = list()
+
+    def add(self, *, post: Post, authors: list, categories: list) -> None:
+        self.staged_posts.append((post, authors, categories))
+
+    def flush(self) -> list[tuple]:
+        if not self.staged_posts:
+            return list()
+
+        with transaction.atomic():
+            saved_posts = bulk_upsert(
+                model=Post,
+                instances=[post for post, _, _ in self.staged_posts],
+                update_fields=POST_UPDATE_FIELDS,
+            )
+            links_by_post = dict()
+            persisted_posts = list()
+            for post, authors, categories in self.staged_posts:
+                saved_post = saved_posts[str(post.id_on_techcrunch)]
+                # Last one wins, like the post row itself
+                links_by_post[saved_post.id] = (saved_post, authors,
+                                                categories)
+                persisted_posts.append((saved_post, authors, categories))
+            replace_post_links(
+                model=PostCategory,
+                related_field='category',
+                post_ids=list(links_by_post),
+                links=[PostCategory(post=saved_post, category=category)
+                       for saved_post, _, categories
+                       in links_by_post.values()
+                       for category in categories],
+            )
+            replace_post_links(
+                model=PostAuthor,
+                related_field='author',
+                post_ids=list(links_by_post),
+                links=[PostAuthor(post=saved_post, author=author)
+                       for saved_post, authors, _
+                       in links_by_post.values()
+                       for author in authors],
+            )
+            # Same transaction, so search never sees a half written post
+            index_posts(post_ids=[saved_post.id
+                                  for saved_post in saved_posts.values()])
+
+        self.staged_posts = list()
+        return persisted_posts
@@ -0,0 +1,169 @@
+import re
+
+from django.db import connection
+from django.db.models import Model, Q
+
+from . import constances
+from .models import Post, Author, Category, PostAuthor, PostCategory
+
+# Side table kept next to techcrunch_post by the 0027 migration: an FTS5
+# virtual table on SQLite, a tsvector column with a GIN index on PostgreSQL
+POST_SEARCH_TABLE = 'techcrunch_post_search'
+POST_TABLE = Post._meta.db_table
+SEARCH_TERM_RE = re.compile(r'\w+')
+
+
+def is_full_text_supported() -> bool:
+    return connection.vendor in ['sqlite', 'postgresql']
+
+
+def build_post_documents(*, post_ids: list) -> list[tuple]:
+    authors_by_post = dict()
+    for post_id, name in PostAuthor.objects.filter(
+            post_id__in=post_ids,
+    ).values_list('post_id', 'author__name'):
+        authors_by_post.setdefault(post_id, list()).append(name)
+    categories_by_post = dict()
+    for post_id, name in PostCategory.objects.filter(
+            post_id__in=post_ids,
+    ).values_list('post_id', 'category__name'):
+        categories_by_post.setdefault(post_id, list()).append(name)
+    return [
+        (post_id, title, content,
+         ' '.join(authors_by_post.get(post_id, list())),
+         ' '.join(categories_by_post.get(post_id, list())))
+        for post_id, title, content in Post.objects.filter(
+            id__in=post_ids,
+        ).values_list('id', 'title', 'content')
+    ]
+
+
+def write_sqlite_documents(*, cursor, documents: list) -> None:
+    # FTS5 has no upsert, so replaced rows are deleted first
+    cursor.executemany(f'DELETE FROM {POST_SEARCH_TABLE} WHERE rowid = %s',
+                       [(document[0],) for document in documents])
+    cursor.executemany(
+        f'INSERT INTO {POST_SEARCH_TABLE} '
+        f'(rowid, title, content, authors, categories) '
+        f'VALUES (%s, %s, %s, %s, %s)',
+        documents,
+    )
+
+
+def write_postgresql_documents(*, cursor, documents: list) -> None:
+    config = constances.POST_SEARCH_CONFIG
+    cursor.executemany(
+        f'INSERT INTO {POST_SEARCH_TABLE} (post_id, document) '
+        f'VALUES (%s, '
+        f"setweight(to_tsvector('{config}', %s), 'A') || "
+        f"setweight(to_tsvector('{config}', %s), 'B') || "
+        f"setweight(to_tsvector('{config}', %s || ' ' || %s), 'C')) "
+        f'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document',
+        documents,
+    )
+
+
+def index_posts(*, post_ids: list) -> int:
+    if not post_ids or not is_full_text_supported():
+        return 0
+    indexed_count = 0
+    for index in range(0, len(post_ids), constances.BULK_BATCH_SIZE):
+        documents = build_post_documents(
+            post_ids=post_ids[index:index + constances.BULK_BATCH_SIZE]
+        )
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                write_sqlite_documents(cursor=cursor, documents=documents)
+            else:
+                write_postgresql_documents(cursor=cursor,
+                                           documents=documents)
+        indexed_count += len(documents)
+    return indexed_count
+
+
+def find_document_post_ids(*, instance: Model) -> list:
+    # Posts whose search document holds something from the instance
+    if isinstance(instance, Post):
+        return [instance.id]
+    if isinstance(instance, (PostAuthor, PostCategory)):
+        return [instance.post_id]
+    if isinstance(instance, Author):
+        return list(PostAuthor.objects.filter(
+            author_id=instance.id,
+        ).values_list('post_id', flat=True))
+    if isinstance(instance, Category):
+        return list(PostCategory.objects.filter(
+            category_id=instance.id,
+        ).values_list('post_id', flat=True))
+    return list()
+
+
+def index_renamed_posts(*, link_model: type[Model], related_field: str,
+                        related_ids: list) -> int:
+    # Author and category names are part of their posts' documents
+    return index_posts(post_ids=list(link_model.objects.filter(**{
+        f'{related_field}_id__in': related_ids,
+    }).values_list('post_id', flat=True).distinct()))
+
+
+def build_fts5_query(*, query: str) -> str:
+    # Quoted terms keep FTS5 operators in user input from being parsed
+    return ' '.join(f'"{term}"' for term in SEARCH_TERM_RE.findall(query))
+
+
+def rank_post_ids(*, query: str, limit: int) -> list[tuple]:
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            fts5_query = build_fts5_query(query=query)
+            if not fts5_query:
+                return list()
+            # bm25() is lower for better matches, weights follow the columns
+            # Inactive posts are dropped before the limit, not after it
+            cursor.execute(
+                f'SELECT {POST_SEARCH_TABLE}.rowid, '
+                f'bm25({POST_SEARCH_TABLE}, '
+                f'{constances.POST_SEARCH_FTS5_WEIGHTS}) AS rank '
+                f'FROM {POST_SEARCH_TABLE} '
+                f'JOIN {POST_TABLE} ON {POST_TABLE}.id = '
+                f'{POST_SEARCH_TABLE}.rowid '
+                f'WHERE {POST_SEARCH_TABLE} MATCH %s '
+                f'AND {POST_TABLE}.is_active '
+                f'ORDER BY rank LIMIT %s',
+                [fts5_query, limit],
+            )
+            return [(post_id, -rank) for post_id, rank in cursor.fetchall()]
+        cursor.execute(
+            f'SELECT post_id, ts_rank_cd(document, search_query) AS rank '
+            f'FROM {POST_SEARCH_TABLE} '
+            f'JOIN {POST_TABLE} ON {POST_TABLE}.id = post_id, '
+            f"websearch_to_tsquery('{constances.POST_SEARCH_CONFIG}', %s) "
+            f'search_query '
+            f'WHERE document @@ search_query AND {POST_TABLE}.is_active '
+            f'ORDER BY rank DESC LIMIT %s',
+            [query, limit],
+        )
+        return cursor.fetchall()
+
+
+def search_posts(
+        *,
+        query: str,
+        limit: int = constances.POST_SEARCH_RESULT_LIMIT,
+) -> list[Post]:
+    if not is_full_text_supported():
+        # Unranked scan for backends without a full-text side table
+        return list(Post.objects.filter(
+            Q(title__icontains=query) | Q(content__icontains=query),
+            is_active=True,
+        ).order_by('-id')[:limit])
+    ranked_post_ids = rank_post_ids(query=query, limit=limit)
+    posts = Post.objects.filter(is_active=True).in_bulk(
+        [post_id for post_id, _ in ranked_post_ids]
+    )
+    ranked_posts = list()
+    for post_id, rank in ranked_post_ids:
+        post = posts.get(post_id)
+        if post is not None:
+            post.search_rank = rank
+            ranked_posts.append(post)
+    return ranked_posts
@@ -0,0 +1,275 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from functools import partial
+from urllib.parse import urlsplit
+
+from django.db import connection, OperationalError
+from django.db.models import F
+from django.db.models.functions import Greatest
+from requests import Response
+
+from . import constances
+from .logger import build_logger
+from .models import HostRateLimit
+
+_shared_rate_limiter = None
+_shared_rate_limiter_lock = threading.Lock()
+
+
+def take_token(
+        *,
+        tokens: float,
+        refilled_at: float,
+        blocked_until: float,
+        now: float,
+        requests_per_second: float,
+        burst: int,
+) -> tuple[float, float]:
+    tokens = min(burst, tokens + (now - refilled_at) * requests_per_second)
+    # Tokens may go negative: that reserves a later slot for this caller
+    tokens -= 1
+    wait_seconds = max(0.0, -tokens / requests_per_second,
+                       blocked_until - now)
+    return tokens, wait_seconds
+
+
+class LocalTokenBucketBackend:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = dict()
+
+    def reserve(self, *, host: str, requests_per_second: float,
+                burst: int) -> float:
+        now = time.time()
+        with self.lock:
+            tokens, refilled_at, blocked_until = self.buckets.get(
+                host, (burst, now, 0.0)
+            )
+            tokens, wait_seconds = take_token(
+                tokens=tokens,
+                refilled_at=refilled_at,
+                blocked_until=blocked_until,
+                now=now,
+                requests_per_second=requests_per_second,
+                burst=burst,
+            )
+            self.buckets[host] = (tokens, now, blocked_until)
+        return wait_seconds
+
+    def block(self, *, host: str, until: float, burst: int) -> None:
+        now = time.time()
+        with self.lock:
+            _, _, blocked_until = self.buckets.get(host, (burst, now, 0.0))
+            # Nothing is banked while the host is blocked
+            self.buckets[host] = (0.0, max(until, now),
+                                  max(blocked_until, until))
+
+
+class DatabaseTokenBucketBackend:
+    def __init__(self):
+        # Used only when the shared row stays locked past every retry
+        self.fallback = LocalTokenBucketBackend()
+        self.logger = build_logger()
+
+    @staticmethod
+    def create_bucket(*, host: str, burst: int) -> None:
+        HostRateLimit.objects.get_or_create(
+            host=host,
+            defaults={'tokens': burst, 'refilled_at': time.time()},
+        )
+
+    @staticmethod
+    def take_shared_token(*, host: str, requests_per_second: float,
+                          burst: int) -> tuple or None:
+        # take_token() as one UPDATE: the right-hand sides read the old row,
+        # so concurrent callers queue on the row without a transaction
+        least = 'LEAST' if connection.vendor == 'postgresql' else 'MIN'
+        now = time.time()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {HostRateLimit._meta.db_table} '
+                f'SET tokens = {least}(%s, tokens + (%s - refilled_at) * %s)'
+                f' - 1, refilled_at = %s '
+                f'WHERE host = %s RETURNING tokens, blocked_until',
+                [burst, now, requests_per_second, now, host],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        tokens, blocked_until = row
+        return max(0.0, -tokens / requests_per_second, blocked_until - now)
+
+    def run_with_lock_retries(self, *, operation: callable,
+                              fallback: callable):
+        for attempt in range(constances.RATE_LIMIT_LOCK_RETRIES):
+            try:
+                return operation()
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                time.sleep(constances.RATE_LIMIT_LOCK_RETRY_SECONDS
+                           * (attempt + 1))
+        self.logger.warning('Rate limit row stayed locked, using the '
+                            'in-process bucket for this request')
+        return fallback()
+
+    def reserve(self, *, host: str, requests_per_second: float,
+                burst: int) -> float:
+        def operation() -> float:
+            wait_seconds = self.take_shared_token(
+                host=host,
+                requests_per_second=requests_per_second,
+                burst=burst,
+            )
+            if wait_seconds is None:
+                # First request to this host
+                self.create_bucket(host=host, burst=burst)
+                wait_seconds = self.take_shared_token(
+                    host=host,
+                    requests_per_second=requests_per_second,
+                    burst=burst,
+                )
+            return wait_seconds
+
+        return self.run_with_lock_retries(
+            operation=operation,
+            fallback=partial(self.fallback.reserve, host=host,
+                             requests_per_second=requests_per_second,
+                             burst=burst),
+        )
+
+    def block(self, *, host: str, until: float, burst: int) -> None:
+        def operation() -> None:
+            # Nothing is banked while the host is blocked
+            updated_count = HostRateLimit.objects.filter(host=host).update(
+                tokens=0,
+                refilled_at=max(until, time.time()),
+                blocked_until=Greatest(F('blocked_until'), until),
+            )
+            if not updated_count:
+                self.create_bucket(host=host, burst=burst)
+                operation()
+
+        self.run_with_lock_retries(
+            operation=operation,
+            fallback=partial(self.fallback.block, host=host, until=until,
+                             burst=burst),
+        )
+
+
+RATE_LIMIT_BACKENDS = {
+    'database': DatabaseTokenBucketBackend,
+    'local': LocalTokenBucketBackend,
+}
+
+
+def parse_retry_after(*, response: Response) -> float:
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is None:
+        return constances.RATE_LIMIT_DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp()
+                   - time.time())
+    except (TypeError, ValueError):
+        return constances.RATE_LIMIT_DEFAULT_RETRY_AFTER
+
+
+class HostRateLimiter:
+    def __init__(
+            self,
+            *,
+            backend,
+            requests_per_second: float =
+            constances.RATE_LIMIT_REQUESTS_PER_SECOND,
+            burst: int = constances.RATE_LIMIT_BURST,
+            host_overrides: dict = None,
+    ):
+        self.backend = backend
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.host_overrides = constances.RATE_LIMIT_HOST_OVERRIDES \
+            if host_overrides is None else host_overrides
+        self.lock = threading.Lock()
+        self.counters = dict()
+
+    def get_host_limits(self, *, host: str) -> tuple:
+        return self.host_overrides.get(host,
+                                       (self.requests_per_second, self.burst))
+
+    def count(self, *, host: str, wait_seconds: float = 0.0,
+              retry_after: bool = False) -> None:
+        with self.lock:
+            counters = self.counters.setdefault(host, {
+                'acquired': 0,
+                'waited': 0,
+                'wait_seconds_total': 0.0,
+                'wait_seconds_max': 0.0,
+                'retry_after_blocks': 0,
+            })
+            if retry_after:
+                counters['retry_after_blocks'] += 1
+                return
+            counters['acquired'] += 1
+            if wait_seconds > 0:
+                counters['waited'] += 1
+                counters['wait_seconds_total'] += wait_seconds
+                counters['wait_seconds_max'] = max(
+                    counters['wait_seconds_max'], wait_seconds
+                )
+
+    def acquire(self, *, url: str) -> float:
+        host = urlsplit(url).hostname or ''
+        requests_per_second, burst = self.get_host_limits(host=host)
+        wait_seconds = self.backend.reserve(
+            host=host,
+            requests_per_second=requests_per_second,
+            burst=burst,
+        )
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        self.count(host=host, wait_seconds=wait_seconds)
+        return wait_seconds
+
+    def block_for_retry_after(self, *, url: str, response: Response) -> float:
+        host = urlsplit(url).hostname or ''
+        retry_after = parse_retry_after(response=response)
+        _, burst = self.get_host_limits(host=host)
+        self.backend.block(host=host,
+                           until=time.time() + retry_after,
+                           burst=burst)
+        self.count(host=host, retry_after=True)
+        return retry_after
+
+    def statistics(self) -> dict:
+        with self.lock:
+            return {
+                host: {
+                    **counters,
+                    'wait_seconds_total': round(
+                        counters['wait_seconds_total'], 3
+                    ),
+                    'wait_seconds_max': round(counters['wait_seconds_max'],
+                                              3),
+                    'wait_seconds_average': (
+                        round(counters['wait_seconds_total']
+                              / counters['acquired'], 4)
+                        if counters['acquired'] else 0.0
+                    ),
+                }
+                for host, counters in self.counters.items()
+            }
+
+
+def get_shared_rate_limiter() -> HostRateLimiter:
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        with _shared_rate_limiter_lock:
+            if _shared_rate_limiter is None:
+                backend = RATE_LIMIT_BACKENDS[constances.RATE_LIMIT_BACKEND]
+                _shared_rate_limiter = HostRateLimiter(backend=backend())
+    return _shared_rate_limiter
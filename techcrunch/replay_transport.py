@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import threading
+
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .http_cache import CACHED_HEADERS
+
+
+def build_fixture_path(*, directory: str, url: str) -> str:
+    return os.path.join(directory, hashlib.sha256(url.encode()).hexdigest())
+
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, *, directory: str, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    def send(self, request, **kwargs) -> Response:
+        response = super().send(request, **kwargs)
+        fixture_path = build_fixture_path(directory=self.directory,
+                                          url=request.url)
+        # Reading the body here still leaves iter_content() working
+        with open(f'{fixture_path}.body', 'wb') as f:
+            f.write(response.content)
+        with open(f'{fixture_path}.json', 'w') as f:
+            json.dump({
+                'url': request.url,
+                'status_code': response.status_code,
+                'headers': {header: response.headers[header]
+                            for header in CACHED_HEADERS
+                            if header in response.headers},
+            }, f)
+        with self.lock:
+            self.request_count += 1
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, *, directory: str):
+        super().__init__()
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.missing_urls = list()
+
+    def send(self, request, **kwargs) -> Response:
+        fixture_path = build_fixture_path(directory=self.directory,
+                                          url=request.url)
+        response = Response()
+        response.url = request.url
+        response.request = request
+        try:
+            with open(f'{fixture_path}.json') as f:
+                fixture = json.load(f)
+            with open(f'{fixture_path}.body', 'rb') as f:
+                response._content = f.read()
+            response.status_code = fixture['status_code']
+            response.headers = CaseInsensitiveDict(fixture['headers'])
+        except FileNotFoundError:
+            # Answered like the server would, so the scraper's own error
+            # handling runs
+            response._content = b''
+            response.status_code = 404
+            with self.lock:
+                self.missing_urls.append(request.url)
+        response.encoding = get_encoding_from_headers(response.headers)
+        with self.lock:
+            self.request_count += 1
+        return response
+
+    def close(self) -> None:
+        pass
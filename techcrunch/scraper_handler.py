@@ -1,32 +1,165 @@
 from requests import Response
-from bs4 import BeautifulSoup
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Prefetch
 from . import constances
 from .models import (
     Post, Category, Author, PostAuthor, PostCategory,
-    SearchByKeyword, PostSearchByKeywordItem, PostSearchDailyItem,
+    SearchByKeyword, PostSearchDailyItem, CrawlWatermark,
     AutoScrap, AutoScrapPostItem, AutoScrapCategoryItem, AutoScrapAuthorItem
 )
 
 from .logger import build_logger
+from .http_session import ScraperSession, get_shared_session
+from .http_cache import HttpResponseCache, get_shared_http_cache
+from .rate_limiter import HostRateLimiter, get_shared_rate_limiter
+from .lookup_cache import LookupCache
+from .image_store import ImageStore
+from .stage_timer import StageTimer
+from .api_cache import invalidate_api_cache
+from .text_extraction import get_text_extraction_backend
+from .link_extraction import extract_link_slugs
+from .persistence import (
+    PostPersistencePipeline, bulk_upsert_categories, bulk_upsert_authors,
+    bulk_create_search_items
+)
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import datetime, timedelta
+import hashlib
+import threading
+import time
 import requests
-import os
 
 import json
 
+extract_text = get_text_extraction_backend()
+
 
 def clean_text_from_html(*, html_text: str) -> str:
-    soup = BeautifulSoup(html_text, features="html.parser")
-    return soup.get_text()
+    return extract_text(html_text=html_text)
+
+
+def build_post_content_hash(*, post_json: json) -> str:
+    # Only the fields stored on Post and its links, so a bumped "modified"
+    # alone does not count as a change
+    authors_json_list = (post_json.get('_embedded') or dict()).get('authors')
+    content = json.dumps([
+        post_json.get('slug'),
+        post_json.get('title', dict()).get('rendered'),
+        post_json.get('content', dict()).get('rendered'),
+        post_json.get('link'),
+        post_json.get('jetpack_featured_media_url') or '',
+        post_json.get('categories') or list(),
+        [author_json.get('id') for author_json in authors_json_list or list()],
+    ])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def shift_modified(*, modified: str, seconds: int) -> str:
+    shifted = datetime.fromisoformat(modified) + timedelta(seconds=seconds)
+    return shifted.strftime(constances.MODIFIED_FORMAT)
+
+
+def build_modified_filter(*, modified_after: str) -> str:
+    if not modified_after:
+        return constances.MODIFIED_ORDER
+    return (constances.MODIFIED_ORDER
+            + constances.MODIFIED_AFTER_FILTER.format(
+                modified_after=modified_after
+            ))
+
+
+def is_last_search_page(*, search_page: dict) -> bool:
+    # A page that loaded but has no results means the search ran out
+    return search_page['error'] is None and not search_page['slugs']
+
+
+# AutoScrap.field -> (page item model, name of its scraped items relation)
+AUTO_SCRAP_ITEM_MODELS = {
+    constances.ItemTypes.POST.value: (AutoScrapPostItem, 'posts'),
+    constances.ItemTypes.CATEGORY.value: (AutoScrapCategoryItem,
+                                          'categories'),
+    constances.ItemTypes.AUTHOR.value: (AutoScrapAuthorItem, 'authors'),
+}
+
+# One query per relation for all unchanged posts of a page, in link order
+UNCHANGED_POST_PREFETCHES = [
+    Prefetch('post_authors',
+             queryset=PostAuthor.objects.select_related('author')
+             .order_by('id')),
+    Prefetch('post_categories',
+             queryset=PostCategory.objects.select_related('category')
+             .order_by('id')),
+]
 
 
 class TCScraperHandler:
-    def __init__(self, url_for_scrap, search_url):
+    def __init__(self, url_for_scrap, search_url,
+                 session: ScraperSession = None,
+                 http_cache: HttpResponseCache = None,
+                 rate_limiter: HostRateLimiter = None):
         self.authors_list = list()
         self.categories_list = list()
         self.url_for_scrap = url_for_scrap
         self.url_for_search = search_url
+        self.session = session if session is not None \
+            else get_shared_session()
+        self.http_cache = http_cache if http_cache is not None \
+            else get_shared_http_cache()
+        self.rate_limiter = rate_limiter if rate_limiter is not None \
+            else get_shared_rate_limiter()
+        self.category_lookup = LookupCache(model=Category)
+        self.author_lookup = LookupCache(model=Author)
+        # One timer per handler, and a handler lives for one task run
+        self.stage_timer = StageTimer()
+        self.image_store = ImageStore(
+            fetch=partial(self.url_request, stream=True,
+                          item_type=constances.IMAGE_ITEM_TYPE),
+            stage_timer=self.stage_timer,
+        )
+        self.post_write_counters = {
+            'written': 0,
+            'unchanged': 0,
+        }
         self.logger = build_logger()
 
+    def pool_statistics(self) -> dict:
+        return self.session.pool_statistics()
+
+    def rate_limit_statistics(self) -> dict:
+        return self.rate_limiter.statistics()
+
+    def post_write_statistics(self) -> dict:
+        return dict(self.post_write_counters)
+
+    def stage_statistics(self) -> list[dict]:
+        return self.stage_timer.statistics()
+
+    def log_stage_timings(self, *, task_name: str,
+                          task_id: str = '') -> list[dict]:
+        return self.stage_timer.emit(task_name=task_name, task_id=task_id)
+
+    def measure(self, *, stage: constances.ScrapeStages, item_type: str = ''):
+        return self.stage_timer.measure(stage=stage.value,
+                                        item_type=item_type)
+
+    def clean_text(self, *, html_text: str, item_type: str) -> str:
+        with self.measure(stage=constances.ScrapeStages.HTML_CLEAN,
+                          item_type=item_type):
+            return clean_text_from_html(html_text=html_text)
+
+    def http_cache_statistics(self) -> dict:
+        if self.http_cache is None:
+            return dict()
+        return self.http_cache.statistics()
+
+    def lookup_statistics(self) -> dict:
+        return {
+            'categories': self.category_lookup.statistics(),
+            'authors': self.author_lookup.statistics(),
+        }
+
     def build_url_for_scrape(
             self,
             *,
@@ -35,6 +168,7 @@ class TCScraperHandler:
             filter_value: str = '',
             data_per_page: str = '',
             page: str = '',
+            modified_after: str = '',
             envelope: str = '',
             embed: str = ''
     ) -> str:
@@ -44,18 +178,24 @@ class TCScraperHandler:
             "filter_value": filter_value,
             "data_per_page": data_per_page,
             "page": page,
+            "modified_after": modified_after,
             "envelope": envelope,
             "embed": embed
         }
         return self.url_for_scrap.format(**url_param_dict)
 
-    def download_image(self, *, file_path: str, image_url: str) -> str:
-        if not os.path.exists(file_path):
-            print(100 * "?")
-            image_content = self.url_request(url=image_url).content
-            with open(file_path, "wb") as f:
-                f.write(image_content)
-        return file_path.replace('media/', '')
+    def queue_image_downloads(self, *, instances: list) -> None:
+        for instance in instances:
+            self.image_store.submit(image_url=instance.image_link,
+                                    instance=instance)
+
+    def wait_for_images(self) -> None:
+        self.image_store.wait()
+        # Stored images change the API's image fields
+        invalidate_api_cache()
+
+    def image_statistics(self) -> dict:
+        return self.image_store.statistics()
 
     def build_url_for_search(
             self,
@@ -69,19 +209,85 @@ class TCScraperHandler:
         }
         return self.url_for_search.format(**url_param_dict)
 
+    def send_request(self, *, url: str, item_type: str = '',
+                     **kwargs) -> Response:
+        attempt = 0
+        while True:
+            with self.measure(stage=constances.ScrapeStages.RATE_LIMIT_WAIT,
+                              item_type=item_type):
+                self.rate_limiter.acquire(url=url)
+            with self.measure(stage=constances.ScrapeStages.HTTP_FETCH,
+                              item_type=item_type):
+                response = self.session.get(url,
+                                            timeout=constances.TIME_OUT,
+                                            **kwargs)
+            if response.status_code not in \
+                    constances.RATE_LIMIT_STATUS_CODES \
+                    or attempt == constances.RATE_LIMIT_MAX_RETRIES:
+                return response
+            # Blocks the host for every worker sharing the limiter
+            retry_after = self.rate_limiter.block_for_retry_after(
+                url=url,
+                response=response,
+            )
+            self.logger.warning(f"Rate limited on URL {url}, "
+                                f"retrying after {retry_after:.1f}s")
+            response.close()
+            attempt += 1
+
+    def request_json_with_cache(self, *, url: str,
+                                item_type: str = '') -> Response:
+        headers = {'Accept': 'application/json'}
+        if self.http_cache is None:
+            return self.send_request(url=url, item_type=item_type,
+                                     headers=headers)
+
+        cache_entry = self.http_cache.get(url=url)
+        if cache_entry is not None and \
+                self.http_cache.is_fresh(entry=cache_entry):
+            cached_response = self.http_cache.build_response(entry=cache_entry)
+            if cached_response is not None:
+                self.http_cache.count(counter='hits')
+                return cached_response
+
+        response = self.send_request(
+            url=url,
+            item_type=item_type,
+            headers={
+                **headers,
+                **self.http_cache.build_conditional_headers(
+                    entry=cache_entry
+                ),
+            },
+        )
+        if response.status_code == 304:
+            cached_response = self.http_cache.build_response(entry=cache_entry)
+            if cached_response is not None:
+                self.http_cache.refresh(entry=cache_entry)
+                self.http_cache.count(counter='revalidated')
+                return cached_response
+            # The cached body vanished, so ask again without validators
+            response = self.send_request(url=url, item_type=item_type,
+                                         headers=headers)
+
+        if response.status_code == 200:
+            self.http_cache.count(counter='misses')
+            self.http_cache.store(url=url, response=response)
+        return response
+
     def validate_url_and_request(self,
                                  *,
                                  url: str,
-                                 for_json: bool = False) -> Response or None:
+                                 for_json: bool = False,
+                                 stream: bool = False,
+                                 item_type: str = '') -> Response or None:
         try:
             if for_json:
-                response = requests.get(
-                    url,
-                    headers={'Accept': 'application/json'},
-                    timeout=constances.TIME_OUT
-                )
+                response = self.request_json_with_cache(url=url,
+                                                        item_type=item_type)
             else:
-                response = requests.get(url, timeout=constances.TIME_OUT)
+                response = self.send_request(url=url, item_type=item_type,
+                                             stream=stream)
 
             response.raise_for_status()
             # Raises HTTPError for bad responses
@@ -121,15 +327,22 @@ class TCScraperHandler:
 
         return None
 
-    def url_request_for_json(self, *, url: str) -> json:
-        response = self.validate_url_and_request(url=url, for_json=True)
+    def url_request_for_json(self, *, url: str, item_type: str = '') -> json:
+        response = self.validate_url_and_request(url=url, for_json=True,
+                                                 item_type=item_type)
         if response is not None:
-            return response.json()
+            with self.measure(stage=constances.ScrapeStages.JSON_DECODE,
+                              item_type=item_type):
+                return response.json()
         else:
             raise Exception("No Response is received from the server")
 
-    def url_request(self, *, url: str) -> Response:
-        response = self.validate_url_and_request(url=url, for_json=False)
+    def url_request(self, *, url: str, stream: bool = False,
+                    item_type: str = '') -> Response:
+        response = self.validate_url_and_request(url=url,
+                                                 for_json=False,
+                                                 stream=stream,
+                                                 item_type=item_type)
         if response is not None:
             return response
         else:
@@ -154,6 +367,56 @@ class TCScraperHandler:
         )
         return post
 
+    def scrape_items_in_chunks(
+            self,
+            *,
+            item_type: str,
+            attribute: str,
+            values: list,
+            key: callable,
+    ) -> dict:
+        items_by_key = dict()
+        unique_values = list(dict.fromkeys(str(value) for value in values))
+        for index in range(0, len(unique_values),
+                           constances.MAX_ITEMS_PER_REQUEST):
+            values_chunk = unique_values[
+                index:index + constances.MAX_ITEMS_PER_REQUEST
+            ]
+            items_list = self.scrape_items_and_parse(
+                item_type=item_type,
+                attribute=attribute,
+                attribute_value=','.join(values_chunk),
+            )
+            for item in items_list:
+                items_by_key[key(item)] = item
+        return items_by_key
+
+    def scrape_posts_with_slugs(self, *, post_slugs: list) -> dict:
+        posts_by_slug = self.scrape_items_in_chunks(
+            item_type=constances.ItemTypes.POST.value,
+            attribute=constances.ItemAttributeTypes.SLUG.value,
+            values=post_slugs,
+            key=lambda post_detail: post_detail[0].slug,
+        )
+        return {slug: post_detail[0]
+                for slug, post_detail in posts_by_slug.items()}
+
+    def scrape_categories_with_ids(self, *, category_ids: list) -> dict:
+        return self.scrape_items_in_chunks(
+            item_type=constances.ItemTypes.CATEGORY.value,
+            attribute=constances.ItemAttributeTypes.INCLUDE.value,
+            values=category_ids,
+            key=lambda category: str(category.id_on_techcrunch),
+        )
+
+    def scrape_authors_with_ids(self, *, author_ids: list) -> dict:
+        return self.scrape_items_in_chunks(
+            item_type=constances.ItemTypes.AUTHOR.value,
+            attribute=constances.ItemAttributeTypes.INCLUDE.value,
+            values=author_ids,
+            key=lambda author: str(author.id_on_techcrunch),
+        )
+
     def scrape_category_with_slug(self, *, category_slug: str) -> Category:
         category = self.scrape_items_and_parse(
             single_item=True,
@@ -200,27 +463,27 @@ class TCScraperHandler:
         )
         return author
 
-    def parse_post_detail(self, *, post_json: json) -> tuple:
+    def build_post_detail(self, *, post_json: json) -> tuple:
         id_on_techcrunch = post_json.get('id')
         slug = post_json.get('slug')
-        title = clean_text_from_html(
-            html_text=post_json.get('title').get('rendered')
+        title = self.clean_text(
+            html_text=post_json.get('title').get('rendered'),
+            item_type=constances.ItemTypes.POST.value,
         )
-        content = clean_text_from_html(
-            html_text=post_json.get('content').get('rendered')
+        content = self.clean_text(
+            html_text=post_json.get('content').get('rendered'),
+            item_type=constances.ItemTypes.POST.value,
         )
         link = post_json.get('link')
-        image_link = post_json.get('jetpack_featured_media_url')
-        file_path = f'media/images/{slug}.png'
-        post, _ = Post.objects.get_or_create(
+        image_link = post_json.get('jetpack_featured_media_url') or ''
+        post = Post(
             id_on_techcrunch=id_on_techcrunch,
             slug=slug,
             title=title,
             content=content,
             link=link,
             image_link=image_link,
-            image=self.download_image(file_path=file_path,
-                                      image_url=image_link)
+            content_hash=build_post_content_hash(post_json=post_json),
         )
 
         categories_id_list = post_json.get('categories')
@@ -229,30 +492,100 @@ class TCScraperHandler:
         categories_instances = self.parse_post_categories(
             categories_id_list=categories_id_list
         )
-        for category in categories_instances:
-            PostCategory.objects.get_or_create(post=post, category=category)
         authors_json_list = post_json.get('_embedded').get('authors')
         if not authors_json_list:
             authors_json_list = list()
         authors_instances = self.parse_post_authors(
             authors_json_list=authors_json_list
         )
-        for author in authors_instances:
-            PostAuthor.objects.get_or_create(post=post, author=author)
 
         return post, authors_instances, categories_instances
 
+    def parse_post_detail(self, *, post_json: json) -> tuple:
+        return self.parse_posts_json(posts_json=[post_json])[0]
+
+    def split_unchanged_posts(self, *, posts_json: list) -> tuple:
+        content_hashes = {
+            str(post_json['id']): build_post_content_hash(post_json=post_json)
+            for post_json in posts_json
+        }
+        stored_hashes = dict(
+            Post.objects.filter(
+                id_on_techcrunch__in=list(content_hashes),
+            ).values_list('id_on_techcrunch', 'content_hash')
+        )
+        unchanged_ids = {
+            id_on_techcrunch
+            for id_on_techcrunch, content_hash in content_hashes.items()
+            if stored_hashes.get(id_on_techcrunch) == content_hash
+        }
+        changed_posts_json = [post_json for post_json in posts_json
+                              if str(post_json['id']) not in unchanged_ids]
+        return changed_posts_json, unchanged_ids
+
+    def parse_posts_json(self, *, posts_json: list) -> list[tuple]:
+        # Unchanged posts are skipped before any parsing or DB write
+        changed_posts_json, unchanged_ids = self.split_unchanged_posts(
+            posts_json=posts_json
+        )
+        pipeline = PostPersistencePipeline()
+        for post_json in changed_posts_json:
+            post, authors_instances, categories_instances = \
+                self.build_post_detail(post_json=post_json)
+            pipeline.add(post=post,
+                         authors=authors_instances,
+                         categories=categories_instances)
+        posts_by_id = {
+            str(post.id_on_techcrunch): (post, authors, categories)
+            for post, authors, categories in self.flush_post_pipeline(
+                pipeline=pipeline
+            )
+        }
+        if unchanged_ids:
+            # Stored posts come back as they are, with their stored links
+            unchanged_posts = Post.objects.filter(
+                id_on_techcrunch__in=list(unchanged_ids),
+            ).prefetch_related(*UNCHANGED_POST_PREFETCHES)
+            for post in unchanged_posts:
+                posts_by_id[post.id_on_techcrunch] = (
+                    post,
+                    [link.author for link in post.post_authors.all()],
+                    [link.category for link in post.post_categories.all()],
+                )
+        self.post_write_counters['written'] += len(changed_posts_json)
+        self.post_write_counters['unchanged'] += len(unchanged_ids)
+        return [posts_by_id[str(post_json['id'])] for post_json in posts_json
+                if str(post_json['id']) in posts_by_id]
+
+    def flush_post_pipeline(
+            self,
+            *,
+            pipeline: PostPersistencePipeline
+    ) -> list[tuple]:
+        with self.measure(stage=constances.ScrapeStages.DB_WRITE,
+                          item_type=constances.ItemTypes.POST.value):
+            persisted_posts = pipeline.flush()
+        self.queue_image_downloads(
+            instances=[post for post, _, _ in persisted_posts]
+        )
+        return persisted_posts
+
     def parse_post_categories(self, *, categories_id_list: list) -> list:
-        categories_instances = list()
-        for category_id in categories_id_list:
-            category = self.scrape_category_with_id(category_id=category_id)
-            categories_instances.append(category)
-        return categories_instances
+        return self.category_lookup.get_many(
+            ids_on_techcrunch=categories_id_list,
+            fetch_many=lambda category_ids: self.scrape_categories_with_ids(
+                category_ids=category_ids
+            ),
+        )
 
     def parse_post_authors(self, *, authors_json_list: list) -> list:
         authors_instances = list()
         for author_json in authors_json_list:
-            author = self.parse_author_detail(author_json=author_json)
+            author = self.author_lookup.get(
+                id_on_techcrunch=author_json['id'],
+                fetch=partial(self.parse_author_detail,
+                              author_json=author_json),
+            )
             authors_instances.append(author)
         return authors_instances
 
@@ -263,17 +596,17 @@ class TCScraperHandler:
         )
         return categories_list
 
-    @staticmethod
-    def parse_category_detail(*, category_json: json) -> Category:
+    def build_category_detail(self, *, category_json: json) -> Category:
         id_on_techcrunch = category_json['id']
         slug = category_json['slug']
         post_count = category_json['count']
         name = category_json['name']
-        description = clean_text_from_html(
-            html_text=category_json['description']
+        description = self.clean_text(
+            html_text=category_json['description'],
+            item_type=constances.ItemTypes.CATEGORY.value,
         )
         link = category_json['link']
-        category, _ = Category.objects.get_or_create(
+        return Category(
             id_on_techcrunch=id_on_techcrunch,
             slug=slug,
             post_count=post_count,
@@ -281,21 +614,36 @@ class TCScraperHandler:
             description=description,
             link=link,
         )
-        return category
 
-    def parse_author_detail(self, author_json: json) -> Author:
+    def upsert_categories(self, *, categories: list) -> dict:
+        with self.measure(stage=constances.ScrapeStages.DB_WRITE,
+                          item_type=constances.ItemTypes.CATEGORY.value):
+            return bulk_upsert_categories(categories=categories)
+
+    def upsert_authors(self, *, authors: list) -> dict:
+        with self.measure(stage=constances.ScrapeStages.DB_WRITE,
+                          item_type=constances.ItemTypes.AUTHOR.value):
+            return bulk_upsert_authors(authors=authors)
+
+    def parse_category_detail(self, *, category_json: json) -> Category:
+        category = self.build_category_detail(category_json=category_json)
+        return self.upsert_categories(
+            categories=[category]
+        )[str(category.id_on_techcrunch)]
+
+    def build_author_detail(self, *, author_json: json) -> Author:
         id_on_techcrunch = author_json['id']
         slug = author_json['slug']
         name = author_json['name']
-        description = clean_text_from_html(
-            html_text=author_json['description']
+        description = self.clean_text(
+            html_text=author_json['description'],
+            item_type=constances.ItemTypes.AUTHOR.value,
         )
         position = author_json['position']
         link = author_json['link']
         image_link = '' if not author_json['cbAvatar'] \
             else author_json['cbAvatar']
-        file_path = f'media/images/{slug}.png'
-        author, _ = Author.objects.get_or_create(
+        return Author(
             id_on_techcrunch=id_on_techcrunch,
             slug=slug,
             name=name,
@@ -303,12 +651,17 @@ class TCScraperHandler:
             position=position,
             link=link,
             image_link=image_link,
-            image=self.download_image(file_path=file_path,
-                                      image_url=image_link)
         )
+
+    def parse_author_detail(self, *, author_json: json) -> Author:
+        author = self.build_author_detail(author_json=author_json)
+        author = self.upsert_authors(
+            authors=[author]
+        )[str(author.id_on_techcrunch)]
+        self.queue_image_downloads(instances=[author])
         return author
 
-    def scrape_items_and_parse(
+    def build_item_url(
             self,
             *,
             single_item: bool = False,
@@ -316,26 +669,58 @@ class TCScraperHandler:
             item_type: str,
             attribute: str = '?',
             attribute_value: int or str = '',
+            modified_after: str = '',
             envelop: str = constances.EnvelopeStatuses.TRUE.value,
             embed: str = constances.EmbedStatuses.NONE.value
-    ) -> tuple or Category or Author or list:
+    ) -> str:
         if single_item:
             if attribute not in [constances.ItemAttributeTypes.ID.value,
                                  constances.ItemAttributeTypes.SLUG.value]:
                 raise Exception('Single item attribute must be "ID" or "SLUG"')
 
-            if item_type == constances.ItemTypes.POST.value:
-                embed = constances.EmbedStatuses.TRUE.value
-        item_url = self.build_url_for_scrape(
+        # post authors are only available through the embedded data
+        if item_type == constances.ItemTypes.POST.value:
+            embed = constances.EmbedStatuses.TRUE.value
+        return self.build_url_for_scrape(
             field=item_type,
             filter_field=attribute,
             filter_value=attribute_value,
             page='' if single_item or page == 0 else f'&page={page}',
+            modified_after='' if single_item else modified_after,
             data_per_page='' if single_item else constances.DATA_PER_PAGE,
             envelope='' if single_item else envelop,
             embed=embed
         )
-        data_json = self.url_request_for_json(url=item_url)
+
+    def scrape_items_and_parse(
+            self,
+            *,
+            single_item: bool = False,
+            page: int = 0,
+            item_type: str,
+            attribute: str = '?',
+            attribute_value: int or str = '',
+            envelop: str = constances.EnvelopeStatuses.TRUE.value,
+            embed: str = constances.EmbedStatuses.NONE.value
+    ) -> tuple or Category or Author or list:
+        item_url = self.build_item_url(
+            single_item=single_item,
+            page=page,
+            item_type=item_type,
+            attribute=attribute,
+            attribute_value=attribute_value,
+            envelop=envelop,
+            embed=embed,
+        )
+        data_json = self.url_request_for_json(url=item_url,
+                                              item_type=item_type)
+
+        if not single_item:
+            return self.parse_page_json(data_json=data_json,
+                                        item_type=item_type,
+                                        attribute=attribute,
+                                        attribute_value=attribute_value,
+                                        )
 
         # slug search return a list
         if attribute == constances.ItemAttributeTypes.SLUG.value:
@@ -346,6 +731,121 @@ class TCScraperHandler:
                                       single_item=single_item
                                       )
 
+    def parse_page_json(
+            self,
+            *,
+            data_json: json,
+            item_type: str,
+            attribute: str = '?',
+            attribute_value: int or str = '',
+    ) -> list:
+        # batch lookups by slug / id list have no page range to plan
+        if attribute not in [constances.ItemAttributeTypes.SLUG.value,
+                             constances.ItemAttributeTypes.INCLUDE.value]:
+            self.record_page_totals(data_json=data_json,
+                                    item_type=item_type,
+                                    attribute=attribute,
+                                    attribute_value=attribute_value,
+                                    )
+        # enveloped errors (e.g. a page past the last one) come back as 200
+        if data_json.get('status', 200) >= 400:
+            self.logger.warning(f"Page of {item_type} rejected by the "
+                                f"server: {data_json.get('body')}"
+                                )
+            return list()
+        return self.parse_item_detail(data_json=data_json,
+                                      item_type=item_type,
+                                      single_item=False
+                                      )
+
+    @staticmethod
+    def build_page_totals_cache_key(
+            *,
+            item_type: str,
+            attribute: str = '?',
+            attribute_value: int or str = '',
+    ) -> str:
+        return (f'{constances.PAGE_TOTALS_CACHE_PREFIX}:'
+                f'{item_type}:{attribute}:{attribute_value}')
+
+    def record_page_totals(
+            self,
+            *,
+            data_json: json,
+            item_type: str,
+            attribute: str = '?',
+            attribute_value: int or str = '',
+    ) -> dict or None:
+        headers = data_json.get('headers') or dict()
+        total_pages = headers.get('X-WP-TotalPages')
+        if total_pages is None:
+            return None
+        page_totals = {
+            'total_items': int(headers.get('X-WP-Total') or 0),
+            'total_pages': int(total_pages),
+        }
+        cache.set(
+            self.build_page_totals_cache_key(
+                item_type=item_type,
+                attribute=attribute,
+                attribute_value=attribute_value,
+            ),
+            page_totals,
+            constances.PAGE_TOTALS_CACHE_TIMEOUT,
+        )
+        return page_totals
+
+    def get_page_totals(
+            self,
+            *,
+            item_type: str,
+            attribute: str = '?',
+            attribute_value: int or str = '',
+    ) -> dict or None:
+        return cache.get(
+            self.build_page_totals_cache_key(
+                item_type=item_type,
+                attribute=attribute,
+                attribute_value=attribute_value,
+            )
+        )
+
+    def plan_page_range(
+            self,
+            *,
+            item_type: str,
+            attribute: str = '?',
+            attribute_value: int or str = '',
+            page_start: int = 1,
+            page_count: int,
+    ) -> range:
+        end_page = page_start + max(page_count, 0)
+        page_totals = self.get_page_totals(item_type=item_type,
+                                           attribute=attribute,
+                                           attribute_value=attribute_value,
+                                           )
+        if page_totals is not None:
+            end_page = min(end_page, page_totals['total_pages'] + 1)
+        return range(page_start, max(end_page, page_start))
+
+    def scrape_page_range(
+            self,
+            *,
+            item_type: str,
+            pages: range or list,
+            attribute: str = '?',
+            attribute_value: int or str = '',
+    ) -> list:
+        items_list = list()
+        for page in pages:
+            items_list += self.scrape_items_and_parse(
+                item_type=item_type,
+                attribute=attribute,
+                attribute_value=attribute_value,
+                page=page,
+            )
+        return items_list
+
     def parse_item_detail(
             self,
             *,
@@ -362,23 +862,91 @@ class TCScraperHandler:
                 return self.parse_author_detail(author_json=data_json)
         else:
             data_list = data_json['body']
-            items_list = list()
-            for data in data_list:
-                if item_type == constances.ItemTypes.POST.value:
-                    post_categories_authors = self.parse_post_detail(
-                        post_json=data)
-                    items_list.append(post_categories_authors)
-                elif item_type == constances.ItemTypes.CATEGORY.value:
-                    category, _ = self.parse_category_detail(
-                        category_json=data)
-                    items_list.append(category)
-                elif item_type == constances.ItemTypes.AUTHOR.value:
-                    author, _ = self.parse_author_detail(author_json=data)
-                    items_list.append(author)
-            return items_list
+            if item_type == constances.ItemTypes.POST.value:
+                return self.parse_posts_json(posts_json=data_list)
+            elif item_type == constances.ItemTypes.CATEGORY.value:
+                categories = self.upsert_categories(categories=[
+                    self.build_category_detail(category_json=data)
+                    for data in data_list
+                ])
+                return list(categories.values())
+            elif item_type == constances.ItemTypes.AUTHOR.value:
+                authors = list(self.upsert_authors(authors=[
+                    self.build_author_detail(author_json=data)
+                    for data in data_list
+                ]).values())
+                self.queue_image_downloads(instances=authors)
+                return authors
+            return list()
+
+    def crawl_modified_posts(self, *, category_id: str = '') -> dict:
+        watermark, _ = CrawlWatermark.objects.get_or_create(
+            item_type=constances.ItemTypes.POST.value,
+            category_id=str(category_id),
+        )
+        attribute = constances.ItemAttributeTypes.CATEGORY.value \
+            if category_id else '?'
+        window_start = '' if not watermark.modified_after else shift_modified(
+            modified=watermark.modified_after,
+            seconds=-constances.CRAWL_WATERMARK_OVERLAP_SECONDS,
+        )
+        post_write_counters = dict(self.post_write_counters)
+        page = 1
+        request_count = 0
+        while request_count < constances.CRAWL_MAX_PAGES_PER_RUN:
+            item_url = self.build_item_url(
+                item_type=constances.ItemTypes.POST.value,
+                attribute=attribute,
+                attribute_value=category_id,
+                page=page,
+                modified_after=build_modified_filter(
+                    modified_after=window_start
+                ),
+            )
+            data_json = self.url_request_for_json(
+                url=item_url,
+                item_type=constances.ItemTypes.POST.value,
+            )
+            request_count += 1
+            if data_json.get('status', 200) >= 400:
+                break
+            posts_json = data_json['body']
+            if not posts_json:
+                break
+            self.parse_posts_json(posts_json=posts_json)
+
+            # Pages come oldest change first, so the mark can move per page
+            page_modified = max(post_json['modified']
+                                for post_json in posts_json)
+            if page_modified > watermark.modified_after:
+                watermark.modified_after = page_modified
+                watermark.save(update_fields=['modified_after',
+                                              'updated_at'])
+            if len(posts_json) < constances.ITEMS_PER_PAGE:
+                break
+            # Move the window instead of the page so edits made during the
+            # crawl can't shift unread posts onto pages already read
+            next_window_start = shift_modified(modified=page_modified,
+                                               seconds=-1)
+            if next_window_start > window_start:
+                window_start = next_window_start
+                page = 1
+            else:
+                # A whole page shares one timestamp
+                page += 1
+
+        return {
+            'category_id': category_id,
+            'request_count': request_count,
+            'written_post_count': (self.post_write_counters['written']
+                                   - post_write_counters['written']),
+            'unchanged_post_count': (self.post_write_counters['unchanged']
+                                     - post_write_counters['unchanged']),
+            'modified_after': watermark.modified_after,
+        }
 
     def scrape_page_authors(self, *, page: int) -> list[Author]:
-        authors_list, _ = self.scrape_items_and_parse(
+        authors_list = self.scrape_items_and_parse(
             item_type=constances.ItemTypes.AUTHOR.value,
             page=page,
         )
@@ -386,74 +954,119 @@ class TCScraperHandler:
 
     def search_by_keyword(self, *,
                           search_by_keyword_instance: SearchByKeyword
-                          ) -> int:
-        search_items = list()
-        for page in range(1, search_by_keyword_instance.page_count + 1):
-            search_url = self.build_url_for_search(
-                keyword=search_by_keyword_instance.keyword.title,
-                page=page
+                          ) -> dict:
+        search_pages = self.fetch_search_pages(
+            keyword=search_by_keyword_instance.keyword.title,
+            page_count=search_by_keyword_instance.page_count,
+        )
+        slugs = list()
+        for search_page in search_pages:
+            slugs += search_page.pop('slugs')
+
+        with self.measure(stage=constances.ScrapeStages.DB_WRITE,
+                          item_type=constances.SEARCH_PAGE_ITEM_TYPE):
+            search_items_statistics = bulk_create_search_items(
+                search_by_keyword=search_by_keyword_instance,
+                slugs=slugs,
             )
-            response = self.url_request(url=search_url)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, features='html.parser')
-                search_items += self.extract_search_items(
-                    search_by_keyword=search_by_keyword_instance,
-                    soup=soup
-                )
-        return len(search_items)
-
-    def extract_search_items(self,
-                             *,
-                             search_by_keyword: SearchByKeyword,
-                             soup: BeautifulSoup
-                             ) -> list[PostSearchByKeywordItem]:
-        search_items_list = list()
-        post_links_list = soup.findAll(name='a', attrs={'class': 'thmb'})
-        for post_link in post_links_list:
-            link_parts_list = post_link['href'].split('/')
-            slug = link_parts_list[-2]
-            search_item = self.parse_search_item(
-                search_by_keyword=search_by_keyword,
-                slug=slug,
+        self.logger.info(f"Search {search_by_keyword_instance.id} items: "
+                         f"{search_items_statistics}")
+        return {**search_items_statistics, 'pages': search_pages}
+
+    def fetch_search_pages(self, *, keyword: str, page_count: int) -> list:
+        pages = iter(range(1, page_count + 1))
+        pages_lock = threading.Lock()
+        search_pages = dict()
+        last_page = page_count
+
+        def fetch_next_pages():
+            nonlocal last_page
+            try:
+                while True:
+                    # Workers share the page iterator, so each page is
+                    # taken once and none past an empty page is started
+                    with pages_lock:
+                        page = next(pages, None)
+                        if page is None or page > last_page:
+                            return
+                    search_page = self.fetch_search_page(keyword=keyword,
+                                                         page=page)
+                    with pages_lock:
+                        search_pages[page] = search_page
+                        if is_last_search_page(search_page=search_page):
+                            last_page = min(last_page, page)
+            finally:
+                # The request reaches the rate limiter, pool threads must
+                # not keep a connection open after it
+                connection.close()
+
+        worker_count = min(constances.SEARCH_PAGE_MAX_WORKERS, page_count)
+        if worker_count < 1:
+            return list()
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            futures = [executor.submit(fetch_next_pages)
+                       for _ in range(worker_count)]
+            for future in futures:
+                future.result()
+        return [search_pages[page] for page in sorted(search_pages)
+                if page <= last_page]
+
+    def fetch_search_page(self, *, keyword: str, page: int) -> dict:
+        started_at = time.perf_counter()
+        slugs = list()
+        error = None
+        try:
+            response = self.url_request(
+                url=self.build_url_for_search(keyword=keyword, page=page),
+                item_type=constances.SEARCH_PAGE_ITEM_TYPE,
             )
-            search_items_list.append(search_item)
-        return search_items_list
+            slugs = self.extract_search_items(html_text=response.text)
+        except Exception as e:
+            error = str(e)
+            self.logger.error(f"Search page {page} for {keyword} "
+                              f"failed: {error}")
+        return {
+            'page': page,
+            'slugs': slugs,
+            'slug_count': len(slugs),
+            'seconds': round(time.perf_counter() - started_at, 3),
+            'error': error,
+        }
 
     @staticmethod
-    def parse_search_item(*,
-                          search_by_keyword: SearchByKeyword,
-                          slug: str
-                          ) -> PostSearchByKeywordItem:
-        return PostSearchByKeywordItem.objects.create(
-            search_by_keyword=search_by_keyword,
-            slug=slug,
+    def extract_search_items(*, html_text: str) -> list[str]:
+        return extract_link_slugs(
+            html_text=html_text,
+            link_class=constances.SEARCH_ITEM_LINK_CLASS
         )
 
     def daily_search(
             self,
     ) -> None:
         search_items = list()
-        response = self.url_request(url=constances.BASE_URL)
+        response = self.url_request(
+            url=constances.BASE_URL,
+            item_type=constances.DAILY_PAGE_ITEM_TYPE,
+        )
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, features='html.parser')
             search_items += self.extract_new_day_items(
-                soup=soup
+                html_text=response.text
             )
 
     def extract_new_day_items(self,
                               *,
-                              soup: BeautifulSoup
+                              html_text: str
                               ) -> list[PostSearchDailyItem]:
         daily_items_list = list()
-        new_post_links_list = soup.findAll(
-            name='a',
-            attrs={'class': 'post-block__title__link'}
-        )
-        for post_link in new_post_links_list:
-            link_parts_list = post_link['href'].split('/')
-            slug = link_parts_list[-2]
-            search_item = self.parse_daily_item(slug=slug)
-            daily_items_list.append(search_item)
+        slugs = extract_link_slugs(
+            html_text=html_text,
+            link_class=constances.DAILY_ITEM_LINK_CLASS
+        )
+        with self.measure(stage=constances.ScrapeStages.DB_WRITE,
+                          item_type=constances.DAILY_PAGE_ITEM_TYPE):
+            for slug in slugs:
+                search_item = self.parse_daily_item(slug=slug)
+                daily_items_list.append(search_item)
         return daily_items_list
 
     @staticmethod
@@ -465,73 +1078,129 @@ class TCScraperHandler:
         )
         return item
 
-    def auto_scrape_posts_with_category(
-            self,
-            auto_scrap_post_instance: AutoScrapPostItem,
-            category_id: str
-    ) -> None:
-        posts = list()
-        end_page = (auto_scrap_post_instance.auto_scrap.page_start +
-                    auto_scrap_post_instance.auto_scrap.page_count + 1)
-        if end_page > constances.AutoScrapLastPage.POST.value:
-            end_page = constances.AutoScrapLastPage.POST.value
-
-        for page in range(auto_scrap_post_instance.auto_scrap.page_start,
-                          end_page):
-            posts += self.scrape_category_page_posts(category_id=category_id,
-                                                     page=page)
-        auto_scrap_post_instance.categories = posts
-        auto_scrap_post_instance.is_scraped = True
-
-    def auto_scrape_categories(
-            self,
-            auto_scrap_category_instance: AutoScrapCategoryItem,
-    ) -> None:
-        categories = list()
-        end_page = (auto_scrap_category_instance.auto_scrap.page_start +
-                    auto_scrap_category_instance.auto_scrap.page_count + 1)
-        if end_page > constances.AutoScrapLastPage.CATEGORY.value:
-            end_page = constances.AutoScrapLastPage.CATEGORY.value
-
-        for page in range(auto_scrap_category_instance.auto_scrap.page_start,
-                          end_page):
-            categories += self.scrape_page_categories(page=page)
-        auto_scrap_category_instance.categories = categories
-        auto_scrap_category_instance.is_scraped = True
-
-    def auto_scrape_authors(
-            self,
-            auto_scrap_author_instance: AutoScrapAuthorItem,
-    ) -> None:
-        authors = list()
-        end_page = (auto_scrap_author_instance.auto_scrap.page_start +
-                    auto_scrap_author_instance.auto_scrap.page_count + 1)
-        if end_page > constances.AutoScrapLastPage.AUTHOR.value:
-            end_page = constances.AutoScrapLastPage.AUTHOR.value
-
-        for page in range(auto_scrap_author_instance.auto_scrap.page_start,
-                          end_page):
-            authors += self.scrape_page_authors(page=page)
-        auto_scrap_author_instance.authors = authors
-        auto_scrap_author_instance.is_scraped = True
-
     @staticmethod
-    def auto_scrape_items(
-            auto_scrap_instance: AutoScrap
-    ) -> None:
-        auto_scrap_items = list()
-        if auto_scrap_instance.field == constances.ItemTypes.POST:
-            auto_scrap_post_instance = AutoScrapPostItem(
-                auto_scrap=auto_scrap_instance,
+    def build_auto_scrap_filter(*, auto_scrap: AutoScrap) -> tuple:
+        if auto_scrap.field == constances.ItemTypes.POST.value \
+                and auto_scrap.category_id:
+            return (constances.ItemAttributeTypes.CATEGORY.value,
+                    auto_scrap.category_id)
+        return '?', ''
+
+    def plan_auto_scrap_pages(self, *, auto_scrap_id: int,
+                              max_pages: int) -> int:
+        with transaction.atomic():
+            # The row lock keeps two planners from handing out one cursor
+            auto_scrap = AutoScrap.objects.select_for_update().get(
+                id=auto_scrap_id
             )
-            auto_scrap_items.append(auto_scrap_post_instance)
-        elif auto_scrap_instance.field == constances.ItemTypes.CATEGORY:
-            auto_scrap_category_instance = AutoScrapCategoryItem(
-                auto_scrap=auto_scrap_instance,
+            if auto_scrap.field not in AUTO_SCRAP_ITEM_MODELS:
+                # Rows saved before the field had choices can hold anything
+                self.logger.warning(f"AutoScrap {auto_scrap.id} skipped, "
+                                    f"unknown field {auto_scrap.field!r}")
+                return 0
+            attribute, attribute_value = self.build_auto_scrap_filter(
+                auto_scrap=auto_scrap
             )
-            auto_scrap_items.append(auto_scrap_category_instance)
-        elif auto_scrap_instance.field == constances.ItemTypes.AUTHOR:
-            auto_scrap_author_instance = AutoScrapAuthorItem(
-                auto_scrap=auto_scrap_instance,
+            next_page = auto_scrap.next_page or auto_scrap.page_start
+            end_page = auto_scrap.page_start + auto_scrap.page_count
+            page_count = min(end_page - next_page, max_pages)
+            if auto_scrap.total_pages is not None:
+                page_count = min(page_count,
+                                 auto_scrap.total_pages + 1 - next_page)
+            elif self.get_page_totals(
+                    item_type=auto_scrap.field,
+                    attribute=attribute,
+                    attribute_value=attribute_value,
+            ) is None:
+                # Nothing known about the last page yet: plan one page,
+                # its worker records the totals for the next tick
+                page_count = min(page_count, 1)
+            pages = self.plan_page_range(
+                item_type=auto_scrap.field,
+                attribute=attribute,
+                attribute_value=attribute_value,
+                page_start=next_page,
+                page_count=page_count,
             )
-            auto_scrap_items.append(auto_scrap_author_instance)
+            item_model, _ = AUTO_SCRAP_ITEM_MODELS[auto_scrap.field]
+            item_model.objects.bulk_create(
+                [item_model(auto_scrap=auto_scrap, page=page)
+                 for page in pages],
+                batch_size=constances.BULK_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            # Past the known last page there is nothing left to plan
+            auto_scrap.next_page = pages.stop if len(pages) else end_page
+            auto_scrap.save(update_fields=['next_page', 'updated_at'])
+        return len(pages)
+
+    def build_auto_scrap_page_url(self, *, auto_scrap: AutoScrap,
+                                  page: int) -> str:
+        attribute, attribute_value = self.build_auto_scrap_filter(
+            auto_scrap=auto_scrap
+        )
+        return self.build_item_url(
+            item_type=auto_scrap.field,
+            attribute=attribute,
+            attribute_value=attribute_value,
+            page=page,
+        )
+
+    def parse_auto_scrap_page(self, *, auto_scrap: AutoScrap,
+                              data_json: json) -> list:
+        attribute, attribute_value = self.build_auto_scrap_filter(
+            auto_scrap=auto_scrap
+        )
+        items = self.parse_page_json(data_json=data_json,
+                                     item_type=auto_scrap.field,
+                                     attribute=attribute,
+                                     attribute_value=attribute_value,
+                                     )
+        page_totals = self.get_page_totals(item_type=auto_scrap.field,
+                                           attribute=attribute,
+                                           attribute_value=attribute_value,
+                                           )
+        if page_totals is not None:
+            AutoScrap.objects.filter(pk=auto_scrap.pk).update(
+                total_pages=page_totals['total_pages'],
+            )
+        if auto_scrap.field == constances.ItemTypes.POST.value:
+            return [post for post, _, _ in items]
+        return items
+
+    def fetch_pages_json(self, *, urls: list, item_type: str = '') -> list:
+        # A failed page comes back as its exception, so it fails alone
+        pages_json = list()
+        for url in urls:
+            try:
+                pages_json.append(self.url_request_for_json(
+                    url=url,
+                    item_type=item_type,
+                ))
+            except Exception as e:
+                pages_json.append(e)
+        return pages_json
+
+    def auto_scrape_pages(self, *, item_type: str, items: list) -> list:
+        pages_json = self.fetch_pages_json(
+            urls=[self.build_auto_scrap_page_url(auto_scrap=item.auto_scrap,
+                                                 page=item.page)
+                  for item in items],
+            item_type=item_type,
+        )
+        # Parsing touches the ORM, so it stays sequential and in page order
+        # (item, scraped instances or the exception that failed the page)
+        results = list()
+        for item, page_json in zip(items, pages_json):
+            if isinstance(page_json, Exception):
+                results.append((item, page_json))
+                continue
+            try:
+                instances = self.parse_auto_scrap_page(
+                    auto_scrap=item.auto_scrap,
+                    data_json=page_json,
+                )
+            except Exception as e:
+                instances = e
+            results.append((item, instances))
+        return results
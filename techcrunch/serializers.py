@@ -0,0 +1,71 @@
+from rest_framework import serializers
+
+from .models import Post, Category, Author
+
+BASE_FIELDS = ['id', 'id_on_techcrunch', 'created_at', 'updated_at']
+
+
+class RelatedAuthorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ['id', 'slug', 'name']
+
+
+class RelatedCategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['id', 'slug', 'name']
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = BASE_FIELDS + ['slug', 'name', 'description', 'position',
+                                'link', 'image_link', 'image']
+
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = BASE_FIELDS + ['slug', 'name', 'post_count', 'description',
+                                'link']
+
+
+class PostSerializer(serializers.ModelSerializer):
+    # Read from the prefetched link rows, never one query per post
+    authors = serializers.SerializerMethodField()
+    categories = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = BASE_FIELDS + ['slug', 'title', 'link', 'image_link',
+                                'image', 'authors', 'categories']
+
+    def get_authors(self, post: Post) -> list:
+        return RelatedAuthorSerializer(
+            [post_author.author for post_author in post.post_authors.all()],
+            many=True,
+        ).data
+
+    def get_categories(self, post: Post) -> list:
+        return RelatedCategorySerializer(
+            [post_category.category
+             for post_category in post.post_categories.all()],
+            many=True,
+        ).data
+
+
+class PostDetailSerializer(PostSerializer):
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['content']
+
+
+class PostSearchResultSerializer(PostSerializer):
+    search_rank = serializers.SerializerMethodField()
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['search_rank']
+
+    def get_search_rank(self, post: Post) -> float or None:
+        # Unset when the backend falls back to an unranked scan
+        return getattr(post, 'search_rank', None)
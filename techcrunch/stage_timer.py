@@ -0,0 +1,60 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from . import constances
+from .logger import build_logger
+
+
+class StageTimer:
+    def __init__(self):
+        # (stage, item type) -> [count, seconds, max seconds]
+        self.stages = dict()
+        self.lock = threading.Lock()
+
+    def record(self, *, stage: str, item_type: str, seconds: float) -> None:
+        with self.lock:
+            timing = self.stages.setdefault((stage, item_type), [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    @contextmanager
+    def measure(self, *, stage: str, item_type: str = ''):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage=stage,
+                        item_type=item_type,
+                        seconds=time.perf_counter() - started_at)
+
+    def statistics(self) -> list[dict]:
+        with self.lock:
+            return [
+                {
+                    'stage': stage,
+                    'item_type': item_type,
+                    'count': count,
+                    'seconds': round(seconds, 6),
+                    'max_seconds': round(max_seconds, 6),
+                }
+                for (stage, item_type), (count, seconds, max_seconds)
+                in sorted(self.stages.items())
+            ]
+
+    def emit(self, *, task_name: str, task_id: str = '') -> list[dict]:
+        # One JSON line per stage, so log pipelines can aggregate runs
+        build_logger()
+        logger = logging.getLogger(constances.STAGE_TIMING_LOGGER)
+        statistics = self.statistics()
+        for timing in statistics:
+            logger.info(json.dumps({
+                'event': 'stage_timing',
+                'task': task_name,
+                'task_id': task_id,
+                **timing,
+            }))
+        return statistics
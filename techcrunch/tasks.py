@@ -1,11 +1,35 @@
-from celery import shared_task
+import os
+from functools import partial
+
+from celery import shared_task, current_task
+from django.conf import settings
+from django.db.models import F, Q
 from . import constances
 
-from .scraper_handler import TCScraperHandler
+from .scraper_handler import TCScraperHandler, AUTO_SCRAP_ITEM_MODELS
+from .async_scraper_handler import AsyncTCScraperHandler
+from .exports import build_export_file_name, write_export_zip
+from .keyword_stats import invalidate_keyword_stats
+from .logger import build_logger
+from .work_queue import (
+    claim_pending_items, fetch_pending_item_ids, consume_queue,
+    apply_scrape_results, release_items, complete_item, fail_item
+)
 
 from .models import (SearchByKeyword, Keyword,
                      PostSearchByKeywordItem,
-                     PostSearchDailyItem)
+                     PostSearchDailyItem,
+                     AutoScrap, ExportJob)
+
+logger = build_logger()
+
+
+def log_stage_timings(*, scraper_handler: TCScraperHandler) -> list:
+    # Aggregated over the whole task run and tagged with the task
+    return scraper_handler.log_stage_timings(
+        task_name=current_task.name,
+        task_id=current_task.request.id or '',
+    )
 
 
 @shared_task()
@@ -13,13 +37,12 @@ def techcrunch_search_by_keyword_task(
         keyword,
         page_count=constances.DEFAULT_SEARCH_PAGE_COUNT,
 ):
-    print(
-        f'techcrunch_search_by_keyword_task => {keyword} Started1222')
+    logger.info(f'techcrunch_search_by_keyword_task => {keyword} Started')
 
     keyword, _ = Keyword.objects.get_or_create(
         title=keyword,
     )
-    scraper_handler = TCScraperHandler(
+    scraper_handler = AsyncTCScraperHandler(
         url_for_scrap=constances.URL_FOR_SCRAPE,
         search_url=constances.SEARCH_URL,
     )
@@ -28,110 +51,339 @@ def techcrunch_search_by_keyword_task(
         keyword=keyword,
         page_count=page_count,
     )
+    # The keyword shows up on the home page while its search runs
+    invalidate_keyword_stats()
 
-    scraped_item_count = scraper_handler.search_by_keyword(
+    search_statistics = scraper_handler.search_by_keyword(
         search_by_keyword_instance=search_by_keyword
     )
+    invalidate_keyword_stats()
 
-    print(
-        f'techcrunch_search_by_keyword_task => {keyword}finished')
+    logger.info(f'techcrunch_search_by_keyword_task => {keyword} finished')
 
     return {
         'keyword': keyword.title,
         'page_count': page_count,
-        'scraped_item_count': scraped_item_count,
+        'scraped_item_count': search_statistics['found'],
+        'linked_item_count': search_statistics['linked'],
+        'search_pages': search_statistics['pages'],
+        'pool_statistics': scraper_handler.pool_statistics(),
+        'rate_limit_statistics': scraper_handler.rate_limit_statistics(),
+        'stage_timings': log_stage_timings(scraper_handler=scraper_handler),
         'status': 'finished',
     }
 
 
 @shared_task()
 def techcrunch_scrape_remain_search_item():
-    print('techcrunch_scrape_remain_post_search_item => Started')
+    logger.info('techcrunch_scrape_remain_post_search_item => Started')
+
+    def dispatch_items(*, item_ids: list) -> int:
+        techcrunch_scrape_search_item_batch.delay(item_ids=item_ids)
+        return len(item_ids)
+
+    queue_statistics = consume_queue(
+        fetch_item_ids=partial(
+            claim_pending_items,
+            model=PostSearchByKeywordItem,
+            batch_size=constances.SEARCH_ITEM_BATCH_SIZE,
+            lease_seconds=constances.SEARCH_ITEM_LEASE_SECONDS,
+        ),
+        process_items=dispatch_items,
+        max_batches=constances.SEARCH_ITEM_MAX_BATCHES_PER_TICK,
+    )
+
+    logger.info('techcrunch_scrape_remain_post_search_item => dispatched')
+
+    return {
+        'batch_count': queue_statistics['batch_count'],
+        'claimed_item_count': queue_statistics['item_count'],
+        'status': 'dispatched',
+    }
+
+
+@shared_task()
+def techcrunch_scrape_search_item_batch(item_ids):
+    logger.info(
+        f'techcrunch_scrape_search_item_batch => {len(item_ids)} Started')
+
+    search_items = list(
+        PostSearchByKeywordItem.objects.filter(id__in=item_ids)
+    )
+    scraper_handler = TCScraperHandler(
+        url_for_scrap=constances.URL_FOR_SCRAPE,
+        search_url=constances.SEARCH_URL,
+    )
+
+    new_scraped_item_count = 0
+    failed_item_count = 0
+    released_item_count = 0
+    try:
+        posts_by_slug = scraper_handler.scrape_posts_with_slugs(
+            post_slugs=[search_item.slug for search_item in search_items]
+        )
+    except Exception as e:
+        # The batch failed, not its items: none of them loses a retry
+        logger.error(f'techcrunch_scrape_search_item_batch => {e}')
+        released_item_count = release_items(model=PostSearchByKeywordItem,
+                                            item_ids=item_ids)
+    else:
+        new_scraped_item_count = apply_scrape_results(
+            model=PostSearchByKeywordItem,
+            items=search_items,
+            posts_by_slug=posts_by_slug,
+        )
+        failed_item_count = len(search_items) - new_scraped_item_count
+        invalidate_keyword_stats()
+    scraper_handler.wait_for_images()
+
+    logger.info('techcrunch_scrape_search_item_batch => finished')
+
+    return {
+        'new_scraped_item_count': new_scraped_item_count,
+        'failed_item_count': failed_item_count,
+        'released_item_count': released_item_count,
+        'pool_statistics': scraper_handler.pool_statistics(),
+        'http_cache_statistics': scraper_handler.http_cache_statistics(),
+        'rate_limit_statistics': scraper_handler.rate_limit_statistics(),
+        'lookup_statistics': scraper_handler.lookup_statistics(),
+        'image_statistics': scraper_handler.image_statistics(),
+        'stage_timings': log_stage_timings(scraper_handler=scraper_handler),
+        'status': 'finished',
+    }
 
-    remain_post_search_items = PostSearchByKeywordItem.objects.filter(
-        is_scraped=False,
-        is_active=True,
-    ).all()
 
+@shared_task()
+def techcrunch_scrape_daily_item():
+    logger.info('techcrunch_scrape_remain_daily_item => Started')
     scraper_handler = TCScraperHandler(
         url_for_scrap=constances.URL_FOR_SCRAPE,
         search_url=constances.SEARCH_URL,
     )
 
-    new_scraped_item = list()
-    for remain_post_search_item in remain_post_search_items:
+    scraper_handler.daily_search()
+
+    def scrape_items(*, item_ids: list) -> int:
+        daily_items = list(
+            PostSearchDailyItem.objects.filter(id__in=item_ids)
+        )
         try:
-            post, categories, authors = scraper_handler.scrape_post_with_slug(
-                post_slug=remain_post_search_item.slug
+            posts_by_slug = scraper_handler.scrape_posts_with_slugs(
+                post_slugs=[daily_item.slug for daily_item in daily_items]
             )
-            remain_post_search_item.post = post
-            remain_post_search_item.is_scraped = True
-            remain_post_search_item.save()
-            new_scraped_item.append(remain_post_search_item)
         except Exception as e:
-            remain_post_search_item.fail_count += 1
-            remain_post_search_item.save()
-            print(f'Error-{remain_post_search_item.fail_count}', e)
-            if remain_post_search_item.fail_count > constances.MAX_FAIL_COUNT:
-                remain_post_search_item.is_active = False
-                remain_post_search_item.save()
-            continue
+            # Daily items hold no lease, they just stay pending
+            logger.error(f'techcrunch_scrape_daily_item => {e}')
+            return 0
+        return apply_scrape_results(
+            model=PostSearchDailyItem,
+            items=daily_items,
+            posts_by_slug=posts_by_slug,
+        )
 
-    print(new_scraped_item)
+    queue_statistics = consume_queue(
+        fetch_item_ids=partial(
+            fetch_pending_item_ids,
+            model=PostSearchDailyItem,
+            batch_size=constances.DAILY_ITEM_BATCH_SIZE,
+        ),
+        process_items=scrape_items,
+    )
+    scraper_handler.wait_for_images()
 
-    print('techcrunch_scrape_remain_post_search_item => finished')
+    logger.info('techcrunch_scrape_remain_daily_item => finished')
 
     return {
-        'new_scraped_item_count': len(new_scraped_item),
+        'new_scraped_item_count': queue_statistics['processed_item_count'],
+        'failed_item_count': (queue_statistics['item_count']
+                              - queue_statistics['processed_item_count']),
+        'batch_count': queue_statistics['batch_count'],
+        'pool_statistics': scraper_handler.pool_statistics(),
+        'http_cache_statistics': scraper_handler.http_cache_statistics(),
+        'rate_limit_statistics': scraper_handler.rate_limit_statistics(),
+        'lookup_statistics': scraper_handler.lookup_statistics(),
+        'image_statistics': scraper_handler.image_statistics(),
+        'stage_timings': log_stage_timings(scraper_handler=scraper_handler),
         'status': 'finished',
     }
 
 
 @shared_task()
-def techcrunch_scrape_daily_item():
-    print('techcrunch_scrape_remain_daily_item => Started')
+def techcrunch_crawl_modified_posts(category_id=''):
+    logger.info(f'techcrunch_crawl_modified_posts => {category_id} Started')
     scraper_handler = TCScraperHandler(
         url_for_scrap=constances.URL_FOR_SCRAPE,
         search_url=constances.SEARCH_URL,
     )
 
-    scraper_handler.daily_search()
-    daily_items = PostSearchDailyItem.objects.filter(
-        is_scraped=False,
+    crawl_statistics = scraper_handler.crawl_modified_posts(
+        category_id=category_id,
+    )
+    scraper_handler.wait_for_images()
+
+    logger.info(f'techcrunch_crawl_modified_posts => {category_id} finished')
+
+    return {
+        **crawl_statistics,
+        'http_cache_statistics': scraper_handler.http_cache_statistics(),
+        'rate_limit_statistics': scraper_handler.rate_limit_statistics(),
+        'lookup_statistics': scraper_handler.lookup_statistics(),
+        'image_statistics': scraper_handler.image_statistics(),
+        'stage_timings': log_stage_timings(scraper_handler=scraper_handler),
+        'status': 'finished',
+    }
+
+
+def dispatch_auto_scrap_pages(*, field: str, item_ids: list) -> int:
+    techcrunch_scrape_auto_scrap_pages.delay(field=field, item_ids=item_ids)
+    return len(item_ids)
+
+
+@shared_task()
+def techcrunch_scrape_remain_auto_scrap_item():
+    logger.info('techcrunch_scrape_remain_auto_scrap_item => Started')
+    scraper_handler = TCScraperHandler(
+        url_for_scrap=constances.URL_FOR_SCRAPE,
+        search_url=constances.SEARCH_URL,
+    )
+
+    planned_page_count = 0
+    auto_scrap_ids = AutoScrap.objects.filter(
+        Q(next_page__isnull=True)
+        | Q(next_page__lt=F('page_start') + F('page_count')),
         is_active=True,
-    ).all()
-    new_items = list()
-    for daily_item in daily_items:
+    ).values_list('id', flat=True)
+    for auto_scrap_id in auto_scrap_ids:
         try:
-            post, categories, authors = scraper_handler.scrape_post_with_slug(
-                post_slug=daily_item.slug
+            planned_page_count += scraper_handler.plan_auto_scrap_pages(
+                auto_scrap_id=auto_scrap_id,
+                max_pages=constances.AUTO_SCRAP_MAX_PLANNED_PAGES_PER_TICK,
             )
-            daily_item.post = post
-            daily_item.is_scraped = True
-            daily_item.save()
-            new_items.append(daily_item)
         except Exception as e:
-            daily_item.fail_count += 1
-            daily_item.save()
-            print(f'Error-{daily_item.fail_count}', e)
-            if daily_item.fail_count > constances.MAX_FAIL_COUNT:
-                daily_item.is_active = False
-                daily_item.save()
-            continue
+            # One broken row must not stop the others from being planned
+            logger.error(f'AutoScrap {auto_scrap_id} planning failed: {e}')
 
-    print(new_items)
+    dispatched = dict()
+    for field, (item_model, _) in AUTO_SCRAP_ITEM_MODELS.items():
+        dispatched[field] = consume_queue(
+            fetch_item_ids=partial(
+                claim_pending_items,
+                model=item_model,
+                batch_size=constances.AUTO_SCRAP_PAGES_PER_JOB,
+                lease_seconds=constances.AUTO_SCRAP_LEASE_SECONDS,
+            ),
+            process_items=partial(dispatch_auto_scrap_pages, field=field),
+            max_batches=constances.AUTO_SCRAP_MAX_JOBS_PER_TICK,
+        )['item_count']
 
-    print('techcrunch_scrape_remain_book_search_item => finished')
+    logger.info('techcrunch_scrape_remain_auto_scrap_item => dispatched')
 
     return {
-        'new_scraped_item_count': len(new_items),
+        'planned_page_count': planned_page_count,
+        'dispatched_page_counts': dispatched,
+        'status': 'dispatched',
+    }
+
+
+@shared_task()
+def techcrunch_scrape_auto_scrap_pages(field, item_ids):
+    logger.info(
+        f'techcrunch_scrape_auto_scrap_pages => {field} {item_ids} Started')
+    if field not in AUTO_SCRAP_ITEM_MODELS:
+        logger.warning(f'techcrunch_scrape_auto_scrap_pages => '
+                       f'unknown field {field!r}, skipped')
+        return {'field': field, 'status': 'skipped'}
+    item_model, related_name = AUTO_SCRAP_ITEM_MODELS[field]
+    # Pages of the job are fetched concurrently, then parsed in order
+    scraper_handler = AsyncTCScraperHandler(
+        url_for_scrap=constances.URL_FOR_SCRAPE,
+        search_url=constances.SEARCH_URL,
+    )
+
+    scraped_page_count = 0
+    scraped_item_count = 0
+    items = item_model.objects.filter(id__in=item_ids).select_related(
+        'auto_scrap'
+    )
+    for item, instances in scraper_handler.auto_scrape_pages(
+            item_type=field,
+            items=list(items),
+    ):
+        if isinstance(instances, Exception):
+            logger.error(f'techcrunch_scrape_auto_scrap_pages => page '
+                         f'{item.page} failed {item.fail_count + 1} '
+                         f'times: {instances}')
+            fail_item(item=item)
+            continue
+        complete_item(item=item,
+                      related_name=related_name,
+                      instances=instances)
+        scraped_page_count += 1
+        scraped_item_count += len(instances)
+    scraper_handler.wait_for_images()
+
+    logger.info(f'techcrunch_scrape_auto_scrap_pages => {field} finished')
+
+    return {
+        'field': field,
+        'scraped_page_count': scraped_page_count,
+        'failed_page_count': len(item_ids) - scraped_page_count,
+        'scraped_item_count': scraped_item_count,
+        'http_cache_statistics': scraper_handler.http_cache_statistics(),
+        'rate_limit_statistics': scraper_handler.rate_limit_statistics(),
+        'lookup_statistics': scraper_handler.lookup_statistics(),
+        'image_statistics': scraper_handler.image_statistics(),
+        'stage_timings': log_stage_timings(scraper_handler=scraper_handler),
         'status': 'finished',
     }
 
 
 @shared_task()
-def techcrunch_scrape_remain_auto_scrap_item():
-    pass
+def techcrunch_export_as_zip(export_job_id):
+    logger.info(f'techcrunch_export_as_zip => {export_job_id} Started')
+    export_job = ExportJob.objects.get(id=export_job_id)
+    ExportJob.objects.filter(pk=export_job.pk).update(
+        status=constances.ExportJobStatuses.RUNNING.value,
+        exported_count=0,
+    )
+
+    file_name = build_export_file_name(export_job=export_job)
+    directory = os.path.join(settings.MEDIA_ROOT,
+                             constances.EXPORT_DIRECTORY)
+    os.makedirs(directory, exist_ok=True)
+    zip_path = os.path.join(directory, file_name)
+    # Nobody can download a half written archive
+    temporary_path = f'{zip_path}.tmp'
+    try:
+        write_export_zip(export_job=export_job, zip_path=temporary_path)
+        os.replace(temporary_path, zip_path)
+    except Exception as e:
+        logger.error(
+            f'techcrunch_export_as_zip => {export_job_id} failed: {e}')
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        ExportJob.objects.filter(pk=export_job.pk).update(
+            status=constances.ExportJobStatuses.FAILED.value,
+            error=str(e),
+        )
+        return {
+            'export_job_id': export_job.id,
+            'status': 'failed',
+        }
+
+    export_job.refresh_from_db()
+    export_job.file.name = f'{constances.EXPORT_DIRECTORY}/{file_name}'
+    export_job.status = constances.ExportJobStatuses.FINISHED.value
+    export_job.save(update_fields=['file', 'status', 'updated_at'])
+
+    logger.info(f'techcrunch_export_as_zip => {export_job_id} finished')
+
+    return {
+        'export_job_id': export_job.id,
+        'exported_count': export_job.exported_count,
+        'file': export_job.file.name,
+        'status': 'finished',
+    }
 
 # celery -A techcrunch_scraper_with_django worker -l INFO -P eventlet
 # celery -A techcrunch_scraper_with_django beat --loglevel=INFO
@@ -1,3 +1,1558 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from functools import partial
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Q, QuerySet
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from requests import Response
+from requests.adapters import HTTPAdapter
+from techcrunch_scraper_with_django.celery import build_beat_schedule
+
+from .async_scraper_handler import AsyncTCScraperHandler
+from .http_cache import HttpResponseCache
+from .management.commands.benchmark_link_extraction import extract_with_soup
+from .http_session import ScraperSession
+from .image_store import ImageStore
+from .keyword_stats import fetch_keyword_stats_page
+from .link_extraction import extract_link_slugs
+from .lookup_cache import LookupCache
+from . import constances
+from .models import (
+    HostRateLimit, Post, Author, Category, Keyword, SearchByKeyword,
+    PostSearchByKeywordItem, PostSearchDailyItem, PostCategory, PostAuthor,
+    AutoScrap, AutoScrapPostItem, AutoScrapCategoryItem,
+    AutoScrapAuthorItem, ExportJob
+)
+from .scraper_handler import TCScraperHandler, build_post_content_hash
+from .stage_timer import StageTimer
+from .work_queue import claim_pending_items, consume_queue, fail_item
+from .text_extraction import (
+    extract_text_by_stripping, extract_text_with_beautifulsoup
+)
+from .admin import AuthorAdmin, CategoryAdmin, ExportJobAdmin, PostAdmin
+from . import exports
+from .exports import iter_export_chunks
+from .persistence import (
+    PostPersistencePipeline, bulk_create_search_items, bulk_upsert_categories
+)
+from .post_search import search_posts
+from .tasks import (
+    techcrunch_scrape_search_item_batch,
+    techcrunch_scrape_remain_auto_scrap_item,
+    techcrunch_scrape_auto_scrap_pages,
+    techcrunch_export_as_zip,
+)
+from .rate_limiter import (
+    DatabaseTokenBucketBackend, LocalTokenBucketBackend, HostRateLimiter
+)
+from .replay_transport import (
+    RecordingAdapter, ReplayAdapter, build_fixture_path
+)
+
+
+def build_scraper_handler(
+        *,
+        handler_class: type[TCScraperHandler] = TCScraperHandler,
+        **kwargs,
+) -> TCScraperHandler:
+    # No image store, so tests never create media directories
+    with mock.patch('techcrunch.scraper_handler.ImageStore'):
+        return handler_class(url_for_scrap=constances.URL_FOR_SCRAPE,
+                             search_url=constances.SEARCH_URL, **kwargs)
+
+
+def build_replay_handler(
+        *,
+        directory: str,
+        handler_class: type[TCScraperHandler] = TCScraperHandler,
+) -> TCScraperHandler:
+    session = ScraperSession()
+    session.mount('https://', ReplayAdapter(directory=directory))
+    scraper_handler = build_scraper_handler(
+        handler_class=handler_class,
+        session=session,
+        rate_limiter=HostRateLimiter(backend=LocalTokenBucketBackend(),
+                                     requests_per_second=10 ** 9,
+                                     burst=10 ** 9,
+                                     host_overrides=dict()),
+    )
+    # Every request has to reach the transport to be replayed
+    scraper_handler.http_cache = None
+    return scraper_handler
+
+
+def write_replay_fixture(*, directory: str, url: str, body: bytes,
+                         status_code: int = 200) -> None:
+    fixture_path = build_fixture_path(directory=directory, url=url)
+    with open(f'{fixture_path}.body', 'wb') as f:
+        f.write(body)
+    with open(f'{fixture_path}.json', 'w') as f:
+        json.dump({'url': url, 'status_code': status_code,
+                   'headers': {'Content-Type': 'application/json'}}, f)
+
+
+class TextExtractionTest(TestCase):
+    def test_strip_matches_get_text_for_well_formed_html(self):
+        for html_text in [
+            '<p>Fish &amp; chips &lt;3 &quot;ok&quot; &eacute;t&eacute;'
+            '&nbsp;&#8217;&#x2014;</p>',
+            '<div><script>var a = 1;</script>Hi<!-- note --> <b>there</b>'
+            '<br/>&copy; 2024</div>',
+            'AT&amp;T &unknown; &notin; text',
+        ]:
+            self.assertEqual(
+                extract_text_by_stripping(html_text=html_text),
+                extract_text_with_beautifulsoup(html_text=html_text),
+            )
+
+    def test_strip_decodes_malformed_references_like_html_unescape(self):
+        # html.parser leaves these alone or mangles them, see constances
+        for html_text, text in [
+            ('&lt', '<'),
+            ('&quot', '"'),
+            ('a&nbsp', 'a\xa0'),
+            ('&eacute', '\xe9'),
+            ('&#0;', '\ufffd'),
+            ('AT&T', 'AT&T'),
+        ]:
+            self.assertEqual(extract_text_by_stripping(html_text=html_text),
+                             text)
+
+
+class LinkExtractionTest(TestCase):
+    search_html = (
+        '<html><head><script>var a = \'<a class="thmb" '
+        'href="https://techcrunch.com/2023/01/01/in-script/">\';</script>'
+        '</head><body>'
+        '<a class="thmb" href="https://techcrunch.com/2023/01/01/first/">'
+        '<img src="https://x/1.jpg"></a>'
+        '<h4><a href="https://techcrunch.com/2023/01/01/first/">First</a>'
+        '</h4>'
+        '<a class="post thmb wide" '
+        'href="https://techcrunch.com/2023/01/02/second/">Second</a>'
+        '<a class="thmbnail" href="https://techcrunch.com/2023/01/03/no/">'
+        'No</a>'
+        '<a class="thmb" href="https://techcrunch.com/2023/01/01/first/">'
+        'Again</a>'
+        "<a href='https://techcrunch.com/2023/01/04/third/' class='thmb'>"
+        'Third &amp; last</a>'
+        '</body></html>'
+    )
+    homepage_html = (
+        '<div class="post-block">'
+        '<a class="post-block__title__link" '
+        'href="https://techcrunch.com/2024/05/01/news-one/">One</a>'
+        '<a class="post-block__title__link\tfeatured" '
+        'href="https://techcrunch.com/2024/05/01/news-two/?utm=x">Two</a>'
+        '<a class="post-block__title" '
+        'href="https://techcrunch.com/2024/05/01/news-three/">Three</a>'
+        '<A CLASS="post-block__title__link" '
+        'HREF="https://techcrunch.com/2024/05/01/news-one/">One</A>'
+        '</div>'
+    )
+
+    def test_slug_parser_matches_the_soup_selector(self):
+        for html_text, link_class in [
+            (self.search_html, constances.SEARCH_ITEM_LINK_CLASS),
+            (self.homepage_html, constances.DAILY_ITEM_LINK_CLASS),
+        ]:
+            self.assertEqual(
+                extract_link_slugs(html_text=html_text,
+                                   link_class=link_class),
+                extract_with_soup(html_text=html_text, link_class=link_class),
+            )
+
+    def test_slugs_are_deduped_in_page_order(self):
+        self.assertEqual(
+            extract_link_slugs(html_text=self.search_html,
+                               link_class=constances.SEARCH_ITEM_LINK_CLASS),
+            ['first', 'second', 'third'],
+        )
+        self.assertEqual(
+            extract_link_slugs(html_text=self.homepage_html,
+                               link_class=constances.DAILY_ITEM_LINK_CLASS),
+            ['news-one', 'news-two'],
+        )
+
+
+class MergeDuplicatesMigrationTest(TransactionTestCase):
+    migrate_from = [('techcrunch',
+                     '0018_alter_post_image_postsearchdailyitem')]
+    migrate_to = [('techcrunch',
+                   '0019_unique_id_on_techcrunch_and_post_links')]
+
+    def migrate(self, *, targets: list):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(targets=executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged_before_the_constraints(self):
+        apps = self.migrate(targets=self.migrate_from)
+        post_model = apps.get_model('techcrunch', 'Post')
+        category_model = apps.get_model('techcrunch', 'Category')
+        category = category_model.objects.create(
+            id_on_techcrunch='1', slug='fintech', name='Fintech',
+            post_count='1', description='About', link='https://a',
+        )
+        posts = [post_model.objects.create(
+            id_on_techcrunch='1', slug='post', title='Title',
+            content='Content', link='https://a', image_link='',
+        ) for _ in range(2)]
+        for post in posts:
+            apps.get_model('techcrunch', 'PostCategory').objects.create(
+                post=post, category=category,
+            )
+
+        apps = self.migrate(targets=self.migrate_to)
+        self.assertEqual(
+            list(apps.get_model('techcrunch', 'Post').objects.values_list(
+                'id', flat=True)),
+            [posts[1].id],
+        )
+        self.assertEqual(
+            list(apps.get_model(
+                'techcrunch', 'PostCategory',
+            ).objects.values_list('post_id', 'category_id')),
+            [(posts[1].id, category.id)],
+        )
+
+
+class BeatScheduleTest(TestCase):
+    def test_modified_posts_crawl_is_opt_in(self):
+        crawl_tasks = [
+            'techcrunch.tasks.techcrunch_crawl_modified_posts',
+        ]
+
+        def scheduled_crawls() -> list:
+            return [entry['task'] for entry in build_beat_schedule().values()
+                    if entry['task'] in crawl_tasks]
+
+        self.assertEqual(scheduled_crawls(), list())
+        with override_settings(CRAWL_MODIFIED_POSTS_ENABLED=True):
+            self.assertEqual(scheduled_crawls(), crawl_tasks)
+
+
+class DatabaseTokenBucketBackendTest(TransactionTestCase):
+    def test_reserve_is_one_query_once_the_bucket_exists(self):
+        backend = DatabaseTokenBucketBackend()
+        backend.reserve(host='example.com', requests_per_second=5, burst=2)
+        with self.assertNumQueries(1):
+            backend.reserve(host='example.com', requests_per_second=5,
+                            burst=2)
+
+    def test_reserve_matches_the_local_bucket(self):
+        database_backend = DatabaseTokenBucketBackend()
+        local_backend = LocalTokenBucketBackend()
+        for _ in range(4):
+            database_wait = database_backend.reserve(
+                host='example.com', requests_per_second=2, burst=2,
+            )
+            local_wait = local_backend.reserve(
+                host='example.com', requests_per_second=2, burst=2,
+            )
+            self.assertAlmostEqual(database_wait, local_wait, delta=0.05)
+        self.assertAlmostEqual(database_wait, 1.0, delta=0.05)
+
+    def test_block_delays_the_next_reservation(self):
+        backend = DatabaseTokenBucketBackend()
+        backend.block(host='example.com', until=time.time() + 30, burst=2)
+        wait_seconds = backend.reserve(host='example.com',
+                                       requests_per_second=5, burst=2)
+        self.assertGreater(wait_seconds, 29)
+
+    def test_concurrent_reservations_share_the_bucket(self):
+        backend = DatabaseTokenBucketBackend()
+        backend.reserve(host='example.com', requests_per_second=0.001,
+                        burst=100)
+        errors = list()
+
+        def reserve_many():
+            try:
+                for _ in range(10):
+                    backend.reserve(host='example.com',
+                                    requests_per_second=0.001, burst=100)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reserve_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, list())
+        # No reservation was lost or served by the in-process fallback
+        self.assertEqual(backend.fallback.buckets, dict())
+        self.assertAlmostEqual(
+            HostRateLimit.objects.get(host='example.com').tokens,
+            100 - 81,
+            delta=0.1,
+        )
+
+
+class LookupCacheTest(TestCase):
+    def setUp(self):
+        self.stored = Category.objects.create(
+            id_on_techcrunch='1', slug='stored', name='Stored',
+            post_count='1', description='About',
+            link='https://techcrunch.com/category',
+        )
+        self.fetched = Category(id_on_techcrunch='2', slug='fetched')
+
+    def test_each_id_is_loaded_once(self):
+        lookup_cache = LookupCache(model=Category)
+        fetch_many = mock.Mock(return_value={'2': self.fetched})
+        with self.assertNumQueries(1):
+            self.assertEqual(lookup_cache.get_many(
+                ids_on_techcrunch=[1, 2, 1], fetch_many=fetch_many,
+            ), [self.stored, self.fetched])
+        with self.assertNumQueries(0):
+            self.assertEqual(lookup_cache.get(
+                id_on_techcrunch=2, fetch=mock.Mock(),
+            ), self.fetched)
+        fetch_many.assert_called_once_with(['2'])
+        self.assertEqual(lookup_cache.statistics(), {
+            'memory_hits': 1,
+            'database_hits': 1,
+            'misses': 1,
+            'size': 2,
+            'hit_rate': 0.6667,
+        })
+
+    def test_least_recently_used_entry_is_evicted(self):
+        lookup_cache = LookupCache(model=Category, max_size=1)
+        lookup_cache.put(instance=self.stored)
+        lookup_cache.put(instance=self.fetched)
+        self.assertEqual(list(lookup_cache.items), ['2'])
+
+
+class HttpResponseCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    @staticmethod
+    def build_response(*, body: bytes) -> Response:
+        response = Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response.headers['ETag'] = '"v1"'
+        response.headers['Set-Cookie'] = 'session=1'
+        response._content = body
+        return response
+
+    def test_stored_response_revalidates_with_its_etag(self):
+        http_cache = HttpResponseCache(directory=self.directory, ttl=60)
+        url = 'https://techcrunch.com/wp-json/wp/v2/posts'
+        http_cache.store(url=url,
+                         response=self.build_response(body=b'[1]'))
+
+        entry = http_cache.get(url=url)
+        self.assertTrue(http_cache.is_fresh(entry=entry))
+        self.assertEqual(
+            HttpResponseCache.build_conditional_headers(entry=entry),
+            {'If-None-Match': '"v1"'},
+        )
+        response = http_cache.build_response(entry=entry)
+        self.assertEqual(response.json(), [1])
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertIsNone(http_cache.get(url=f'{url}?page=2'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        http_cache = HttpResponseCache(directory=self.directory,
+                                       max_size_bytes=400)
+        http_cache.store(url='https://a',
+                         response=self.build_response(body=b'a' * 100))
+        entry_path = http_cache.build_entry_path(url='https://a')
+        os.utime(f'{entry_path}.json', (0, 0))
+        http_cache.store(url='https://b',
+                         response=self.build_response(body=b'b' * 100))
+
+        self.assertIsNone(http_cache.get(url='https://a'))
+        self.assertIsNotNone(http_cache.get(url='https://b'))
+        self.assertEqual(http_cache.statistics()['evictions'], 1)
+
+    def test_restored_url_replaces_its_size(self):
+        http_cache = HttpResponseCache(directory=self.directory)
+        for body in [b'a' * 100, b'b' * 50, b'c' * 50]:
+            http_cache.store(url='https://a',
+                             response=self.build_response(body=body))
+
+        self.assertEqual(
+            http_cache.statistics()['size_bytes'],
+            sum(size for _, size, _ in http_cache.list_entries()),
+        )
+        self.assertEqual(
+            HttpResponseCache(directory=self.directory)
+            .statistics()['size_bytes'],
+            http_cache.statistics()['size_bytes'],
+        )
+
+
+class ImageStoreTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def fetch(self, *, url: str) -> Response:
+        response = Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(url.encode())
+        return response
+
+    def test_wait_saves_images_and_releases_threads(self):
+        posts = [Post.objects.create(id_on_techcrunch=str(index),
+                                     slug=f'post-{index}',
+                                     title='Title',
+                                     content='Content')
+                 for index in range(3)]
+        image_store = ImageStore(fetch=self.fetch, media_root=self.media_root)
+        with mock.patch('techcrunch.image_store.connection') \
+                as thread_connection:
+            image_store.submit(image_url='https://img/a.png',
+                               instance=posts[0])
+            image_store.submit(image_url='https://img/a.png',
+                               instance=posts[1])
+            image_store.submit(image_url='https://img/b.png',
+                               instance=posts[2])
+            image_store.wait()
+
+        images = [post.image.name for post in
+                  Post.objects.filter(pk__in=[post.pk for post in posts])
+                  .order_by('pk')]
+        self.assertEqual(images[0], images[1])
+        self.assertNotEqual(images[0], images[2])
+        self.assertEqual(image_store.statistics()['downloaded'], 2)
+        self.assertIsNone(image_store.executor)
+        # One close per download job, run on the pool thread
+        self.assertEqual(thread_connection.close.call_count, 2)
+
+
+class ExportJobTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.posts = [Post.objects.create(id_on_techcrunch=str(index),
+                                          slug=f'post-{index}',
+                                          title=f'Title <{index}>',
+                                          content='Content')
+                      for index in range(5)]
+        object_ids = [post.pk for post in self.posts]
+        self.export_job = ExportJob.objects.create(
+            model_label='techcrunch.post',
+            object_ids=object_ids,
+            total_count=len(object_ids),
+        )
+        self.exported_counts = []
+
+    def iter_small_chunks(self, *, model, object_ids, fail_after=None):
+        for index, instances in enumerate(iter_export_chunks(
+                model=model, object_ids=object_ids, chunk_size=2)):
+            if index == fail_after:
+                raise Exception('Database went away')
+            self.exported_counts.append(ExportJob.objects.get(
+                pk=self.export_job.pk).exported_count)
+            yield instances
+
+    def export_directory_names(self) -> list:
+        return sorted(os.listdir(os.path.join(
+            self.media_root, constances.EXPORT_DIRECTORY)))
+
+    def test_export_streams_chunks_into_the_zip(self):
+        with mock.patch('techcrunch.exports.iter_export_chunks',
+                        self.iter_small_chunks):
+            result = techcrunch_export_as_zip(self.export_job.id)
+
+        self.export_job.refresh_from_db()
+        self.assertEqual(result['status'], 'finished')
+        self.assertEqual(self.export_job.status,
+                         constances.ExportJobStatuses.FINISHED.value)
+        # Progress is stored after every chunk
+        self.assertEqual(self.exported_counts, [0, 2, 4])
+        self.assertEqual(self.export_job.exported_count, 5)
+        file_name = exports.build_export_file_name(export_job=self.export_job)
+        # The temporary archive was moved into place
+        self.assertEqual(self.export_directory_names(), [file_name])
+        self.assertEqual(self.export_job.file.name,
+                         f'{constances.EXPORT_DIRECTORY}/{file_name}')
+        with zipfile.ZipFile(self.export_job.file.path) as zip_file:
+            self.assertEqual(zip_file.namelist(),
+                             [constances.EXPORT_TABLE_NAME])
+            table = zip_file.read(constances.EXPORT_TABLE_NAME).decode()
+        self.assertEqual(table.count('<tr>'), 6)
+        for post in self.posts:
+            self.assertIn(f'<td>{post.slug}</td>', table)
+        self.assertIn('Title &lt;0&gt;', table)
+
+    def test_failed_export_removes_the_temporary_archive(self):
+        with mock.patch('techcrunch.exports.iter_export_chunks',
+                        partial(self.iter_small_chunks, fail_after=1)):
+            result = techcrunch_export_as_zip(self.export_job.id)
+
+        self.export_job.refresh_from_db()
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(self.export_job.status,
+                         constances.ExportJobStatuses.FAILED.value)
+        self.assertEqual(self.export_job.error, 'Database went away')
+        self.assertEqual(self.export_job.exported_count, 2)
+        self.assertFalse(self.export_job.file)
+        self.assertEqual(self.export_directory_names(), [])
+
+    def test_admin_lists_only_own_exports_for_staff(self):
+        user_model = get_user_model()
+        staff = user_model.objects.create_user(
+            username='staff', password='secret', is_staff=True,
+        )
+        superuser = user_model.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret',
+        )
+        own_export_job = ExportJob.objects.create(
+            user=staff, model_label='techcrunch.post',
+        )
+        model_admin = ExportJobAdmin(ExportJob, admin.site)
+        request = RequestFactory().get('/')
+
+        request.user = staff
+        self.assertEqual(list(model_admin.get_queryset(request)),
+                         [own_export_job])
+        request.user = superuser
+        self.assertEqual(
+            set(model_admin.get_queryset(request)),
+            {self.export_job, own_export_job},
+        )
+
+
+class ReadApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='reader',
+                                                         password='secret')
+        self.client.force_login(self.user)
+        authors = [Author.objects.create(
+            id_on_techcrunch=str(index), slug=f'author-{index}',
+            name=f'Author {index}', description='Bio', position='Writer',
+            link='https://techcrunch.com/author', image_link='',
+        ) for index in range(3)]
+        categories = [Category.objects.create(
+            id_on_techcrunch=str(index), slug=f'category-{index}',
+            name=f'Category {index}', post_count='1', description='About',
+            link='https://techcrunch.com/category',
+        ) for index in range(3)]
+        pipeline = PostPersistencePipeline()
+        for index in range(30):
+            pipeline.add(
+                post=Post(id_on_techcrunch=str(index), slug=f'post-{index}',
+                          title=f'Title {index}', content='Content'),
+                authors=[authors[index % 3]],
+                categories=categories[:1 + index % 3],
+            )
+        pipeline.flush()
+
+    def test_cache_is_shared_between_processes(self):
+        self.assertIsInstance(caches['default'], DatabaseCache)
+
+    def test_post_list_query_count_does_not_grow_with_the_page(self):
+        query_counts = list()
+        for page_size in [5, 25]:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    f'/api/posts/?page_size={page_size}'
+                )
+            self.assertEqual(len(response.json()['results']), page_size)
+            query_counts.append(len(queries))
+            post_queries = [query for query in queries
+                            if 'techcrunch_post' in query['sql']]
+            # posts, post authors and post categories
+            self.assertEqual(len(post_queries), 3)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_cached_response_skips_the_post_queries(self):
+        self.client.get('/api/posts/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/posts/')
+        self.assertFalse([query for query in queries
+                          if 'techcrunch_post' in query['sql']])
+
+    def test_cursor_walks_every_post_once(self):
+        slugs = list()
+        url = '/api/posts/?page_size=7'
+        while url:
+            data = self.client.get(url).json()
+            slugs += [post['slug'] for post in data['results']]
+            url = data['next']
+        self.assertEqual(len(slugs), 30)
+        self.assertEqual(len(set(slugs)), 30)
+        self.assertEqual(slugs[0], 'post-29')
+
+    def test_conditional_get_and_invalidation_on_write(self):
+        response = self.client.get('/api/posts/')
+        etag = response['ETag']
+        response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        pipeline = PostPersistencePipeline()
+        pipeline.add(post=Post(id_on_techcrunch='100', slug='post-new',
+                               title='New', content='Content'),
+                     authors=list(), categories=list())
+        with self.captureOnCommitCallbacks(execute=True):
+            pipeline.flush()
+
+        response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['slug'], 'post-new')
+
+    def test_admin_change_form_save_invalidates_the_cache(self):
+        self.assertEqual(
+            self.client.get('/api/posts/').json()['results'][0]['title'],
+            'Title 29',
+        )
+        post = Post.objects.get(slug='post-29')
+        post.title = 'Edited'
+        request = RequestFactory().post('/')
+        request.user = self.user
+        with self.captureOnCommitCallbacks(execute=True):
+            PostAdmin(Post, admin.site).save_model(request, post,
+                                                   form=None, change=True)
+
+        self.assertEqual(
+            self.client.get('/api/posts/').json()['results'][0]['title'],
+            'Edited',
+        )
+
+    def test_anonymous_requests_are_rejected(self):
+        self.client.logout()
+        self.assertIn(self.client.get('/api/posts/').status_code, [401, 403])
+
+
+class PostPersistencePipelineTest(TestCase):
+    def setUp(self):
+        self.authors = [Author.objects.create(
+            id_on_techcrunch=str(index), slug=f'author-{index}',
+            name=name, description='Bio', position='Writer',
+            link='https://techcrunch.com/author', image_link='',
+        ) for index, name in enumerate(['Alice', 'Bob'])]
+        self.categories = [Category.objects.create(
+            id_on_techcrunch=str(index), slug=f'category-{index}',
+            name=name, post_count='1', description='About',
+            link='https://techcrunch.com/category',
+        ) for index, name in enumerate(['Fintech', 'Robotics'])]
+
+    def flush_post(self, *, authors: list, categories: list) -> Post:
+        pipeline = PostPersistencePipeline()
+        pipeline.add(post=Post(id_on_techcrunch='1', slug='post-1',
+                               title='Title', content='Content'),
+                     authors=authors, categories=categories)
+        return pipeline.flush()[0][0]
+
+    def test_rescraped_post_drops_links_it_no_longer_has(self):
+        self.flush_post(authors=self.authors, categories=self.categories)
+        post = self.flush_post(authors=self.authors[1:],
+                               categories=self.categories[1:])
+
+        self.assertEqual(
+            list(PostCategory.objects.filter(post=post).values_list(
+                'category__name', flat=True)),
+            ['Robotics'],
+        )
+        self.assertEqual(
+            list(PostAuthor.objects.filter(post=post).values_list(
+                'author__name', flat=True)),
+            ['Bob'],
+        )
+        self.assertEqual(search_posts(query='Fintech'), list())
+        self.assertEqual(search_posts(query='Alice'), list())
+        self.assertEqual(search_posts(query='Robotics'), [post])
+
+    def test_unchanged_post_comes_back_with_its_stored_links(self):
+        post = self.flush_post(authors=self.authors,
+                               categories=self.categories)
+        post_json = {
+            'id': 1,
+            'slug': 'post-1',
+            'title': {'rendered': 'Title'},
+            'content': {'rendered': 'Content'},
+            'categories': [0, 1],
+            '_embedded': {'authors': [{'id': 0}, {'id': 1}]},
+        }
+        Post.objects.filter(pk=post.pk).update(
+            content_hash=build_post_content_hash(post_json=post_json),
+        )
+        scraper_handler = build_scraper_handler()
+
+        # hashes, posts, post authors and post categories
+        with self.assertNumQueries(4):
+            parsed_posts = scraper_handler.parse_posts_json(
+                posts_json=[post_json],
+            )
+        self.assertEqual(parsed_posts,
+                         [(post, self.authors, self.categories)])
+        self.assertEqual(scraper_handler.post_write_counters['unchanged'], 1)
+
+    def test_links_of_other_posts_are_kept(self):
+        pipeline = PostPersistencePipeline()
+        pipeline.add(post=Post(id_on_techcrunch='2', slug='post-2',
+                               title='Other', content='Content'),
+                     authors=self.authors, categories=self.categories)
+        pipeline.flush()
+        self.flush_post(authors=list(), categories=list())
+
+        self.assertEqual(PostCategory.objects.count(), 2)
+        self.assertEqual(PostAuthor.objects.count(), 2)
+
+
+class SearchItemPersistenceTest(TestCase):
+    def setUp(self):
+        self.search = SearchByKeyword.objects.create(
+            keyword=Keyword.objects.create(title='keyword'), page_count=1,
+        )
+        self.post = Post.objects.create(id_on_techcrunch='1', slug='stored',
+                                        title='Title', content='Content')
+
+    def test_duplicate_slugs_are_stored_once(self):
+        slugs = ['stored', 'new', 'stored', 'new']
+        first_statistics = bulk_create_search_items(
+            search_by_keyword=self.search, slugs=slugs,
+        )
+        second_statistics = bulk_create_search_items(
+            search_by_keyword=self.search, slugs=slugs,
+        )
+
+        self.assertEqual(first_statistics, {
+            'found': 2, 'existing': 0, 'linked': 1, 'queued': 1,
+        })
+        self.assertEqual(second_statistics, {
+            'found': 2, 'existing': 2, 'linked': 0, 'queued': 0,
+        })
+        self.assertEqual(
+            list(PostSearchByKeywordItem.objects.order_by('slug')
+                 .values_list('slug', 'post_id', 'is_scraped')),
+            [('new', None, False), ('stored', self.post.id, True)],
+        )
+
+
+class BatchLookupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.requested_values = list()
+
+    def respond(self, *, parameter: str, build_json: callable,
+                missing: set) -> callable:
+        def url_request_for_json(*, url: str, item_type: str = '') -> dict:
+            values = parse_qs(urlsplit(url).query)[parameter][0].split(',')
+            self.requested_values.append(values)
+            # The API answers in its own order and skips unknown values
+            return {'status': 200, 'headers': dict(), 'body': [
+                build_json(value) for value in reversed(values)
+                if value not in missing
+            ]}
+        return url_request_for_json
+
+    def build_category_json(self, category_id: str) -> dict:
+        return {'id': int(category_id), 'slug': f'category-{category_id}',
+                'count': 1, 'name': f'Category {category_id}',
+                'description': 'About',
+                'link': 'https://techcrunch.com/category'}
+
+    def build_post_json(self, slug: str) -> dict:
+        return {'id': int(slug.split('-')[1]), 'slug': slug,
+                'title': {'rendered': f'Title {slug}'},
+                'content': {'rendered': 'Content'},
+                'link': f'https://techcrunch.com/{slug}',
+                'jetpack_featured_media_url': '',
+                'categories': list(),
+                '_embedded': {'authors': list()}}
+
+    def test_category_ids_are_fetched_in_chunks(self):
+        scraper_handler = build_scraper_handler()
+        scraper_handler.url_request_for_json = self.respond(
+            parameter='include', build_json=self.build_category_json,
+            missing={'4'},
+        )
+        with mock.patch.object(constances, 'MAX_ITEMS_PER_REQUEST', 2):
+            categories = scraper_handler.scrape_categories_with_ids(
+                category_ids=[1, 2, 3, 4, 5, 1],
+            )
+
+        self.assertEqual(self.requested_values,
+                         [['1', '2'], ['3', '4'], ['5']])
+        self.assertEqual(sorted(categories), ['1', '2', '3', '5'])
+        for category_id, category in categories.items():
+            self.assertEqual(category.slug, f'category-{category_id}')
+            self.assertIsNotNone(category.pk)
+
+    def test_post_slugs_are_fetched_in_chunks(self):
+        scraper_handler = build_scraper_handler()
+        scraper_handler.url_request_for_json = self.respond(
+            parameter='slug', build_json=self.build_post_json,
+            missing={'post-2'},
+        )
+        slugs = [f'post-{index}' for index in range(1, 6)]
+        with mock.patch.object(constances, 'MAX_ITEMS_PER_REQUEST', 2):
+            posts = scraper_handler.scrape_posts_with_slugs(post_slugs=slugs)
+
+        self.assertEqual(len(self.requested_values), 3)
+        self.assertEqual(sorted(posts), ['post-1', 'post-3', 'post-4',
+                                         'post-5'])
+        for slug, post in posts.items():
+            self.assertEqual(post.slug, slug)
+            self.assertEqual(post.title, f'Title {slug}')
+        self.assertFalse(Post.objects.filter(slug='post-2').exists())
+
+
+class PostSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(
+            id_on_techcrunch='1', slug='fintech', name='Fintech',
+            post_count='1', description='About',
+            link='https://techcrunch.com/category',
+        )
+        self.author = Author.objects.create(
+            id_on_techcrunch='1', slug='alice', name='Alice',
+            description='Bio', position='Writer',
+            link='https://techcrunch.com/author', image_link='',
+        )
+        pipeline = PostPersistencePipeline()
+        for index in range(2):
+            pipeline.add(post=Post(id_on_techcrunch=str(index),
+                                   slug=f'post-{index}',
+                                   title=f'Robots {index}',
+                                   content='Content'),
+                         authors=[self.author], categories=[self.category])
+        self.active_post, self.inactive_post = [
+            post for post, _, _ in pipeline.flush()
+        ]
+        Post.objects.filter(pk=self.inactive_post.pk).update(is_active=False)
+
+    def test_inactive_posts_are_not_found(self):
+        self.assertEqual(search_posts(query='robots'), [self.active_post])
+        self.assertEqual(search_posts(query='robots', limit=1),
+                         [self.active_post])
+
+        user = get_user_model().objects.create_user(username='reader',
+                                                    password='secret')
+        self.client.force_login(user)
+        response = self.client.get('/api/posts/search/?q=robots')
+        self.assertEqual([post['slug'] for post in response.json()['results']],
+                         ['post-0'])
+
+    def test_scraped_rename_reaches_the_search_documents(self):
+        bulk_upsert_categories(categories=[Category(
+            id_on_techcrunch='1', slug='fintech', name='Payments',
+            post_count='1', description='About',
+            link='https://techcrunch.com/category',
+        )])
+        self.assertEqual(search_posts(query='fintech'), list())
+        self.assertEqual(search_posts(query='payments'), [self.active_post])
+
+    def test_admin_edits_reach_the_search_documents(self):
+        request = RequestFactory().post('/')
+        self.author.name = 'Beatrice'
+        AuthorAdmin(Author, admin.site).save_model(request, self.author,
+                                                   None, True)
+        self.assertEqual(search_posts(query='beatrice'), [self.active_post])
+
+        self.active_post.title = 'Drones'
+        PostAdmin(Post, admin.site).save_model(request, self.active_post,
+                                               None, True)
+        self.assertEqual(search_posts(query='drones'), [self.active_post])
+
+        CategoryAdmin(Category, admin.site).delete_model(request,
+                                                         self.category)
+        self.assertEqual(search_posts(query='fintech'), list())
+
+
+class KeywordStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.keywords = [Keyword.objects.create(title=f'keyword {index}')
+                         for index in range(5)]
+        search = SearchByKeyword.objects.create(keyword=self.keywords[0],
+                                                page_count=1)
+        SearchByKeyword.objects.create(keyword=self.keywords[0],
+                                       page_count=2)
+        self.pending_item = PostSearchByKeywordItem.objects.create(
+            search_by_keyword=search, slug='pending',
+        )
+        PostSearchByKeywordItem.objects.create(
+            search_by_keyword=search, slug='scraped', is_scraped=True,
+        )
+        PostSearchByKeywordItem.objects.create(
+            search_by_keyword=search, slug='failed', is_active=False,
+        )
+
+    def test_counts_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            keyword_page = fetch_keyword_stats_page(page_size=2)
+        self.assertEqual(keyword_page['keywords'][0], {
+            'id': self.keywords[0].id,
+            'title': 'keyword 0',
+            'created_at': self.keywords[0].created_at,
+            'search_count': 2,
+            'hit_count': 3,
+            'scraped_count': 1,
+            'pending_count': 1,
+            'failed_count': 1,
+        })
+        self.assertEqual(keyword_page['keywords'][1]['hit_count'], 0)
+
+    def test_keyset_pages(self):
+        first_page = fetch_keyword_stats_page(page_size=2)
+        second_page = fetch_keyword_stats_page(
+            after_id=first_page['next_after'], page_size=2,
+        )
+        last_page = fetch_keyword_stats_page(
+            after_id=second_page['next_after'], page_size=2,
+        )
+        previous_page = fetch_keyword_stats_page(
+            before_id=second_page['previous_before'], page_size=2,
+        )
+        titles = [[keyword['title'] for keyword in page['keywords']]
+                  for page in [first_page, second_page, last_page]]
+        self.assertEqual(titles, [['keyword 0', 'keyword 1'],
+                                  ['keyword 2', 'keyword 3'],
+                                  ['keyword 4']])
+        self.assertIsNone(first_page['previous_before'])
+        self.assertIsNone(last_page['next_after'])
+        self.assertEqual(previous_page['keywords'], first_page['keywords'])
+
+    def test_search_task_invalidates_the_cached_page(self):
+        user = get_user_model().objects.create_user(username='reader',
+                                                    password='secret')
+        self.client.force_login(user)
+        response = self.client.get('/')
+        self.assertEqual(response.context['keywords'][0]['pending_count'], 1)
+
+        # The version bump goes through the shared cache table, which a
+        # separate cache instance, like a worker's, reads the same way
+        worker_cache = caches.create_connection('default')
+        with mock.patch('techcrunch.tasks.TCScraperHandler') \
+                as scraper_handler_class, \
+                mock.patch('techcrunch.cache_versions.cache', worker_cache):
+            scraper_handler_class.return_value.scrape_posts_with_slugs\
+                .return_value = {'pending': Post.objects.create(
+                    id_on_techcrunch='1', slug='pending', title='Title',
+                    content='Content',
+                )}
+            techcrunch_scrape_search_item_batch.apply(
+                kwargs={'item_ids': [self.pending_item.id]},
+            )
+
+        response = self.client.get('/')
+        keyword = response.context['keywords'][0]
+        self.assertEqual(keyword['pending_count'], 0)
+        self.assertEqual(keyword['scraped_count'], 2)
+
+
+class SearchItemBatchTest(TestCase):
+    def setUp(self):
+        search = SearchByKeyword.objects.create(
+            keyword=Keyword.objects.create(title='keyword'), page_count=1,
+        )
+        leased_until = timezone.now() + timedelta(minutes=5)
+        self.items = [PostSearchByKeywordItem.objects.create(
+            search_by_keyword=search, slug=slug, leased_until=leased_until,
+        ) for slug in ['found', 'missing']]
+
+    def run_batch(self, **scrape_posts_with_slugs) -> dict:
+        with mock.patch('techcrunch.tasks.TCScraperHandler') \
+                as scraper_handler_class:
+            scraper_handler_class.return_value.scrape_posts_with_slugs\
+                .configure_mock(**scrape_posts_with_slugs)
+            return techcrunch_scrape_search_item_batch.apply(
+                kwargs={'item_ids': [item.id for item in self.items]},
+            ).get()
+
+    def test_batch_error_releases_the_items_without_a_penalty(self):
+        with self.assertLogs(level='ERROR'):
+            result = self.run_batch(side_effect=Exception('timeout'))
+        self.assertEqual(result['failed_item_count'], 0)
+        self.assertEqual(result['released_item_count'], 2)
+        self.assertEqual(
+            list(PostSearchByKeywordItem.objects.order_by('id').values_list(
+                'fail_count', 'is_active', 'leased_until')),
+            [(0, True, None), (0, True, None)],
+        )
+
+    def test_only_missing_items_count_as_failed(self):
+        result = self.run_batch(return_value={'found': Post.objects.create(
+            id_on_techcrunch='1', slug='found', title='Title',
+            content='Content',
+        )})
+        self.assertEqual(result['new_scraped_item_count'], 1)
+        self.assertEqual(result['failed_item_count'], 1)
+        self.assertEqual(
+            list(PostSearchByKeywordItem.objects.order_by('id').values_list(
+                'slug', 'is_scraped', 'fail_count', 'leased_until')),
+            [('found', True, 0, None), ('missing', False, 1, None)],
+        )
+
+
+class WorkQueueTest(TestCase):
+    def setUp(self):
+        search = SearchByKeyword.objects.create(
+            keyword=Keyword.objects.create(title='keyword'), page_count=1,
+        )
+        self.items = PostSearchByKeywordItem.objects.bulk_create([
+            PostSearchByKeywordItem(search_by_keyword=search,
+                                    slug=f'post-{index}')
+            for index in range(5)
+        ])
+
+    def claim(self, **kwargs) -> list:
+        return claim_pending_items(model=PostSearchByKeywordItem,
+                                   batch_size=2, lease_seconds=60, **kwargs)
+
+    def test_consume_queue_walks_every_item_once_in_batches(self):
+        batches = list()
+
+        def process_items(*, item_ids: list) -> int:
+            batches.append(item_ids)
+            return len(item_ids)
+
+        counters = consume_queue(fetch_item_ids=self.claim,
+                                 process_items=process_items)
+        self.assertEqual(counters, {'batch_count': 3,
+                                    'item_count': 5,
+                                    'processed_item_count': 5})
+        self.assertEqual(sum(batches, list()),
+                         [item.id for item in self.items])
+
+    def test_leased_items_are_not_claimed_again(self):
+        # No after_id, so only the leases keep claimed rows out
+        batches = [self.claim() for _ in range(4)]
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1, 0])
+        self.assertEqual(sum(batches, list()),
+                         [item.id for item in self.items])
+
+    def test_fail_item_deactivates_after_the_last_retry(self):
+        item = self.items[0]
+        for _ in range(constances.MAX_FAIL_COUNT + 1):
+            fail_item(item=item)
+        item.refresh_from_db()
+        self.assertEqual(item.fail_count, constances.MAX_FAIL_COUNT + 1)
+        self.assertFalse(item.is_active)
+        self.assertIsNone(item.leased_until)
+
+
+class ReplayTransportTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def build_session(self, *, adapter) -> ScraperSession:
+        session = ScraperSession()
+        session.mount('https://', adapter)
+        return session
+
+    def test_recorded_response_replays_offline(self):
+        url = 'https://techcrunch.com/wp-json/wp/v2/posts?_envelope'
+        live_response = Response()
+        live_response.status_code = 200
+        live_response._content = '{"body": ["é"]}'.encode()
+        live_response.headers['Content-Type'] = \
+            'application/json; charset=UTF-8'
+        live_response.headers['X-WP-TotalPages'] = '3'
+        live_response.headers['Set-Cookie'] = 'session=secret'
+        recording_adapter = RecordingAdapter(directory=self.directory)
+        with mock.patch.object(HTTPAdapter, 'send',
+                               return_value=live_response):
+            recorded = self.build_session(adapter=recording_adapter).get(url)
+
+        replay_adapter = ReplayAdapter(directory=self.directory)
+        replay_session = self.build_session(adapter=replay_adapter)
+        replayed = replay_session.get(url)
+
+        self.assertEqual(recording_adapter.request_count, 1)
+        self.assertEqual(replay_adapter.request_count, 1)
+        self.assertEqual(replayed.status_code, recorded.status_code)
+        self.assertEqual(replayed.content, recorded.content)
+        self.assertEqual(replayed.json(), {'body': ['é']})
+        self.assertEqual(replayed.headers['X-WP-TotalPages'], '3')
+        # Only the headers the scraper reads are kept on disk
+        self.assertNotIn('Set-Cookie', replayed.headers)
+        self.assertTrue(os.path.exists(
+            f'{build_fixture_path(directory=self.directory, url=url)}.body'
+        ))
+
+        self.assertEqual(replay_session.get(f'{url}&page=2').status_code,
+                         404)
+        self.assertEqual(replay_adapter.missing_urls, [f'{url}&page=2'])
+
+
+class StageTimerTest(TestCase):
+    def test_emit_logs_one_json_line_per_stage(self):
+        stage_timer = StageTimer()
+        for seconds in [0.5, 1.5]:
+            stage_timer.record(stage='fetch', item_type='post',
+                               seconds=seconds)
+        with stage_timer.measure(stage='db_write'):
+            pass
+
+        with self.assertLogs(constances.STAGE_TIMING_LOGGER,
+                             level='INFO') as logs:
+            statistics = stage_timer.emit(task_name='task', task_id='1')
+
+        lines = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual([line['stage'] for line in lines],
+                         ['db_write', 'fetch'])
+        self.assertEqual(lines[1], {
+            'event': 'stage_timing', 'task': 'task', 'task_id': '1',
+            'stage': 'fetch', 'item_type': 'post', 'count': 2,
+            'seconds': 2.0, 'max_seconds': 1.5,
+        })
+        self.assertEqual(lines[0]['count'], 1)
+        self.assertEqual(statistics[1]['seconds'], 2.0)
+
+
+class AsyncThreadConnectionTest(TestCase):
+    def test_worker_threads_close_their_connection(self):
+        scraper_handler = build_scraper_handler(
+            handler_class=AsyncTCScraperHandler,
+        )
+        with mock.patch('techcrunch.async_scraper_handler.connection') \
+                as thread_connection, \
+                mock.patch.object(scraper_handler, 'url_request_for_json',
+                                  side_effect=[{'body': list()},
+                                               Exception('timeout')]):
+            pages_json = scraper_handler.fetch_pages_json(
+                urls=['https://a', 'https://b'],
+            )
+        self.assertEqual(pages_json[0], {'body': list()})
+        self.assertIsInstance(pages_json[1], Exception)
+        # Failed requests close their connection too
+        self.assertEqual(thread_connection.close.call_count, 2)
+
+
+class SearchPagesTest(TestCase):
+    def fetch_search_pages(self, *, empty_page: int, page_count: int,
+                           workers: int) -> tuple:
+        fetched_pages = list()
+
+        def fetch_search_page(*, keyword: str, page: int) -> dict:
+            fetched_pages.append(page)
+            if page != empty_page:
+                # The empty page comes back before the ones ahead of it
+                time.sleep(0.05)
+            return {'page': page, 'error': None,
+                    'slugs': [] if page >= empty_page else [f'post-{page}']}
+
+        scraper_handler = build_scraper_handler()
+        with mock.patch.object(scraper_handler, 'fetch_search_page',
+                               side_effect=fetch_search_page), \
+                mock.patch.object(constances, 'SEARCH_PAGE_MAX_WORKERS',
+                                  workers), \
+                mock.patch('techcrunch.scraper_handler.connection') \
+                as thread_connection:
+            search_pages = scraper_handler.fetch_search_pages(
+                keyword='ai', page_count=page_count,
+            )
+        self.assertEqual(thread_connection.close.call_count,
+                         min(workers, page_count))
+        return [search_page['page'] for search_page in search_pages], \
+            sorted(fetched_pages)
+
+    def test_pages_after_the_empty_one_are_not_fetched(self):
+        self.assertEqual(
+            self.fetch_search_pages(empty_page=3, page_count=20, workers=1),
+            ([1, 2, 3], [1, 2, 3]),
+        )
+
+    def test_concurrent_fetch_stops_at_the_empty_page_in_order(self):
+        search_pages, fetched_pages = self.fetch_search_pages(
+            empty_page=3, page_count=50, workers=4,
+        )
+        self.assertEqual(search_pages, [1, 2, 3])
+        # At most the pages other workers took before page 3 came back
+        self.assertEqual(fetched_pages[:3], [1, 2, 3])
+        self.assertLessEqual(fetched_pages[-1], 3 + 4 - 1)
+
+    def test_async_handler_shares_the_concurrent_fetch(self):
+        self.assertIs(AsyncTCScraperHandler.fetch_search_pages,
+                      TCScraperHandler.fetch_search_pages)
+
+
+class AsyncAutoScrapPagesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for index in range(2):
+            Category.objects.create(
+                id_on_techcrunch=str(10 + index), slug=f'category-{index}',
+                name=f'Category {index}', post_count='1',
+                description='About', link='https://techcrunch.com/category',
+            )
+        self.auto_scrap = AutoScrap.objects.create(
+            field=constances.ItemTypes.POST.value, page_count=3,
+        )
+        scraper_handler = build_scraper_handler()
+        for page in range(1, 4):
+            posts_json = [{
+                'id': page * 10 + index,
+                'slug': f'post-{page}-{index}',
+                'title': {'rendered': f'Title <b>{page}</b>'},
+                'content': {'rendered': f'<p>Content {index}</p>'},
+                'link': f'https://techcrunch.com/post-{page}-{index}',
+                'jetpack_featured_media_url': '',
+                'categories': [10 + (page + index) % 2],
+                '_embedded': {'authors': [{
+                    'id': index, 'slug': f'author-{index}',
+                    'name': f'Author {index}', 'description': 'Bio',
+                    'position': 'Writer', 'link': 'https://techcrunch.com',
+                    'cbAvatar': '',
+                }]},
+            } for index in range(3)]
+            write_replay_fixture(
+                directory=self.directory,
+                url=scraper_handler.build_auto_scrap_page_url(
+                    auto_scrap=self.auto_scrap, page=page,
+                ),
+                body=json.dumps({
+                    'status': 200,
+                    'headers': {'X-WP-Total': 9, 'X-WP-TotalPages': 3},
+                    'body': posts_json,
+                }).encode(),
+            )
+        self.items = [AutoScrapPostItem.objects.create(
+            auto_scrap=self.auto_scrap, page=page,
+        ) for page in range(1, 5)]
+
+    def scrape_pages(self, *, handler_class: type) -> tuple:
+        scraper_handler = build_replay_handler(directory=self.directory,
+                                               handler_class=handler_class)
+        results = scraper_handler.auto_scrape_pages(
+            item_type=constances.ItemTypes.POST.value,
+            items=list(AutoScrapPostItem.objects.filter(
+                id__in=[item.id for item in self.items],
+            ).select_related('auto_scrap').order_by('page')),
+        )
+        stored_rows = (
+            list(Post.objects.order_by('id_on_techcrunch').values_list(
+                'id_on_techcrunch', 'slug', 'title', 'content', 'link',
+                'content_hash',
+            )),
+            list(Author.objects.order_by('id_on_techcrunch').values_list(
+                'id_on_techcrunch', 'slug', 'name',
+            )),
+            sorted(PostCategory.objects.values_list(
+                'post__id_on_techcrunch', 'category__id_on_techcrunch',
+            )),
+            sorted(PostAuthor.objects.values_list(
+                'post__id_on_techcrunch', 'author__id_on_techcrunch',
+            )),
+        )
+        # Page 4 has no fixture, so the replay answers 404
+        self.assertIsInstance(results[-1][1], Exception)
+        return [[post.slug for post in instances]
+                for _, instances in results[:-1]], stored_rows
+
+    def test_async_pages_store_the_same_rows_as_sequential(self):
+        sequential_pages, sequential_rows = self.scrape_pages(
+            handler_class=TCScraperHandler,
+        )
+        Post.objects.all().delete()
+        Author.objects.all().delete()
+        async_pages, async_rows = self.scrape_pages(
+            handler_class=AsyncTCScraperHandler,
+        )
+
+        self.assertEqual(len(sequential_rows[0]), 9)
+        self.assertEqual(async_pages, sequential_pages)
+        self.assertEqual(async_rows, sequential_rows)
+        self.auto_scrap.refresh_from_db()
+        self.assertEqual(self.auto_scrap.total_pages, 3)
+
+    def test_page_task_scrapes_through_the_async_handler(self):
+        scraper_handler = build_replay_handler(
+            directory=self.directory,
+            handler_class=AsyncTCScraperHandler,
+        )
+        with mock.patch('techcrunch.tasks.AsyncTCScraperHandler',
+                        return_value=scraper_handler), \
+                self.assertLogs(level='ERROR'):
+            result = techcrunch_scrape_auto_scrap_pages(
+                field=constances.ItemTypes.POST.value,
+                item_ids=[item.id for item in self.items],
+            )
+        self.assertEqual(result['scraped_page_count'], 3)
+        self.assertEqual(result['scraped_item_count'], 9)
+        self.assertEqual(
+            list(AutoScrapPostItem.objects.order_by('page').values_list(
+                'is_scraped', 'fail_count')),
+            [(True, 0), (True, 0), (True, 0), (False, 1)],
+        )
+        self.assertEqual(self.items[0].posts.count(), 3)
+
+
+class AutoScrapPlanningTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.auto_scrap = AutoScrap.objects.create(
+            field=constances.ItemTypes.CATEGORY.value,
+            page_count=50,
+        )
+        self.scraper_handler = build_scraper_handler()
+
+    def plan(self) -> list:
+        self.scraper_handler.plan_auto_scrap_pages(
+            auto_scrap_id=self.auto_scrap.id,
+            max_pages=constances.AUTO_SCRAP_MAX_PLANNED_PAGES_PER_TICK,
+        )
+        return list(AutoScrapCategoryItem.objects.filter(
+            auto_scrap=self.auto_scrap,
+        ).order_by('page').values_list('page', flat=True))
+
+    def scrape_first_page(self, *, total_pages: int) -> None:
+        item = AutoScrapCategoryItem.objects.select_related(
+            'auto_scrap'
+        ).get(auto_scrap=self.auto_scrap, page=1)
+        with mock.patch.object(
+                self.scraper_handler, 'url_request_for_json',
+                return_value={'status': 200,
+                              'headers': {'X-WP-Total': total_pages * 100,
+                                          'X-WP-TotalPages': total_pages},
+                              'body': list()},
+        ):
+            self.assertEqual(self.scraper_handler.auto_scrape_pages(
+                item_type=constances.ItemTypes.CATEGORY.value,
+                items=[item],
+            ), [(item, list())])
+
+    def test_unknown_totals_plan_a_single_page(self):
+        self.assertEqual(self.plan(), [1])
+
+    def test_totals_on_the_row_bound_the_plan(self):
+        self.assertEqual(self.plan(), [1])
+        self.scrape_first_page(total_pages=3)
+        self.auto_scrap.refresh_from_db()
+        self.assertEqual(self.auto_scrap.total_pages, 3)
+
+        # The planner runs in another process, without the worker's cache
+        cache.clear()
+        self.assertEqual(self.plan(), [1, 2, 3])
+        self.assertEqual(self.plan(), [1, 2, 3])
+
+    def test_unknown_field_is_skipped_without_stopping_the_planner(self):
+        broken = AutoScrap.objects.create(field='tags', page_count=50)
+        self.assertEqual(self.scraper_handler.plan_auto_scrap_pages(
+            auto_scrap_id=broken.id,
+            max_pages=constances.AUTO_SCRAP_MAX_PLANNED_PAGES_PER_TICK,
+        ), 0)
+
+        with mock.patch('techcrunch.tasks.TCScraperHandler',
+                        return_value=self.scraper_handler), \
+                mock.patch('techcrunch.tasks.dispatch_auto_scrap_pages',
+                           return_value=0):
+            result = techcrunch_scrape_remain_auto_scrap_item()
+        self.assertEqual(result['planned_page_count'], 1)
+        self.assertEqual(list(AutoScrapCategoryItem.objects.values_list(
+            'auto_scrap_id', 'page')), [(self.auto_scrap.id, 1)])
+        self.assertEqual(
+            techcrunch_scrape_auto_scrap_pages(field='tags', item_ids=[1]),
+            {'field': 'tags', 'status': 'skipped'},
+        )
+
+
+class ScrapeLookupIndexTest(TestCase):
+    def explain(self, queryset: QuerySet) -> str:
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset: QuerySet, index_name: str):
+        self.assertIn(index_name, self.explain(queryset))
+
+    def test_slug_lookups(self):
+        for model, index_name in [
+            (Post, 'post_slug_idx'),
+            (Category, 'category_slug_idx'),
+            (Author, 'author_slug_idx'),
+            (PostSearchByKeywordItem, 'search_item_slug_idx'),
+            (PostSearchDailyItem, 'daily_item_slug_idx'),
+        ]:
+            with self.subTest(model=model.__name__):
+                self.assertUsesIndex(model.objects.filter(slug='slug'),
+                                     index_name)
+
+    def test_id_on_techcrunch_lookups(self):
+        # Unique constraint indexes are named by the backend on SQLite
+        for model in [Post, Category, Author]:
+            with self.subTest(model=model.__name__):
+                plan = self.explain(
+                    model.objects.filter(id_on_techcrunch='1')
+                )
+                self.assertIn('index', plan.lower())
+                self.assertIn('id_on_techcrunch', plan)
+
+    def test_link_lookups(self):
+        for queryset in [
+            PostCategory.objects.filter(post_id=1, category_id=1),
+            PostAuthor.objects.filter(post_id=1, author_id=1),
+        ]:
+            with self.subTest(model=queryset.model.__name__):
+                plan = self.explain(queryset)
+                self.assertIn('index', plan.lower())
+                self.assertNotIn('SCAN', plan.replace('Index Scan', ''))
+
+    def test_pending_queue_polls(self):
+        for model, index_name in [
+            (PostSearchByKeywordItem, 'search_item_pending_idx'),
+            (PostSearchDailyItem, 'daily_item_pending_idx'),
+            (AutoScrapPostItem, 'auto_post_item_pending_idx'),
+            (AutoScrapCategoryItem, 'auto_category_item_pending_idx'),
+            (AutoScrapAuthorItem, 'auto_author_item_pending_idx'),
+        ]:
+            with self.subTest(model=model.__name__):
+                # The same filters as work_queue's pending item queries
+                queryset = model.objects.filter(
+                    is_scraped=False,
+                    is_active=True,
+                    id__gt=0,
+                )
+                if hasattr(model, 'leased_until'):
+                    queryset = queryset.filter(
+                        Q(leased_until__isnull=True)
+                        | Q(leased_until__lt=timezone.now())
+                    )
+                self.assertUsesIndex(
+                    queryset.order_by('id').values_list('id', flat=True)[:100],
+                    index_name,
+                )
+
+
+class AdminChangelistQueryTest(TestCase):
+    changelists = [
+        'post', 'author', 'category', 'postauthor', 'postcategory',
+        'keyword', 'searchbykeyword', 'postsearchbykeyworditem',
+        'postsearchdailyitem', 'autoscrap', 'autoscrappostitem',
+        'autoscrapcategoryitem', 'autoscrapauthoritem', 'exportjob',
+    ]
+    # session, user, COUNT and the page, each related column joined in
+    max_queries = 4
+    # The model_label filter lists its distinct values
+    extra_queries = {'exportjob': 1}
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret',
+        )
+        self.client.force_login(user)
+        self.seeded_count = 0
+
+    def seed(self, *, count: int) -> None:
+        offset = self.seeded_count
+        self.seeded_count += count
+        indexes = range(offset, offset + count)
+        posts = Post.objects.bulk_create([
+            Post(id_on_techcrunch=str(index), slug=f'post-{index}',
+                 title=f'Title {index}', content='Content')
+            for index in indexes
+        ])
+        categories = Category.objects.bulk_create([
+            Category(id_on_techcrunch=str(index), slug=f'category-{index}',
+                     name='Category', post_count='1', description='About',
+                     link='https://techcrunch.com/category')
+            for index in indexes
+        ])
+        authors = Author.objects.bulk_create([
+            Author(id_on_techcrunch=str(index), slug=f'author-{index}',
+                   name='Author', description='Bio', position='Writer',
+                   link='https://techcrunch.com/author', image_link='')
+            for index in indexes
+        ])
+        PostCategory.objects.bulk_create([
+            PostCategory(post=post, category=category)
+            for post, category in zip(posts, categories)
+        ])
+        PostAuthor.objects.bulk_create([
+            PostAuthor(post=post, author=author)
+            for post, author in zip(posts, authors)
+        ])
+        keywords = Keyword.objects.bulk_create([
+            Keyword(title=f'keyword {index}') for index in indexes
+        ])
+        searches = SearchByKeyword.objects.bulk_create([
+            SearchByKeyword(keyword=keyword, page_count=1)
+            for keyword in keywords
+        ])
+        PostSearchByKeywordItem.objects.bulk_create([
+            PostSearchByKeywordItem(search_by_keyword=search, post=post,
+                                    slug=post.slug)
+            for search, post in zip(searches, posts)
+        ])
+        PostSearchDailyItem.objects.bulk_create([
+            PostSearchDailyItem(post=post, slug=post.slug) for post in posts
+        ])
+        auto_scraps = AutoScrap.objects.bulk_create([
+            AutoScrap(field=constances.ItemTypes.POST.value, page_count=1)
+            for _ in indexes
+        ])
+        for model in [AutoScrapPostItem, AutoScrapCategoryItem,
+                      AutoScrapAuthorItem]:
+            model.objects.bulk_create([
+                model(auto_scrap=auto_scrap, page=1)
+                for auto_scrap in auto_scraps
+            ])
+        ExportJob.objects.bulk_create([
+            ExportJob(model_label='techcrunch.post') for _ in indexes
+        ])
+
+    def count_changelist_queries(self, *, changelist: str) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f'/admin/techcrunch/{changelist}/'
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.seed(count=5)
+        small_counts = {
+            changelist: self.count_changelist_queries(changelist=changelist)
+            for changelist in self.changelists
+        }
+        self.seed(count=60)
+        for changelist in self.changelists:
+            with self.subTest(changelist=changelist):
+                query_count = self.count_changelist_queries(
+                    changelist=changelist
+                )
+                self.assertEqual(query_count, small_counts[changelist])
+                self.assertLessEqual(
+                    query_count,
+                    self.max_queries + self.extra_queries.get(changelist, 0),
+                )
@@ -0,0 +1,108 @@
+import html
+import html.entities
+import re
+
+from bs4 import BeautifulSoup
+
+from . import constances
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+# Strings inside these elements are left out of BeautifulSoup's get_text()
+SKIPPED_ELEMENTS = ('script', 'style', 'template', 'rt', 'rp')
+
+MARKUP_RE = re.compile(
+    r'<(?P<skipped>script|style|template|rt|rp)(?=[\s/>])'
+    r'(?:[^>"\']|"[^"]*"|\'[^\']*\')*>.*?(?:</(?P=skipped)\s*>|\Z)'
+    r'|<!--.*?(?:-->|\Z)'
+    r'|<!\[CDATA\[(?P<cdata>.*?)\]\]>'
+    r'|<![^>]*>'
+    r'|<\?[^>]*>'
+    r'|</?[a-zA-Z](?:[^>"\']|"[^"]*"|\'[^\']*\')*>'
+    r'|</[^>]*>',
+    re.IGNORECASE | re.DOTALL,
+)
+CHARACTER_REFERENCE_RE = re.compile(
+    r'&(?:#[0-9]+;?|#[xX][0-9a-fA-F]+;?|(?P<name>[a-zA-Z][a-zA-Z0-9]*);?)'
+)
+NAMED_REFERENCE_RE = re.compile(r'&([a-zA-Z][a-zA-Z0-9]*);')
+
+
+def is_unknown_entity(*, name: str) -> bool:
+    return f'{name};' not in html.entities.html5
+
+
+def drop_unknown_entity_semicolon(reference: re.Match) -> str:
+    # html.parser drops the semicolon of entities it does not know
+    if is_unknown_entity(name=reference.group(1)):
+        return f'&{reference.group(1)}'
+    return reference.group()
+
+
+def extract_text_with_beautifulsoup(*, html_text: str) -> str:
+    soup = BeautifulSoup(html_text, features="html.parser")
+    return soup.get_text()
+
+
+def extract_text_with_lxml(*, html_text: str) -> str:
+    if not html_text.strip():
+        return html_text
+    if '&' in html_text:
+        html_text = NAMED_REFERENCE_RE.sub(drop_unknown_entity_semicolon,
+                                           html_text)
+    fragment = lxml.html.fragment_fromstring(html_text, create_parent='div')
+    etree.strip_elements(fragment, *SKIPPED_ELEMENTS, etree.Comment,
+                         etree.ProcessingInstruction, with_tail=False)
+    return fragment.text_content()
+
+
+def unescape_character_reference(reference: re.Match) -> str:
+    name = reference.group('name')
+    if name is not None and reference.group().endswith(';') \
+            and is_unknown_entity(name=name):
+        return f'&{name}'
+    return html.unescape(reference.group())
+
+
+def unescape_entities(*, text: str) -> str:
+    if '&' not in text:
+        return text
+    return CHARACTER_REFERENCE_RE.sub(unescape_character_reference, text)
+
+
+def extract_text_by_stripping(*, html_text: str) -> str:
+    if '<' not in html_text:
+        return unescape_entities(text=html_text)
+    text_parts = list()
+    position = 0
+    for markup in MARKUP_RE.finditer(html_text):
+        text_parts.append(
+            unescape_entities(text=html_text[position:markup.start()])
+        )
+        if markup.group('cdata') is not None:
+            text_parts.append(markup.group('cdata'))
+        position = markup.end()
+    text_parts.append(unescape_entities(text=html_text[position:]))
+    return ''.join(text_parts)
+
+
+TEXT_EXTRACTION_BACKENDS = {
+    'beautifulsoup': extract_text_with_beautifulsoup,
+    'strip': extract_text_by_stripping,
+}
+if lxml is not None:
+    TEXT_EXTRACTION_BACKENDS['lxml'] = extract_text_with_lxml
+
+
+def get_text_extraction_backend(
+        *,
+        name: str = constances.TEXT_EXTRACTION_BACKEND,
+) -> callable:
+    if name not in TEXT_EXTRACTION_BACKENDS:
+        raise Exception(f'Unknown text extraction backend "{name}", '
+                        f'choose from {list(TEXT_EXTRACTION_BACKENDS)}')
+    return TEXT_EXTRACTION_BACKENDS[name]
@@ -1,13 +1,28 @@
-from django.urls import path
-from .views import (HomeView, search_by_keyword_view,
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import (TokenObtainPairView,
+                                            TokenRefreshView)
+
+from .api_views import PostViewSet, CategoryViewSet, AuthorViewSet
+from .views import (HomeView, search_by_keyword_view, post_search_view,
                     logout_user, UserRegisterView,)
 
+api_router = DefaultRouter()
+api_router.register('posts', PostViewSet, basename='api-post')
+api_router.register('categories', CategoryViewSet, basename='api-category')
+api_router.register('authors', AuthorViewSet, basename='api-author')
+
 urlpatterns = [
+    path('api/', include(api_router.urls)),
+    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain'),
+    path('api/token/refresh/', TokenRefreshView.as_view(),
+         name='token_refresh'),
     path(
         'search_by_keyword',
         search_by_keyword_view,
         name='search_by_keyword'
     ),
+    path('posts/search', post_search_view, name='post_search'),
     path('', HomeView.as_view(), name='home'),
     path('register/', UserRegisterView.as_view(), name='register'),
     path('logout/', logout_user, name='logout'),
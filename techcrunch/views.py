@@ -3,7 +3,7 @@ from django.shortcuts import render, redirect
 from django.views.generic import ListView
 
 # Create your views here.
-from .forms import SearchByKeywordForm
+from .forms import SearchByKeywordForm, PostSearchForm
 from django.contrib.auth import logout
 
 from django.contrib import messages
@@ -14,6 +14,9 @@ from .forms import SignUpForm
 
 
 from .tasks import techcrunch_search_by_keyword_task
+from .post_search import search_posts
+from .keyword_stats import get_keyword_stats_page
+from . import constances
 
 
 # Create your views here.
@@ -40,16 +43,50 @@ def search_by_keyword_view(request):
                   context={'form': form})
 
 
+def post_search_view(request):
+    form = PostSearchForm(request.GET or None)
+    posts = list()
+    if request.user.is_authenticated and form.is_valid():
+        posts = search_posts(query=form.cleaned_data['q'])
+
+    return render(request, template_name='techcrunch/post_search.html',
+                  context={'form': form, 'posts': posts})
+
+
 def logout_user(request):
     logout(request)
     messages.success(request, message="You Have Been Logged Out...")
     return redirect('home')
 
 
+def parse_keyset_id(value: str) -> int or None:
+    return int(value) if value and value.isdigit() else None
+
+
 class HomeView(ListView):
     model = Keyword
     template_name = 'techcrunch/home.html'
-    ordering = ['id']
+    context_object_name = 'keywords'
+    keyword_page = None
+
+    def get_queryset(self):
+        if not self.request.user.is_authenticated:
+            return list()
+        # Cached page of annotated rows instead of a queryset over every
+        # keyword, the template reads the counts straight off each row
+        self.keyword_page = get_keyword_stats_page(
+            after_id=parse_keyset_id(self.request.GET.get('after')),
+            before_id=parse_keyset_id(self.request.GET.get('before')),
+            page_size=constances.HOME_KEYWORDS_PER_PAGE,
+        )
+        return self.keyword_page['keywords']
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.keyword_page is not None:
+            context['next_after'] = self.keyword_page['next_after']
+            context['previous_before'] = self.keyword_page['previous_before']
+        return context
 
 
 class UserRegisterView(generic.CreateView):
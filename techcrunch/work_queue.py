@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Model, Q, F, Case, When, Value
+from django.utils import timezone
+
+from . import constances
+
+
+def claim_pending_items(
+        *,
+        model: type[Model],
+        batch_size: int,
+        lease_seconds: int,
+        after_id: int = 0,
+) -> list[int]:
+    now = timezone.now()
+    with transaction.atomic():
+        # SKIP LOCKED keeps concurrent claimers off each other's rows and the
+        # lease keeps later ticks off rows a worker is still scraping
+        item_ids = list(
+            model.objects.select_for_update(skip_locked=True).filter(
+                Q(leased_until__isnull=True) | Q(leased_until__lt=now),
+                is_scraped=False,
+                is_active=True,
+                id__gt=after_id,
+            ).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        model.objects.filter(id__in=item_ids).update(
+            leased_until=now + timedelta(seconds=lease_seconds)
+        )
+    return item_ids
+
+
+def fetch_pending_item_ids(
+        *,
+        model: type[Model],
+        batch_size: int,
+        after_id: int = 0,
+) -> list[int]:
+    return list(
+        model.objects.filter(
+            is_scraped=False,
+            is_active=True,
+            id__gt=after_id,
+        ).order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+
+
+def consume_queue(
+        *,
+        fetch_item_ids: callable,
+        process_items: callable,
+        max_batches: int = None,
+) -> dict:
+    # Keyset pagination on id: only the current batch of ids is in memory
+    # and rows that stay pending are not fetched again in the same run
+    counters = {
+        'batch_count': 0,
+        'item_count': 0,
+        'processed_item_count': 0,
+    }
+    after_id = 0
+    while max_batches is None or counters['batch_count'] < max_batches:
+        item_ids = fetch_item_ids(after_id=after_id)
+        if not item_ids:
+            break
+        counters['processed_item_count'] += process_items(item_ids=item_ids)
+        counters['batch_count'] += 1
+        counters['item_count'] += len(item_ids)
+        after_id = item_ids[-1]
+    return counters
+
+
+def apply_scrape_results(
+        *,
+        model: type[Model],
+        items: list,
+        posts_by_slug: dict,
+) -> int:
+    now = timezone.now()
+    scraped_count = 0
+    is_leased = hasattr(model, 'leased_until')
+    for item in items:
+        post = posts_by_slug.get(item.slug)
+        if post is not None:
+            item.post = post
+            item.is_scraped = True
+            scraped_count += 1
+        else:
+            item.fail_count += 1
+            if item.fail_count > constances.MAX_FAIL_COUNT:
+                item.is_active = False
+        if is_leased:
+            item.leased_until = None
+        # bulk_update skips auto_now
+        item.updated_at = now
+    update_fields = ['post', 'is_scraped', 'fail_count', 'is_active',
+                     'updated_at']
+    if is_leased:
+        update_fields.append('leased_until')
+    model.objects.bulk_update(
+        items,
+        update_fields,
+        batch_size=constances.BULK_BATCH_SIZE,
+    )
+    return scraped_count
+
+
+def release_items(*, model: type[Model], item_ids: list) -> int:
+    # Hands the items back to the queue without counting a failure
+    if not hasattr(model, 'leased_until'):
+        return 0
+    return model.objects.filter(id__in=item_ids).update(
+        leased_until=None,
+        updated_at=timezone.now(),
+    )
+
+
+def complete_item(*, item: Model, related_name: str, instances: list) -> None:
+    with transaction.atomic():
+        getattr(item, related_name).set(instances)
+        type(item).objects.filter(pk=item.pk).update(
+            is_scraped=True,
+            leased_until=None,
+            updated_at=timezone.now(),
+        )
+
+
+def fail_item(*, item: Model) -> None:
+    # One UPDATE, so concurrent failures can't lose a count
+    type(item).objects.filter(pk=item.pk).update(
+        fail_count=F('fail_count') + 1,
+        # The right-hand side sees the count from before this failure
+        is_active=Case(
+            When(fail_count__gte=constances.MAX_FAIL_COUNT,
+                 then=Value(False)),
+            default=F('is_active'),
+        ),
+        leased_until=None,
+        updated_at=timezone.now(),
+    )
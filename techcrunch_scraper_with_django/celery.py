@@ -14,7 +14,7 @@ app = Celery(main='techcrunch_scraper_with_django',
 
 app.config_from_object(obj='django.conf:settings', namespace='CELERY')
 
-app.conf.beat_schedule = {
+BEAT_SCHEDULE = {
     'every-60-seconds-scrape_remain_search_items': {
         'task': 'techcrunch.tasks.techcrunch_scrape_remain_search_item',
         'schedule': 60,  # In Second
@@ -28,6 +28,23 @@ app.conf.beat_schedule = {
         'schedule': 60,  # In Second
     },
 }
+CRAWL_MODIFIED_POSTS_SCHEDULE = {
+    'every-3600-seconds-crawl_modified_posts': {
+        'task': 'techcrunch.tasks.techcrunch_crawl_modified_posts',
+        'schedule': 3600,  # In Second
+    },
+}
+
+
+def build_beat_schedule() -> dict:
+    # The first crawls backfill the whole site, so operators opt in with
+    # CRAWL_MODIFIED_POSTS_ENABLED = True in local_settings.py
+    if getattr(settings, 'CRAWL_MODIFIED_POSTS_ENABLED', False):
+        return {**BEAT_SCHEDULE, **CRAWL_MODIFIED_POSTS_SCHEDULE}
+    return dict(BEAT_SCHEDULE)
+
+
+app.conf.beat_schedule = build_beat_schedule()
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
@@ -0,0 +1,4 @@
+SECRET_KEY = 'dev'
+DEBUG = True
+ALLOWED_HOSTS = ['*']
+DEFAULT_SEARCH_PAGE_COUNT = 5
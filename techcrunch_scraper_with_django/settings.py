@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'techcrunch.apps.TechcrunchConfig',
 
     # Third-party Apps
+    'rest_framework',
 ]
 
 MIDDLEWARE = [
@@ -130,8 +131,27 @@ LOGOUT_REDIRECT_URL = 'home'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Shared by the web process and every Celery worker, so a worker's cache
+# version bump reaches the pages and API responses the web process cached
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'techcrunch_cache',
+    }
+}
+
 # User constants
 
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+}
+
 
 
 